@@ -1,80 +1,718 @@
-import pandas as pd
-import pyarrow
+from __future__ import annotations
+
+import duckdb
+import hashlib
 import logging
+import math
+import threading
+import time
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Hashable, List, Optional, Sequence, Tuple
+from weakref import WeakKeyDictionary
+
+from electric_vehicle_metrics import Metrics
+from electric_vehicle_spatial_index import EARTH_RADIUS_KM, KM_PER_DEGREE, SpatialGridIndex, haversine_sql, radius_bounding_box
+
+if TYPE_CHECKING:
+    # pandas, pyarrow and the modules built on them are most of the import time, so they
+    # are imported by the methods that use them and a single report query skips them
+    import pandas as pd
+    import pyarrow
+
+    from electric_vehicle_partitioned_writer import PartitionedParquetWriter
+    from electric_vehicle_result_cache import ReportResultCache
+    from electric_vehicle_sketches import Estimate, VehicleSketches
 
 class ElectricVehicleAnalytics:
     """
     Responsible for performing analytics on the electric_vehicles data and saving results.
     """
-    def __init__(self, db_connection, output_dir: str = "analytics_output"):
-        self.logger = logging.getLogger(__name__)
-        self.db_connection = db_connection
-        self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(parents=True, exist_ok=True)
 
-    def count_cars_per_city(self) -> pd.DataFrame:
-        query = """
-        SELECT City, COUNT(*) AS num_electric_cars
-        FROM electric_vehicles
+    TABLE_NAME = "electric_vehicles"
+    # Written by ElectricVehicleDataLoader.record_load() after every load
+    LOADS_TABLE = f"{TABLE_NAME}_loads"
+    # Counts by City, Postal_Code, Make, Model and Model_Year, maintained by
+    # ElectricVehicleDataLoader.run(); shaped like the report base
+    ROLLUP_TABLE = f"{TABLE_NAME}_rollup"
+
+    # Shared pre-aggregate every report can be derived from, used by the single-scan mode
+    REPORT_BASE_NAME = "electric_vehicles_report_base"
+    REPORT_BASE_SQL = f"""
+    SELECT City, Postal_Code, Make, Model, Model_Year, COUNT(*) AS num_cars
+    FROM {TABLE_NAME}
+    GROUP BY City, Postal_Code, Make, Model, Model_Year;
+    """
+
+    # Report queries, rendered against the table or the shared pre-aggregate. They group by
+    # the stored columns and cast the groups to text, so a compact table (see
+    # CompactSchema) groups by dictionary codes and integers but returns the same reports
+    REPORT_QUERIES = {
+        "count_cars_per_city": """
+        SELECT CAST(City AS VARCHAR) AS City, {count_sql} AS num_electric_cars
+        FROM {source}
         GROUP BY City
         ORDER BY num_electric_cars DESC;
-        """
-        return self.db_connection.execute(query).fetchdf()
-
-    def top_3_most_popular_vehicles(self) -> pd.DataFrame:
-        query = """
-        SELECT Make, Model, COUNT(*) AS popularity
-        FROM electric_vehicles
+        """,
+        "top_3_most_popular_vehicles": """
+        SELECT CAST(Make AS VARCHAR) AS Make, CAST(Model AS VARCHAR) AS Model, {count_sql} AS popularity
+        FROM {source}
         GROUP BY Make, Model
         ORDER BY popularity DESC
         LIMIT 3;
-        """
-        return self.db_connection.execute(query).fetchdf()
-
-    def most_popular_vehicle_by_postal_code(self) -> pd.DataFrame:
-        query = """
-        SELECT Postal_Code, Make, Model, COUNT(*) AS popularity
-        FROM electric_vehicles
+        """,
+        "most_popular_vehicle_by_postal_code": """
+        SELECT CAST(Postal_Code AS VARCHAR) AS Postal_Code, CAST(Make AS VARCHAR) AS Make,
+            CAST(Model AS VARCHAR) AS Model, {count_sql} AS popularity
+        FROM {source}
         GROUP BY Postal_Code, Make, Model
         QUALIFY ROW_NUMBER() OVER (PARTITION BY Postal_Code ORDER BY popularity DESC) = 1;
-        """
-        return self.db_connection.execute(query).fetchdf()
-
-    def count_cars_by_model_year(self) -> pd.DataFrame:
-        query = """
-        SELECT Model_Year, COUNT(*) AS num_cars
-        FROM electric_vehicles
+        """,
+        "count_cars_by_model_year": """
+        SELECT Model_Year, {count_sql} AS num_cars
+        FROM {source}
         GROUP BY Model_Year
         ORDER BY num_cars DESC;
         """
-        return self.db_connection.execute(query).fetchdf()
+    }
+
+    # Columns ad-hoc reports can group, partition and filter by
+    REPORT_DIMENSIONS = (
+        "County", "City", "State", "Postal_Code", "Model_Year", "Make", "Model", "Electric_Vehicle_Type",
+        "CAFV_Eligibility", "Legislative_District", "Electric_Utility", "Census_Tract"
+    )
+    # Report dimensions that are not text in the standard layout, returned as they are stored
+    NUMERIC_DIMENSIONS = ("Model_Year",)
+    # Columns of the rollup and of the report base
+    ROLLUP_DIMENSIONS = ("City", "Postal_Code", "Make", "Model", "Model_Year")
+
+    # VehicleSketches maintained by ElectricVehicleDataLoader.run(maintain_sketches=True)
+    SKETCHES_TABLE = f"{TABLE_NAME}_sketches"
+    # Reports answered from the sketches in approximate mode
+    APPROXIMATE_REPORTS = ("top_3_most_popular_vehicles", "most_popular_vehicle_by_postal_code")
+
+    # Grid index of the vehicle locations, built by ElectricVehicleDataLoader.run()
+    SPATIAL_INDEX = SpatialGridIndex(TABLE_NAME)
+
+    # Reports computed by run(): report method, progress message, output file name and
+    # the column the output is partitioned by (None for a single Parquet file)
+    REPORTS = (
+        ("count_cars_per_city", "Counting the number of electric cars per city...", "electric_cars_per_city", None),
+        ("top_3_most_popular_vehicles", "Finding the top 3 most popular electric vehicles...", "top_3_most_popular_vehicles", None),
+        ("most_popular_vehicle_by_postal_code", "Finding the most popular electric vehicle in each postal code...", "popular_vehicle_by_postal_code", None),
+        ("count_cars_by_model_year", "Counting the number of electric cars by model year...", "electric_cars", "Model_Year"),
+    )
+
+    def __init__(self, db_connection, output_dir: str = "analytics_output", single_scan: bool = False, workers: int = 1,
+                 streaming_export: bool = False, compression: str = "snappy", row_group_size: int = 64 * 1024,
+                 partition_workers: int = 4, cache: Optional[ReportResultCache] = None, use_rollup: bool = False,
+                 metrics: Optional[Metrics] = None, approximate: bool = False):
+        """
+        Args:
+            db_connection: Database connection instance
+            output_dir: Directory where the report Parquet files are written, created by the first
+                report written to it
+            single_scan: Whether run() derives every report from one shared pre-aggregate
+                instead of scanning the table once per report
+            workers: Number of reports run() computes and writes concurrently, each one on
+                its own cursor (1 runs them in sequence on the shared connection)
+            streaming_export: Whether run() streams report results as Arrow record batches
+                straight into the Parquet files instead of going through pandas DataFrames
+            compression: Parquet compression codec
+            row_group_size: Rows per Parquet row group, and per record batch when streaming
+            partition_workers: Number of partition files written concurrently
+            cache: Cache the report methods serve results from while the table version is unchanged
+            use_rollup: Whether the reports are answered from ROLLUP_TABLE instead of scanning
+                the table (single_scan is then unnecessary and ignored)
+            metrics: Receives the timings of every query, Parquet write and report, and the
+                number of rows written
+            approximate: Whether the APPROXIMATE_REPORTS are answered from the sketches in
+                SKETCHES_TABLE, in time independent of the table size, with a max_error column
+        """
+        self.logger = logging.getLogger(__name__)
+        self.db_connection = db_connection
+        self.output_dir = Path(output_dir)
+        self.single_scan = single_scan
+        self.workers = workers
+        self.streaming_export = streaming_export
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.partition_workers = partition_workers
+        self.cache = cache
+        self.use_rollup = use_rollup
+        self.metrics = metrics or Metrics()
+        self.approximate = approximate
+        # Sketches last read from SKETCHES_TABLE, with the row count and time they were saved at
+        self._sketches: Optional[Tuple[Tuple[int, Any], VehicleSketches]] = None
+        self._report_base: Optional[pyarrow.Table] = None
+        # Names of the statements prepared on each connection or cursor
+        self._prepared: "WeakKeyDictionary[Any, set]" = WeakKeyDictionary()
+        self._prepared_lock = threading.Lock()
+        self._use_table()
+
+    def _use_report_base(self) -> None:
+        """
+        Scan the table once into the shared pre-aggregate and point the reports at it.
+
+        The pre-aggregate is kept in memory as an Arrow table registered on the connection.
+        """
+        import pyarrow
+
+        self.logger.info("Pre-aggregating electric vehicles for all reports...")
+        with self.metrics.timer("analytics.query", report="report_base"):
+            result = self.db_connection.execute(self.REPORT_BASE_SQL).arrow()
+        self._report_base = result.read_all() if isinstance(result, pyarrow.RecordBatchReader) else result
+        self.db_connection.register(self.REPORT_BASE_NAME, self._report_base)
+        self._source = self.REPORT_BASE_NAME
+        self._count_sql = "CAST(SUM(num_cars) AS BIGINT)"
+
+    def _use_table(self) -> None:
+        """Point the reports back at the table (or its rollup), releasing the shared pre-aggregate."""
+        if self._report_base is not None:
+            self.db_connection.unregister(self.REPORT_BASE_NAME)
+        if self.use_rollup:
+            self._source = self.ROLLUP_TABLE
+            self._count_sql = "CAST(SUM(num_cars) AS BIGINT)"
+        else:
+            self._source = self.TABLE_NAME
+            self._count_sql = "COUNT(*)"
+        self._report_base = None
+
+    def _cursor(self):
+        """Open a cursor on the shared connection that sees the same report source."""
+        cursor = self.db_connection.cursor()
+        if self._report_base is not None:
+            cursor.register(self.REPORT_BASE_NAME, self._report_base)
+        return cursor
+
+    def report_query(self, name: str) -> str:
+        """
+        Render the SQL of a report against the current report source.
+
+        Args:
+            name: Report name, one of REPORT_QUERIES
+
+        Returns:
+            The report query
+        """
+        return self.REPORT_QUERIES[name].format(source=self._source, count_sql=self._count_sql)
+
+    def table_fingerprint(self, connection=None) -> Tuple[int, Optional[str]]:
+        """
+        Identify the current version of the table.
+
+        Returns:
+            The row count and the ID of the latest load recorded by the data loader (None
+            when the table was not loaded through ElectricVehicleDataLoader.run())
+        """
+        connection = connection or self.db_connection
+        row_count = connection.execute(f"SELECT COUNT(*) FROM {self.TABLE_NAME}").fetchone()[0]
+        try:
+            load = connection.execute(
+                f"SELECT Load_ID FROM {self.LOADS_TABLE} ORDER BY Loaded_At DESC LIMIT 1"
+            ).fetchone()
+        except duckdb.CatalogException:
+            load = None
+        return row_count, load[0] if load else None
+
+    def _fetch_report(self, name: str, connection=None) -> pd.DataFrame:
+        """Run a report query, serving it from the cache when the table has not changed."""
+        connection = connection or self.db_connection
+        query = self.report_query(name)
+        return self._cached((name, query), connection, lambda: self._query_df(name, connection, query))
+
+    def _query_df(self, name: str, connection, query: str, params: Optional[Sequence[Any]] = None) -> pd.DataFrame:
+        """Run a report query into a DataFrame, timing it."""
+        with self.metrics.timer("analytics.query", report=name):
+            if params is None:
+                return connection.execute(query).fetchdf()
+            return self._execute_prepared(connection, query, params).fetchdf()
+
+    def _cached(self, key: Tuple[Hashable, ...], connection, compute: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """Compute a result, or serve it from the cache when the table has not changed."""
+        if self.cache is None:
+            return compute()
+
+        key = key + (self.table_fingerprint(connection),)
+        df = self.cache.get(key)
+        if df is None:
+            df = compute()
+            self.cache.put(key, df)
+        return df
+
+    def report(self, group_by: Sequence[str], n: Optional[int] = None, per: Optional[str] = None,
+               state: Optional[str] = None, model_years: Tuple[Optional[int], Optional[int]] = (None, None),
+               ev_type: Optional[str] = None, connection=None) -> pd.DataFrame:
+        """
+        Count vehicles by any combination of dimensions, optionally keeping the top N groups.
+
+        Reports of the same shape (dimensions, partition key and which filters are set) share
+        one prepared statement per connection, the filter values and N are inlined as SQL
+        literals into the EXECUTE statement of every call. E.g. report(["Make", "Model"], n=3) is the top 3 vehicles, and
+        report(["Postal_Code", "Make", "Model"], n=1, per="Postal_Code") the most popular
+        vehicle in each postal code.
+
+        Args:
+            group_by: Dimensions to count by, from REPORT_DIMENSIONS
+            n: Number of groups to keep, overall or per partition (None keeps them all)
+            per: Dimension of group_by the top N is computed within
+            state: Only count vehicles registered in this state
+            model_years: Inclusive model year range, either bound may be None
+            ev_type: Only count vehicles of this Electric_Vehicle_Type
+            connection: Connection or cursor to run the report on (defaults to the shared connection)
+
+        Returns:
+            One row per group with its num_cars count, largest first
+
+        Raises:
+            ValueError: If a dimension is unknown, n is below 1, or per is set without n or outside group_by
+        """
+        if n is not None and n < 1:
+            raise ValueError(f"n must be at least 1, got {n}")
+        filters = [
+            (predicate, value) for predicate, value in (
+                ("State = ?", state),
+                ("Model_Year >= ?", model_years[0]),
+                ("Model_Year <= ?", model_years[1]),
+                ("Electric_Vehicle_Type = ?", ev_type),
+            ) if value is not None
+        ]
+        columns = set(group_by) | {predicate.split()[0] for predicate, _ in filters}
+        if self._source != self.TABLE_NAME and columns <= set(self.ROLLUP_DIMENSIONS):
+            source, count_sql = self._source, self._count_sql
+        else:
+            source, count_sql = self.TABLE_NAME, "COUNT(*)"
+
+        query = _compile_report(
+            source, count_sql, tuple(group_by), per, tuple(predicate for predicate, _ in filters), n is not None
+        )
+        params = [value for _, value in filters] + ([n] if n is not None else [])
+        connection = connection or self.db_connection
+        return self._cached(
+            ("report", query, tuple(params)), connection,
+            lambda: self._query_df("adhoc", connection, query, params)
+        )
+
+    def _execute_prepared(self, connection, query: str, params: Sequence[Any]):
+        """Execute a query through a statement prepared once per connection."""
+        name = f"report_{hashlib.sha1(query.encode()).hexdigest()[:16]}"
+        with self._prepared_lock:
+            prepared = self._prepared.setdefault(connection, set())
+            is_new = name not in prepared
+        if is_new:
+            connection.execute(f"PREPARE {name} AS {query}")
+            with self._prepared_lock:
+                prepared.add(name)
+        # EXECUTE does not accept bound parameters itself, the values are passed as literals
+        arguments = f"({', '.join(_sql_literal(value) for value in params)})" if params else ""
+        return connection.execute(f"EXECUTE {name}{arguments}")
+
+    def count_cars_per_city(self, connection=None) -> pd.DataFrame:
+        return self._fetch_report("count_cars_per_city", connection)
+
+    def top_3_most_popular_vehicles(self, connection=None) -> pd.DataFrame:
+        if self.approximate:
+            return self.approximate_top_vehicles(3, connection)
+        return self._fetch_report("top_3_most_popular_vehicles", connection)
+
+    def most_popular_vehicle_by_postal_code(self, connection=None) -> pd.DataFrame:
+        if self.approximate:
+            return self.approximate_most_popular_vehicle_by_postal_code(connection)
+        return self._fetch_report("most_popular_vehicle_by_postal_code", connection)
+
+    def count_cars_by_model_year(self, connection=None) -> pd.DataFrame:
+        return self._fetch_report("count_cars_by_model_year", connection)
+
+    def sketches(self, connection=None) -> VehicleSketches:
+        """
+        The sketches of the table, read again only when the loader saved new ones.
+
+        Raises:
+            ValueError: If the table was never loaded with maintain_sketches=True
+        """
+        from electric_vehicle_sketches import VehicleSketches
+
+        connection = connection or self.db_connection
+        try:
+            saved = connection.execute(f"SELECT Rows_Sketched, Updated_At FROM {self.SKETCHES_TABLE}").fetchone()
+        except duckdb.CatalogException:
+            saved = None
+        if saved is None:
+            raise ValueError(f"No sketches in {self.SKETCHES_TABLE}, load the table with maintain_sketches=True")
+
+        cached = self._sketches
+        if cached is None or cached[0] != saved:
+            with self.metrics.timer("analytics.query", report="sketches"):
+                text = connection.execute(f"SELECT Sketches FROM {self.SKETCHES_TABLE}").fetchone()[0]
+                cached = self._sketches = (saved, VehicleSketches.from_json(text))
+        return cached[1]
+
+    def approximate_top_vehicles(self, n: int = 3, connection=None) -> pd.DataFrame:
+        """
+        The n most popular vehicles, from the sketches.
+
+        Returns:
+            Make, Model, popularity and max_error: the true count lies between popularity
+            - max_error and popularity. Every vehicle more popular than the max_error of
+            the last one listed is listed
+        """
+        with self.metrics.timer("analytics.query", report="approximate_top_vehicles"):
+            rows = [
+                (make, model, estimate.value, estimate.error)
+                for make, model, estimate in self.sketches(connection).top_vehicles(n)
+            ]
+        import pandas as pd
+
+        return pd.DataFrame(rows, columns=["Make", "Model", "popularity", "max_error"])
+
+    def approximate_most_popular_vehicle_by_postal_code(self, connection=None) -> pd.DataFrame:
+        """
+        The most popular vehicle in each postal code, from the sketches.
+
+        Returns:
+            Postal_Code, Make, Model, popularity and max_error, by postal code: the true
+            count lies between popularity - max_error and popularity
+        """
+        with self.metrics.timer("analytics.query", report="approximate_most_popular_vehicle_by_postal_code"):
+            rows = sorted(
+                ((postal_code, make, model, estimate.value, estimate.error)
+                 for postal_code, make, model, estimate in self.sketches(connection).top_vehicle_by_postal_code()),
+                key=lambda row: (row[0] is None, row[0] or "")
+            )
+        import pandas as pd
+
+        return pd.DataFrame(rows, columns=["Postal_Code", "Make", "Model", "popularity", "max_error"])
+
+    def approximate_vehicle_count(self, make: str, model: str, postal_code: Optional[str] = None,
+                                  connection=None) -> Estimate:
+        """
+        Estimated number of vehicles of a make and model, overall or in one postal code.
+
+        Returns:
+            The estimate, which never falls below the true count and exceeds it by at most
+            error with probability confidence
+        """
+        return self.sketches(connection).vehicle_count(make, model, postal_code)
+
+    def approximate_distinct_count(self, column: str, connection=None) -> Estimate:
+        """
+        Estimated number of distinct values of a column of VehicleSketches.DISTINCT_COLUMNS.
+
+        Returns:
+            The estimate, within error of the true count with probability confidence
+        """
+        return self.sketches(connection).distinct_count(column)
+
+    def vehicles_in_bounding_box(self, min_longitude: float, min_latitude: float, max_longitude: float,
+                                 max_latitude: float, connection=None) -> pd.DataFrame:
+        """
+        List the vehicles located in a bounding box, edges included, from the spatial index.
+
+        Args:
+            min_longitude: West edge of the box
+            min_latitude: South edge of the box
+            max_longitude: East edge of the box
+            max_latitude: North edge of the box
+            connection: Connection or cursor to run the query on (defaults to the shared connection)
+
+        Returns:
+            One row per vehicle with the index columns, Longitude and Latitude, by DOL_Vehicle_ID
+        """
+        index = self.SPATIAL_INDEX
+        query = f"""
+            SELECT {_spatial_columns()} FROM {index.INDEX_TABLE}
+            WHERE Cell_Y BETWEEN ? AND ? AND Cell_X BETWEEN ? AND ?
+                AND Longitude BETWEEN CAST(? AS DOUBLE) AND CAST(? AS DOUBLE)
+                AND Latitude BETWEEN CAST(? AS DOUBLE) AND CAST(? AS DOUBLE)
+            ORDER BY DOL_Vehicle_ID
+        """
+        min_x, max_x, min_y, max_y = index.cell_ranges(min_longitude, min_latitude, max_longitude, max_latitude)
+        params = [min_y, max_y, min_x, max_x, min_longitude, max_longitude, min_latitude, max_latitude]
+        return self._spatial_query("vehicles_in_bounding_box", query, params, connection)
+
+    def vehicles_within_radius(self, longitude: float, latitude: float, radius_km: float, connection=None) -> pd.DataFrame:
+        """
+        List the vehicles within a great-circle distance of a point, from the spatial index.
+
+        Only the cells of the bounding box of the circle are read, the distance is then
+        computed for the vehicles they hold.
+
+        Args:
+            longitude: Longitude of the center
+            latitude: Latitude of the center
+            radius_km: Radius, in kilometers
+            connection: Connection or cursor to run the query on (defaults to the shared connection)
+
+        Returns:
+            One row per vehicle with the index columns, Longitude, Latitude and Distance_Km,
+            nearest first
+        """
+        index = self.SPATIAL_INDEX
+        distance = haversine_sql(
+            f"{index.INDEX_TABLE}.Longitude", f"{index.INDEX_TABLE}.Latitude", "origin.Longitude", "origin.Latitude"
+        )
+        query = f"""
+            WITH origin AS (SELECT CAST(? AS DOUBLE) AS Longitude, CAST(? AS DOUBLE) AS Latitude)
+            SELECT * FROM (
+                SELECT {_spatial_columns(index.INDEX_TABLE)}, {distance} AS Distance_Km
+                FROM {index.INDEX_TABLE}, origin
+                WHERE Cell_Y BETWEEN ? AND ? AND Cell_X BETWEEN ? AND ?
+            )
+            WHERE Distance_Km <= CAST(? AS DOUBLE)
+            ORDER BY Distance_Km, DOL_Vehicle_ID
+        """
+        min_x, max_x, min_y, max_y = index.cell_ranges(*radius_bounding_box(longitude, latitude, radius_km))
+        params = [longitude, latitude, min_y, max_y, min_x, max_x, radius_km]
+        return self._spatial_query("vehicles_within_radius", query, params, connection)
+
+    def nearest_vehicles(self, longitude: float, latitude: float, k: int = 10, connection=None) -> pd.DataFrame:
+        """
+        Find the k vehicles nearest to a point.
+
+        Radius queries are repeated with a radius doubled each time, starting from the size
+        of a grid cell, until one holds k vehicles: no vehicle outside that circle can be
+        nearer than the k inside it.
+
+        Args:
+            longitude: Longitude of the point
+            latitude: Latitude of the point
+            k: Number of vehicles to return
+            connection: Connection or cursor to run the queries on (defaults to the shared connection)
+
+        Returns:
+            Up to k vehicles like vehicles_within_radius(), nearest first
+        """
+        radius_km = self.SPATIAL_INDEX.cell_degrees * KM_PER_DEGREE
+        while True:
+            vehicles = self.vehicles_within_radius(longitude, latitude, radius_km, connection)
+            # Half the circumference covers the whole globe
+            if len(vehicles) >= k or radius_km >= math.pi * EARTH_RADIUS_KM:
+                return vehicles.head(k)
+            radius_km *= 2
+
+    def count_cars_per_cell(self, bounding_box: Optional[Tuple[float, float, float, float]] = None,
+                            connection=None) -> pd.DataFrame:
+        """
+        Count vehicles per cell of the spatial index grid.
+
+        Args:
+            bounding_box: Minimum longitude, minimum latitude, maximum longitude and maximum
+                latitude; only the cells overlapping it are counted, in full (None counts
+                every cell)
+            connection: Connection or cursor to run the query on (defaults to the shared connection)
+
+        Returns:
+            One row per non-empty cell with its grid coordinates, its bounds and num_cars,
+            largest first
+        """
+        index = self.SPATIAL_INDEX
+        cell_degrees = f"CAST({index.cell_degrees!r} AS DOUBLE)"
+        query = f"""
+            SELECT Cell_X, Cell_Y,
+                Cell_X * {cell_degrees} AS Min_Longitude, Cell_Y * {cell_degrees} AS Min_Latitude,
+                (Cell_X + 1) * {cell_degrees} AS Max_Longitude, (Cell_Y + 1) * {cell_degrees} AS Max_Latitude,
+                COUNT(*) AS num_cars
+            FROM {index.INDEX_TABLE}
+            {"WHERE Cell_Y BETWEEN ? AND ? AND Cell_X BETWEEN ? AND ?" if bounding_box else ""}
+            GROUP BY Cell_X, Cell_Y
+            ORDER BY num_cars DESC, Cell_Y, Cell_X
+        """
+        params = []
+        if bounding_box:
+            min_x, max_x, min_y, max_y = index.cell_ranges(*bounding_box)
+            params = [min_y, max_y, min_x, max_x]
+        return self._spatial_query("count_cars_per_cell", query, params, connection)
+
+    def _spatial_query(self, name: str, query: str, params: Sequence[Any], connection) -> pd.DataFrame:
+        """Run a spatial query through a prepared statement, serving it from the cache when the table has not changed."""
+        connection = connection or self.db_connection
+        return self._cached(
+            (name, query, tuple(params)), connection,
+            lambda: self._query_df(name, connection, query, params) if params else self._query_df(name, connection, query)
+        )
 
     def _debug_df(self, df: pd.DataFrame) -> None:
         self.logger.info(f"Result DataFrame:\n{df.shape}\n{df.head()}\n\n")
 
+    def export_query_to_parquet(self, query: str, path: Path, connection=None) -> int:
+        """
+        Stream the result of a query into a Parquet file as Arrow record batches.
+
+        Only one batch of row_group_size rows is held in memory at a time, and batches are
+        handed to the Parquet writer without a pandas round trip.
+
+        Args:
+            query: Query to export
+            path: Destination Parquet file
+            connection: Connection or cursor to run the query on (defaults to the shared connection)
+
+        Returns:
+            Number of rows written
+        """
+        import pyarrow.parquet as pq
+
+        rows = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Query and write are interleaved batch by batch, so they are timed together
+        with self.metrics.timer("analytics.export", output=Path(path).stem):
+            reader = _record_batch_reader((connection or self.db_connection).execute(query), self.row_group_size)
+            with pq.ParquetWriter(path, reader.schema, compression=self.compression) as writer:
+                for batch in reader:
+                    writer.write_batch(batch, row_group_size=self.row_group_size)
+                    rows += batch.num_rows
+        self.metrics.increment("analytics.rows_written", rows, output=Path(path).stem)
+        return rows
+
+    def export_partitioned(self, query: str, partition_column: str, file_prefix: str,
+                           output_dir: Optional[Path] = None, connection=None) -> List[Path]:
+        """
+        Stream the result of a query into Hive-style Parquet partitions.
+
+        Args:
+            query: Query to export
+            partition_column: Column of the result the files are partitioned by, e.g. Model_Year or County
+            file_prefix: Prefix of the Parquet file written in each partition
+            output_dir: Directory holding the partitions (defaults to output_dir)
+            connection: Connection or cursor to run the query on (defaults to the shared connection)
+
+        Returns:
+            Paths of the Parquet files written, one per partition
+        """
+        with self.metrics.timer("analytics.export", output=file_prefix):
+            reader = _record_batch_reader((connection or self.db_connection).execute(query), self.row_group_size)
+            return self._partitioned_writer(partition_column, file_prefix, output_dir).write(reader)
+
+    def _partitioned_writer(self, partition_column: str, file_prefix: str,
+                            output_dir: Optional[Path] = None) -> PartitionedParquetWriter:
+        from electric_vehicle_partitioned_writer import PartitionedParquetWriter
+
+        return PartitionedParquetWriter(
+            output_dir or self.output_dir, partition_column, file_prefix=file_prefix,
+            workers=self.partition_workers, compression=self.compression
+        )
+
+    def _write_report(self, output_name: str, partition_column: Optional[str], df: pd.DataFrame) -> None:
+        with self.metrics.timer("analytics.parquet_write", output=output_name):
+            if partition_column is None:
+                self.output_dir.mkdir(parents=True, exist_ok=True)
+                df.to_parquet(self.output_dir / f"{output_name}.parquet", index=False, engine='pyarrow',
+                              compression=self.compression, row_group_size=self.row_group_size)
+            else:
+                import pyarrow
+
+                table = pyarrow.Table.from_pandas(df, preserve_index=False)
+                self._partitioned_writer(partition_column, output_name).write(table)
+        self.metrics.increment("analytics.rows_written", len(df), output=output_name)
+
+    def _run_report(self, name: str, message: str, output_name: str, partition_column: Optional[str],
+                    connection=None) -> float:
+        """
+        Compute, log and write one report.
+
+        Returns:
+            Wall time spent on the report, in seconds
+        """
+        start_time = time.perf_counter()
+        self.logger.info(message)
+        # Approximate reports have no query to stream, they come from the sketches
+        streaming = self.streaming_export and not (self.approximate and name in self.APPROXIMATE_REPORTS)
+        if streaming and partition_column is not None:
+            self.export_partitioned(self.report_query(name), partition_column, output_name, connection=connection)
+        elif streaming:
+            rows = self.export_query_to_parquet(self.report_query(name), self.output_dir / f"{output_name}.parquet", connection)
+            self.logger.info(f"Exported {rows:,} rows to {output_name}.parquet")
+        else:
+            df = getattr(self, name)(connection)
+            self._debug_df(df)
+            self._write_report(output_name, partition_column, df)
+        elapsed = time.perf_counter() - start_time
+        self.metrics.observe("analytics.report", elapsed, report=name)
+        self.logger.info(f"Report {name} completed in {elapsed:.3f} seconds")
+        return elapsed
+
+    def _run_report_on_cursor(self, *report) -> float:
+        cursor = self._cursor()
+        try:
+            return self._run_report(*report, connection=cursor)
+        finally:
+            cursor.close()
+
     def run(self):
-        self.logger.info("Counting the number of electric cars per city...")
-        df_city_counts = self.count_cars_per_city()
-        self._debug_df(df_city_counts)
-        df_city_counts.to_parquet(self.output_dir / "electric_cars_per_city.parquet", index=False, engine='pyarrow', compression='snappy')
-        
-        self.logger.info("Finding the top 3 most popular electric vehicles...")
-        df_top_vehicles = self.top_3_most_popular_vehicles()
-        self._debug_df(df_top_vehicles)
-        df_top_vehicles.to_parquet(self.output_dir / "top_3_most_popular_vehicles.parquet", index=False)
-        
-        self.logger.info("Finding the most popular electric vehicle in each postal code...")
-        df_popular_by_postal = self.most_popular_vehicle_by_postal_code()
-        self._debug_df(df_popular_by_postal)
-        df_popular_by_postal.to_parquet(self.output_dir / "popular_vehicle_by_postal_code.parquet", index=False)
-        
-        self.logger.info("Counting the number of electric cars by model year...")
-        df_cars_by_model_year = self.count_cars_by_model_year()
-        self._debug_df(df_cars_by_model_year)
-        # Write to partitioned parquet files by Model_Year
-        for year, year_df in df_cars_by_model_year.groupby('Model_Year'):
-            year_dir = self.output_dir / f"model_year={year}"
-            year_dir.mkdir(parents=True, exist_ok=True)
-            year_df.to_parquet(year_dir / f"electric_cars_{year}.parquet", index=False)
+        start_time = time.perf_counter()
+        if self.single_scan and not self.use_rollup:
+            self._use_report_base()
+        try:
+            if self.workers > 1:
+                # Queries run on separate cursors and Parquet writes release the GIL,
+                # so reports overlap on the thread pool
+                with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    futures = [executor.submit(self._run_report_on_cursor, *report) for report in self.REPORTS]
+                    for future in futures:
+                        future.result()
+            else:
+                for report in self.REPORTS:
+                    self._run_report(*report)
+        finally:
+            self._use_table()
+
+        elapsed = time.perf_counter() - start_time
+        self.metrics.observe("analytics.total", elapsed)
+        self.metrics.record_peak_memory(phase="analytics")
+        self.logger.info(f"Analytics completed in {elapsed:.3f} seconds")
+        if self.cache is not None:
+            self.logger.info(f"Report cache statistics: {self.cache.stats}")
+
+
+@lru_cache(maxsize=256)
+def _compile_report(source: str, count_sql: str, group_by: Tuple[str, ...], per: Optional[str],
+                    predicates: Tuple[str, ...], limited: bool) -> str:
+    """Build the parameterized SQL of an ad-hoc report shape."""
+    unknown = [col for col in group_by + ((per,) if per else ()) if col not in ElectricVehicleAnalytics.REPORT_DIMENSIONS]
+    if not group_by or unknown:
+        raise ValueError(f"Reports group by columns of {ElectricVehicleAnalytics.REPORT_DIMENSIONS}, got {list(group_by)}")
+    if per is not None and (per not in group_by or not limited):
+        raise ValueError(f"per requires n and must be one of the group_by columns, got '{per}'")
+
+    # Groups are formed on the stored columns and returned as text, like REPORT_QUERIES
+    dimensions = ", ".join(group_by)
+    as_text = {col: col if col in ElectricVehicleAnalytics.NUMERIC_DIMENSIONS else f"CAST({col} AS VARCHAR)" for col in group_by}
+    query = f"SELECT {', '.join(f'{as_text[col]} AS {col}' for col in group_by)}, {count_sql} AS num_cars FROM {source}"
+    if predicates:
+        query += f" WHERE {' AND '.join(predicates)}"
+    query += f" GROUP BY {dimensions}"
+    # Ties are broken on the dimensions, as text, so every call and every layout returns the same groups
+    if per is not None:
+        query += f" QUALIFY ROW_NUMBER() OVER (PARTITION BY {per} ORDER BY num_cars DESC, {', '.join(as_text.values())}) <= ?"
+        return query + f" ORDER BY {per}, num_cars DESC, {dimensions}"
+    query += f" ORDER BY num_cars DESC, {dimensions}"
+    return query + " LIMIT ?" if limited else query
+
+
+def _sql_literal(value: Any) -> str:
+    """Render a report parameter as a SQL literal."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, float) and math.isfinite(value):
+        return repr(value)
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    raise TypeError(f"Unsupported report parameter {value!r}")
+
+
+def _spatial_columns(table: Optional[str] = None) -> str:
+    """Select list of the spatial index columns, with text columns returned as text."""
+    prefix = f"{table}." if table else ""
+    columns = [
+        f"{prefix}{col} AS {col}" if col in ("DOL_Vehicle_ID", "Model_Year") else f"CAST({prefix}{col} AS VARCHAR) AS {col}"
+        for col in SpatialGridIndex.COLUMNS
+    ]
+    return ", ".join(columns + [f"{prefix}Longitude AS Longitude", f"{prefix}Latitude AS Latitude"])
+
+
+def _record_batch_reader(result, batch_size: int) -> pyarrow.RecordBatchReader:
+    """Stream a DuckDB result as Arrow record batches, across DuckDB API versions."""
+    if hasattr(result, "to_arrow_reader"):
+        return result.to_arrow_reader(batch_size)
+    return result.fetch_record_batch(batch_size)
@@ -0,0 +1,345 @@
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import duckdb
+import pyarrow
+
+from electric_vehicle_analytics import ElectricVehicleAnalytics
+from electric_vehicle_data_loader import ElectricVehicleDataLoader
+from electric_vehicle_metrics import peak_rss_bytes
+
+# Value pools of the synthetic fleet, shaped like the Washington State EV population data
+COUNTIES = {
+    "King": (["Seattle", "Bellevue", "Redmond", "Kent", "Kirkland"], "981", "PUGET SOUND ENERGY INC||CITY OF SEATTLE - (WA)"),
+    "Pierce": (["Tacoma", "Puyallup", "Lakewood"], "984", "PUGET SOUND ENERGY INC||CITY OF TACOMA - (WA)"),
+    "Snohomish": (["Everett", "Bothell", "Lynnwood"], "982", "PUGET SOUND ENERGY INC"),
+    "Yakima": (["Yakima", "Selah"], "989", "PACIFICORP"),
+    "Spokane": (["Spokane", "Cheney"], "992", "AVISTA CORP"),
+}
+VEHICLES = [
+    ("TESLA", "MODEL Y", "Battery Electric Vehicle (BEV)", 291, 0),
+    ("TESLA", "MODEL 3", "Battery Electric Vehicle (BEV)", 322, 0),
+    ("NISSAN", "LEAF", "Battery Electric Vehicle (BEV)", 150, 0),
+    ("CHEVROLET", "BOLT EV", "Battery Electric Vehicle (BEV)", 259, 0),
+    ("KIA", "NIRO", "Plug-in Hybrid Electric Vehicle (PHEV)", 26, 0),
+    ("VOLVO", "S60", "Plug-in Hybrid Electric Vehicle (PHEV)", 22, 0),
+    ("BMW", "X5", "Plug-in Hybrid Electric Vehicle (PHEV)", 30, 69900),
+    ("FORD", "MUSTANG MACH-E", "Battery Electric Vehicle (BEV)", 0, 0),
+]
+CAFV_ELIGIBILITY = {
+    "eligible": "Clean Alternative Fuel Vehicle Eligible",
+    "low_range": "Not eligible due to low battery range",
+    "unknown": "Eligibility unknown as battery range has not been researched",
+}
+
+DEFAULT_SCALES = (100_000,)
+DEFAULT_BATCH_SIZES = (1_000, 5_000, 20_000)
+DEFAULT_LOAD_MODES = ("serial", "columnar", "parallel", "built_in")
+# Worker counts swept for the parallel mode, whose chunks do not depend on the batch size
+DEFAULT_WORKERS = (1, 2, 4)
+PERCENTILES = (50, 90, 99)
+
+# Entry point of the pipeline, and the modules whose import time is measured from a cold interpreter
+MAIN_SCRIPT = Path(__file__).resolve().parent / "main.py"
+STARTUP_MODULES = ("main", "electric_vehicle_data_loader", "electric_vehicle_analytics")
+
+
+def generate_csv(path: Union[str, Path], rows: int, seed: int = 0) -> Path:
+    """
+    Write a synthetic EV population CSV file with the headers of CSV_TO_DB_COLUMNS.
+
+    The same rows and seed always produce the same file. Some legislative districts are
+    left empty, as in the published data.
+
+    Args:
+        path: Destination CSV file
+        rows: Number of vehicle records
+        seed: Seed of the random generator
+
+    Returns:
+        The path of the file written
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    counties = list(COUNTIES.items())
+
+    with open(path, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(ElectricVehicleDataLoader.CSV_TO_DB_COLUMNS)
+        for vehicle_id in range(rows):
+            county, (cities, zip_prefix, utility) = rng.choice(counties)
+            make, model, ev_type, electric_range, msrp = rng.choice(VEHICLES)
+            if electric_range == 0:
+                eligibility = CAFV_ELIGIBILITY["unknown"]
+            elif electric_range < 30:
+                eligibility = CAFV_ELIGIBILITY["low_range"]
+            else:
+                eligibility = CAFV_ELIGIBILITY["eligible"]
+            writer.writerow([
+                "".join(rng.choices("0123456789ABCDEFGHJKLMNPRSTUVWXYZ", k=10)),
+                county,
+                rng.choice(cities),
+                "WA",
+                f"{zip_prefix}{rng.randrange(100):02d}",
+                rng.randint(2011, 2025),
+                make,
+                model,
+                ev_type,
+                eligibility,
+                electric_range,
+                msrp,
+                rng.randint(1, 49) if rng.random() > 0.01 else "",
+                100_000_000 + vehicle_id,
+                f"POINT (-{rng.uniform(117.0, 124.5):.5f} {rng.uniform(45.6, 49.0):.5f})",
+                utility,
+                f"53{rng.randrange(1, 78, 2):03d}{rng.randrange(1_000_000):06d}",
+            ])
+    return path
+
+
+def percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    """Summarize timing samples with their nearest-rank percentiles, mean, min and max."""
+    ordered = sorted(samples)
+    summary = {
+        f"p{p}": ordered[max(0, -(-p * len(ordered) // 100) - 1)] for p in PERCENTILES
+    }
+    summary.update(mean=sum(ordered) / len(ordered), min=ordered[0], max=ordered[-1])
+    return summary
+
+
+def _measure_load(csv_path: str, load_mode: str, batch_size: int, workers: Optional[int] = None) -> Tuple[float, int, int]:
+    """Time one load into a fresh in-memory database. Runs in its own process."""
+    connection = duckdb.connect()
+    loader = ElectricVehicleDataLoader(connection, csv_path, batch_size=batch_size, load_mode=load_mode, workers=workers)
+    loader.create_table()
+    start_time = time.perf_counter()
+    loader.load()
+    elapsed = time.perf_counter() - start_time
+    rows = connection.execute(f"SELECT COUNT(*) FROM {loader.TABLE_NAME}").fetchone()[0]
+    connection.close()
+    return elapsed, rows, peak_rss_bytes()
+
+
+def _measure_reports(csv_path: str, output_dir: str, repeats: int) -> Tuple[Dict[str, List[float]], int]:
+    """Time every analytics report over a loaded table. Runs in its own process."""
+    connection = duckdb.connect()
+    loader = ElectricVehicleDataLoader(connection, csv_path, load_mode="built_in")
+    loader.create_table()
+    loader.load()
+    analytics = ElectricVehicleAnalytics(connection, output_dir=output_dir)
+
+    timings: Dict[str, List[float]] = {}
+    for name, *_ in analytics.REPORTS:
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            getattr(analytics, name)()
+            timings.setdefault(name, []).append(time.perf_counter() - start_time)
+    connection.close()
+    return timings, peak_rss_bytes()
+
+
+def _measure_import(module: str) -> float:
+    """Time the import of a module in a fresh interpreter, from the directory of the pipeline."""
+    code = f"import time; start_time = time.perf_counter(); import {module}; print(time.perf_counter() - start_time)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=MAIN_SCRIPT.parent, check=True, capture_output=True, text=True)
+    return float(result.stdout)
+
+
+def _measure_command(*args: str) -> float:
+    """Time a main.py command end to end, interpreter startup included."""
+    start_time = time.perf_counter()
+    subprocess.run([sys.executable, str(MAIN_SCRIPT), *args], check=True, capture_output=True)
+    return time.perf_counter() - start_time
+
+
+class ElectricVehicleBenchmark:
+    """
+    Reproducible performance benchmark of the data loader and the analytics reports.
+
+    Synthetic CSV files are generated at each scale, then every load mode is timed across a
+    sweep of batch sizes and every report is timed over the loaded table. Each measurement
+    runs in a freshly spawned process, so timings do not depend on what ran before and the
+    peak RSS reported is that of the measurement alone. Startup is measured too: the import
+    time of the pipeline modules, and the cold start to first result of `main.py report`.
+    """
+
+    def __init__(self, work_dir: Union[str, Path] = "benchmark", scales: Sequence[int] = DEFAULT_SCALES,
+                 batch_sizes: Sequence[int] = DEFAULT_BATCH_SIZES, load_modes: Sequence[str] = DEFAULT_LOAD_MODES,
+                 repeats: int = 3, seed: int = 0, workers: Sequence[int] = DEFAULT_WORKERS) -> None:
+        """
+        Args:
+            work_dir: Directory holding the generated CSV files and report outputs
+            scales: Numbers of rows of the generated files
+            batch_sizes: Batch sizes swept for the load modes that batch their inserts
+            load_modes: Load modes timed, from ElectricVehicleDataLoader.LOAD_MODES
+            repeats: Number of timed runs per measurement
+            seed: Seed of the generated data
+            workers: Worker process counts swept for the parallel mode, to compare it with
+                the columnar mode it hands its chunks to
+
+        Raises:
+            ValueError: If a load mode is not supported
+        """
+        unsupported = set(load_modes) - set(ElectricVehicleDataLoader.LOAD_MODES)
+        if unsupported:
+            raise ValueError(f"Unsupported load modes {sorted(unsupported)}, expected some of {ElectricVehicleDataLoader.LOAD_MODES}")
+
+        self.logger = logging.getLogger(__name__)
+        self.work_dir = Path(work_dir)
+        self.scales = scales
+        self.batch_sizes = batch_sizes
+        self.load_modes = load_modes
+        self.repeats = repeats
+        self.seed = seed
+        self.workers = workers
+
+    def dataset(self, rows: int) -> Path:
+        """Generate the CSV file of a scale, reusing it when it already exists."""
+        path = self.work_dir / f"ev_population_{rows}_seed{self.seed}.csv"
+        if not path.exists():
+            self.logger.info(f"Generating {rows:,} synthetic vehicles into {path}...")
+            generate_csv(path.with_suffix(".tmp"), rows, self.seed).rename(path)
+        return path
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run every measurement.
+
+        Returns:
+            The results: the environment, then one entry per load measurement, per report
+            and per startup measurement
+        """
+        results: Dict[str, Any] = {"environment": self.environment(), "loads": [], "reports": [], "startup": []}
+        # A fresh interpreter per measurement; fork is unsafe once DuckDB has started its threads
+        context = multiprocessing.get_context("spawn")
+
+        for module in STARTUP_MODULES:
+            summary = percentiles([_measure_import(module) for _ in range(self.repeats)])
+            results["startup"].append({"rows": None, "command": f"import {module}", "seconds": summary})
+            self.logger.info(f"Import of {module}: {summary['p50']:.3f}s median")
+
+        for rows in self.scales:
+            csv_path = str(self.dataset(rows))
+            for load_mode, batch_size, workers in self._load_settings():
+                samples, peak_rss = [], 0
+                for _ in range(self.repeats):
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                        elapsed, loaded_rows, rss = executor.submit(
+                            _measure_load, csv_path, load_mode, batch_size or 5000, workers
+                        ).result()
+                    samples.append(elapsed)
+                    peak_rss = max(peak_rss, rss)
+
+                summary = percentiles(samples)
+                results["loads"].append({
+                    "rows": loaded_rows,
+                    "load_mode": load_mode,
+                    "batch_size": batch_size,
+                    "workers": workers,
+                    "seconds": summary,
+                    "rows_per_second": loaded_rows / summary["p50"],
+                    "peak_rss_bytes": peak_rss
+                })
+                self.logger.info(
+                    f"{load_mode} load of {rows:,} rows (batch size {batch_size}, workers {workers}): "
+                    f"{summary['p50']:.3f}s median, {loaded_rows / summary['p50']:,.0f} rows/s"
+                )
+
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                timings, peak_rss = executor.submit(
+                    _measure_reports, csv_path, str(self.work_dir / "analytics_output"), self.repeats
+                ).result()
+            for name, samples in timings.items():
+                summary = percentiles(samples)
+                results["reports"].append({
+                    "rows": rows,
+                    "report": name,
+                    "seconds": summary,
+                    "rows_per_second": rows / summary["p50"],
+                    "peak_rss_bytes": peak_rss
+                })
+                self.logger.info(f"Report {name} over {rows:,} rows: {summary['p50']:.3f}s median")
+
+            results["startup"].extend(self._measure_startup(csv_path, rows))
+
+        return results
+
+    def _load_settings(self) -> List[Tuple[str, Optional[int], Optional[int]]]:
+        """Load mode, batch size and worker count of every load measurement."""
+        settings = []
+        for load_mode in self.load_modes:
+            if load_mode == "built_in":
+                # The built-in COPY does not batch, it is timed once per scale
+                settings.append((load_mode, None, None))
+            elif load_mode == "parallel":
+                settings.extend((load_mode, None, workers) for workers in self.workers)
+            else:
+                settings.extend((load_mode, batch_size, None) for batch_size in self.batch_sizes)
+        return settings
+
+    def _measure_startup(self, csv_path: str, rows: int) -> List[Dict[str, Any]]:
+        """Time `main.py report` for every report, from a cold interpreter to the printed result."""
+        db_path = self.work_dir / f"ev_population_{rows}_seed{self.seed}.duckdb"
+        db_path.unlink(missing_ok=True)
+        _measure_command("load", "--csv", csv_path, "--db", str(db_path), "--load-mode", "built_in")
+
+        results = []
+        for name, *_ in ElectricVehicleAnalytics.REPORTS:
+            summary = percentiles([_measure_command("report", name, "--db", str(db_path)) for _ in range(self.repeats)])
+            results.append({"rows": rows, "command": f"report {name}", "seconds": summary})
+            self.logger.info(f"Cold start to first result of {name} over {rows:,} rows: {summary['p50']:.3f}s median")
+        return results
+
+    def write(self, results: Dict[str, Any], path: Union[str, Path]) -> None:
+        """Write benchmark results as JSON."""
+        Path(path).write_text(json.dumps(results, indent=2))
+        self.logger.info(f"Benchmark results written to {path}")
+
+    @staticmethod
+    def environment() -> Dict[str, Any]:
+        """Versions and hardware the results were measured on."""
+        return {
+            "python": platform.python_version(),
+            "duckdb": duckdb.__version__,
+            "pyarrow": pyarrow.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the electric vehicle loader and analytics reports.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SCALES, help="Scales of the generated files")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--load-modes", nargs="+", default=DEFAULT_LOAD_MODES, choices=ElectricVehicleDataLoader.LOAD_MODES)
+    parser.add_argument("--workers", type=int, nargs="+", default=DEFAULT_WORKERS, help="Worker counts of the parallel mode")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work-dir", default="benchmark")
+    parser.add_argument("--output", default="benchmark/results.json")
+    args = parser.parse_args(argv)
+
+    benchmark = ElectricVehicleBenchmark(
+        args.work_dir, scales=args.rows, batch_sizes=args.batch_sizes, load_modes=args.load_modes,
+        repeats=args.repeats, seed=args.seed, workers=args.workers
+    )
+    benchmark.write(benchmark.run(), args.output)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    main()
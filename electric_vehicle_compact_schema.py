@@ -0,0 +1,204 @@
+import duckdb
+
+from typing import Dict, List, Mapping, Tuple
+
+
+class CompactSchema:
+    """
+    Compact storage layout of the electric vehicles table.
+
+    Low-cardinality text columns are stored as ENUM types whose values are discovered
+    from the loaded rows. Numeric-like codes are stored as the smallest unsigned integer
+    type that holds them, as long as none has a leading zero, and as an ENUM otherwise.
+    Vehicle_Location is kept as written and parsed once into Longitude and Latitude DOUBLE
+    columns, added after the standard ones. Reports group by dictionary codes and integers
+    instead of strings, and the table takes fewer blocks.
+
+    Every stored type casts back to the original text, so expanding the table to the
+    standard layout is lossless. Rows loaded later are appended in place while their
+    values fit the stored types, and the table is only rewritten when they do not.
+    """
+
+    # Low-cardinality text columns stored as ENUM types
+    DICTIONARY_COLUMNS = (
+        "County", "City", "State", "Make", "Model", "Electric_Vehicle_Type", "CAFV_Eligibility", "Electric_Utility"
+    )
+    # Numeric-like text codes stored as unsigned integers when that is lossless
+    CODE_COLUMNS = ("Postal_Code", "Legislative_District", "Census_Tract")
+    LOCATION_COLUMN = "Vehicle_Location"
+    COORDINATE_COLUMNS = ("Longitude", "Latitude")
+    LOCATION_PATTERN = r"^POINT \(([^ ]+) ([^ )]+)\)$"
+
+    # Columns with more distinct values are not worth a dictionary and stay VARCHAR
+    ENUM_MAX_VALUES = 65536
+    # Unsigned integer types by the largest value they hold, smallest first
+    INTEGER_TYPES = (("UTINYINT", 2 ** 8 - 1), ("USMALLINT", 2 ** 16 - 1), ("UINTEGER", 2 ** 32 - 1), ("UBIGINT", 2 ** 64 - 1))
+    # Integer codes that cast back to the same text: no sign, no leading zero, at most 19 digits
+    CODE_PATTERN = "0|[1-9][0-9]{0,18}"
+
+    def __init__(self, table_name: str, column_types: Mapping[str, str]) -> None:
+        """
+        Args:
+            table_name: Table to compact
+            column_types: Database column types of the standard layout, in table order
+        """
+        self.table_name = table_name
+        self.column_types = dict(column_types)
+
+    def is_compact(self, connection: duckdb.DuckDBPyConnection) -> bool:
+        """Whether the table currently has the compact layout, i.e. not exactly the standard columns."""
+        columns = connection.execute(
+            "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = ? ORDER BY column_index",
+            [self.table_name]
+        ).fetchall()
+        return bool(columns) and dict(columns) != self.column_types
+
+    def discover(self, connection: duckdb.DuckDBPyConnection) -> Dict[str, str]:
+        """
+        Choose the compact type of the dictionary and code columns from the table contents.
+
+        Returns:
+            The compact type by column, "ENUM" for the columns stored as a dictionary. Columns
+            that stay VARCHAR are left out
+        """
+        columns = [col for col in self.DICTIONARY_COLUMNS + self.CODE_COLUMNS if col in self.column_types]
+        codes = [col for col in self.CODE_COLUMNS if col in self.column_types]
+        if not columns:
+            return {}
+
+        # One scan computes every figure: distinct counts, then whether and how codes fit an integer
+        aggregates = [f"COUNT(DISTINCT {col})" for col in columns]
+        for col in codes:
+            aggregates += [
+                f"COALESCE(bool_and(regexp_full_match({col}, '{self.CODE_PATTERN}')), TRUE)",
+                f"MAX(TRY_CAST({col} AS UBIGINT))",
+            ]
+        row = connection.execute(f"SELECT {', '.join(aggregates)} FROM {self.table_name}").fetchone()
+        distinct_counts = dict(zip(columns, row))
+        code_stats: Dict[str, Tuple[bool, int]] = {
+            col: (row[len(columns) + 2 * i], row[len(columns) + 2 * i + 1]) for i, col in enumerate(codes)
+        }
+
+        compact_types: Dict[str, str] = {}
+        for col in columns:
+            lossless, max_value = code_stats.get(col, (False, None))
+            if lossless:
+                compact_types[col] = next(name for name, limit in self.INTEGER_TYPES if (max_value or 0) <= limit)
+            elif 0 < distinct_counts[col] <= self.ENUM_MAX_VALUES:
+                compact_types[col] = "ENUM"
+        return compact_types
+
+    def compact(self, connection: duckdb.DuckDBPyConnection) -> Dict[str, str]:
+        """
+        Rewrite the table in the compact layout, rediscovering the column types.
+
+        Returns:
+            The compact type by column, as chosen by discover()
+        """
+        connection.execute("BEGIN TRANSACTION")
+        try:
+            compact_types = self._compact(connection)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return compact_types
+
+    def expand(self, connection: duckdb.DuckDBPyConnection) -> None:
+        """Rewrite the table in the standard layout, if it is compact."""
+        connection.execute("BEGIN TRANSACTION")
+        try:
+            self._expand(connection)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def append(self, connection: duckdb.DuckDBPyConnection, source: str, where: str = "TRUE") -> bool:
+        """
+        Append rows in the standard layout to the compact table, in the current transaction.
+
+        The rows are cast to the stored types when all their values fit them. Otherwise, e.g.
+        for a city missing from its ENUM, the table is expanded, the rows are appended and the
+        table is compacted again with rediscovered types.
+
+        Args:
+            connection: Connection holding the table
+            source: Table or registered relation holding the rows
+            where: Condition selecting the rows of the source
+
+        Returns:
+            Whether the table had to be rewritten
+        """
+        stored_types = dict(connection.execute(
+            "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = ?", [self.table_name]
+        ).fetchall())
+        misfits = []
+        for col, col_type in self.column_types.items():
+            if stored_types[col] == col_type:
+                continue
+            if stored_types[col].startswith("ENUM"):
+                fits = f"TRY_CAST({col} AS {self.enum_type(col)}) IS NOT NULL"
+            else:
+                fits = f"regexp_full_match({col}, '{self.CODE_PATTERN}') AND TRY_CAST({col} AS {stored_types[col]}) IS NOT NULL"
+            misfits.append(f"COUNT(*) FILTER (WHERE {col} IS NOT NULL AND NOT ({fits}))")
+
+        columns = ", ".join(self.column_types)
+        if not misfits or not connection.execute(
+            f"SELECT {' + '.join(misfits)} FROM {source} WHERE {where}"
+        ).fetchone()[0]:
+            connection.execute(f"""
+                INSERT INTO {self.table_name} ({columns}, {', '.join(self.COORDINATE_COLUMNS)})
+                SELECT {columns}, {', '.join(self._coordinates())} FROM {source} WHERE {where}
+            """)
+            return False
+
+        self._expand(connection)
+        connection.execute(f"INSERT INTO {self.table_name} ({columns}) SELECT {columns} FROM {source} WHERE {where}")
+        self._compact(connection)
+        return True
+
+    def enum_type(self, col: str) -> str:
+        """Name of the ENUM type of a dictionary column."""
+        return f"{self.table_name}_{col.lower()}"
+
+    def _compact(self, connection: duckdb.DuckDBPyConnection) -> Dict[str, str]:
+        """Rewrite the table in the compact layout, in the current transaction."""
+        self._expand(connection)
+        compact_types = self.discover(connection)
+
+        columns: List[str] = []
+        for col in self.column_types:
+            compact_type = compact_types.get(col)
+            if compact_type == "ENUM":
+                # Values are sorted, so ordering by the codes orders by the text
+                enum_type = self.enum_type(col)
+                connection.execute(f"""
+                    CREATE OR REPLACE TYPE {enum_type} AS ENUM (
+                        SELECT DISTINCT {col} FROM {self.table_name} WHERE {col} IS NOT NULL ORDER BY {col}
+                    )
+                """)
+                columns.append(f"CAST({col} AS {enum_type}) AS {col}")
+            elif compact_type is not None:
+                columns.append(f"CAST({col} AS {compact_type}) AS {col}")
+            else:
+                columns.append(col)
+        if self.LOCATION_COLUMN in self.column_types:
+            columns += self._coordinates()
+
+        connection.execute(f"CREATE OR REPLACE TABLE {self.table_name} AS SELECT {', '.join(columns)} FROM {self.table_name}")
+        return compact_types
+
+    def _expand(self, connection: duckdb.DuckDBPyConnection) -> None:
+        """Rewrite the table in the standard layout if it is compact, in the current transaction."""
+        if not self.is_compact(connection):
+            return
+        columns = ", ".join(f"CAST({col} AS {col_type}) AS {col}" for col, col_type in self.column_types.items())
+        connection.execute(f"CREATE OR REPLACE TABLE {self.table_name} AS SELECT {columns} FROM {self.table_name}")
+
+    def _coordinates(self) -> List[str]:
+        """Expressions parsing the coordinates out of the locations, NULL for those that are not a POINT."""
+        return [
+            f"TRY_CAST(regexp_extract({self.LOCATION_COLUMN}, '{self.LOCATION_PATTERN}', {group}) AS DOUBLE) AS {name}"
+            for group, name in enumerate(self.COORDINATE_COLUMNS, start=1)
+        ]
@@ -1,11 +1,27 @@
 import csv
 import duckdb
+import glob
+import io
+import mmap
 import os
+import pyarrow as pa
 import time
+import uuid
 import logging
+import multiprocessing
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from itertools import islice
-from typing import Dict, List, Any, Optional, Union
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Any, Optional, Sequence, Tuple, Union
+
+from electric_vehicle_compact_schema import CompactSchema
+from electric_vehicle_data_loader_strategies import DataLoaderStrategy, is_plain_csv, is_supported_input
+from electric_vehicle_load_statistics import LoadStatistics, subtract_rows
+from electric_vehicle_metrics import Metrics
+from electric_vehicle_sketches import VehicleSketches
+from electric_vehicle_spatial_index import SpatialGridIndex
+from electric_vehicle_type_converter import TypeConversionPlan
 
 class ElectricVehicleDataLoader:
     """
@@ -13,27 +29,43 @@ class ElectricVehicleDataLoader:
     """
 
     TABLE_NAME = "electric_vehicles"
+
+    # Database column types, in table order
+    DB_COLUMN_TYPES = {
+        "VIN": "VARCHAR",
+        "County": "VARCHAR",
+        "City": "VARCHAR",
+        "State": "VARCHAR",
+        "Postal_Code": "VARCHAR",
+        "Model_Year": "INTEGER",
+        "Make": "VARCHAR",
+        "Model": "VARCHAR",
+        "Electric_Vehicle_Type": "VARCHAR",
+        "CAFV_Eligibility": "VARCHAR",
+        "Electric_Range": "INTEGER",
+        "Base_MSRP": "INTEGER",
+        "Legislative_District": "VARCHAR",
+        "DOL_Vehicle_ID": "BIGINT",
+        "Vehicle_Location": "VARCHAR",
+        "Electric_Utility": "VARCHAR",
+        "Census_Tract": "VARCHAR"
+    }
+
     CREATE_TABLE_SQL = f"""
         CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
-            VIN VARCHAR,
-            County VARCHAR,
-            City VARCHAR,
-            State VARCHAR,
-            Postal_Code VARCHAR,
-            Model_Year INTEGER,
-            Make VARCHAR,
-            Model VARCHAR,
-            Electric_Vehicle_Type VARCHAR,
-            CAFV_Eligibility VARCHAR,
-            Electric_Range INTEGER,
-            Base_MSRP INTEGER,
-            Legislative_District VARCHAR,
-            DOL_Vehicle_ID BIGINT,
-            Vehicle_Location VARCHAR,
-            Electric_Utility VARCHAR,
-            Census_Tract VARCHAR
+            %s
         );
-    """
+    """ % ",\n            ".join(f"{col} {col_type}" for col, col_type in DB_COLUMN_TYPES.items())
+
+    # Storage layouts of the table, selected through the schema argument
+    SCHEMAS = ("standard", "compact")
+    COMPACT_SCHEMA = CompactSchema(TABLE_NAME, DB_COLUMN_TYPES)
+    # Compact table set aside while a load appends the standard layout to an empty table
+    COMPACT_TABLE = f"{TABLE_NAME}_compact"
+
+    # Vectorized converters compiled once from the table schema, used by the columnar load paths
+    CONVERSION_PLAN = TypeConversionPlan(DB_COLUMN_TYPES)
+    ARROW_SCHEMA = CONVERSION_PLAN.schema
 
     # Map CSV headers to column names in the database
     CSV_TO_DB_COLUMNS = {
@@ -56,29 +88,221 @@ class ElectricVehicleDataLoader:
         "2020 Census Tract": "Census_Tract"
     }
 
-    def __init__(self, db_connection: duckdb.DuckDBPyConnection, csv_path: str, batch_size: int = 5000) -> None:
+    # Type converters for the non-VARCHAR columns
+    COLUMN_CONVERTERS = {
+        "Model_Year": int,
+        "Electric_Range": int,
+        "Base_MSRP": int,
+        "DOL_Vehicle_ID": int
+    }
+
+    # Supported load strategies, selected through the load_mode argument
+    LOAD_MODES = ("serial", "parallel", "columnar", "incremental", "checkpointed", "built_in")
+
+    # Key and bookkeeping table used by the incremental load mode
+    KEY_COLUMN = "DOL_Vehicle_ID"
+    ROW_HASHES_TABLE = f"{TABLE_NAME}_row_hashes"
+    CREATE_ROW_HASHES_TABLE_SQL = f"""
+        CREATE TABLE IF NOT EXISTS {ROW_HASHES_TABLE} (
+            {KEY_COLUMN} BIGINT,
+            Row_Hash VARCHAR
+        );
+    """
+    # Content hash over every column, NULLs included, as rendered in the standard layout
+    ROW_HASH_SQL = f"md5(CAST(ROW({', '.join(f'CAST({col} AS {col_type})' for col, col_type in DB_COLUMN_TYPES.items())}) AS VARCHAR))"
+
+    # Progress of checkpointed loads, one row per source file
+    CHECKPOINTS_TABLE = f"{TABLE_NAME}_load_checkpoints"
+    CREATE_CHECKPOINTS_TABLE_SQL = f"""
+        CREATE TABLE IF NOT EXISTS {CHECKPOINTS_TABLE} (
+            CSV_Path VARCHAR,
+            File_Size BIGINT,
+            File_Mtime DOUBLE,
+            Byte_Offset BIGINT,
+            Rows_Loaded BIGINT,
+            Completed BOOLEAN,
+            Load_Statistics VARCHAR,
+            Updated_At TIMESTAMP
+        );
+    """
+
+    # Files of a directory or glob input that were merged into the table, so later runs skip them
+    INGESTED_FILES_TABLE = f"{TABLE_NAME}_ingested_files"
+    CREATE_INGESTED_FILES_TABLE_SQL = f"""
+        CREATE TABLE IF NOT EXISTS {INGESTED_FILES_TABLE} (
+            File_Path VARCHAR,
+            File_Size BIGINT,
+            File_Mtime DOUBLE,
+            Rows_Loaded BIGINT,
+            Ingested_At TIMESTAMP
+        );
+    """
+    # Prefix of the staging tables a directory or glob input loads its shards into. They live
+    # in the database file, since every shard is staged on a cursor of its own
+    STAGING_TABLE_PREFIX = f"{TABLE_NAME}_shard_"
+
+    # One row per completed run(), identifying the table version
+    LOADS_TABLE = f"{TABLE_NAME}_loads"
+    CREATE_LOADS_TABLE_SQL = f"""
+        CREATE TABLE IF NOT EXISTS {LOADS_TABLE} (
+            Load_ID VARCHAR,
+            Load_Mode VARCHAR,
+            CSV_Path VARCHAR,
+            Loaded_At TIMESTAMP
+        );
+    """
+
+    # Vehicle counts by the dimensions every report groups by, maintained at load time so
+    # the analytics can answer from them instead of scanning the table
+    ROLLUP_TABLE = f"{TABLE_NAME}_rollup"
+    ROLLUP_DIMENSIONS = ("City", "Postal_Code", "Make", "Model", "Model_Year")
+    CREATE_ROLLUP_TABLE_SQL = f"""
+        CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+            City VARCHAR,
+            Postal_Code VARCHAR,
+            Make VARCHAR,
+            Model VARCHAR,
+            Model_Year INTEGER,
+            num_cars BIGINT
+        );
+    """
+    # Signed counts of the rows added and removed since the rollup was last merged
+    ROLLUP_DELTA_TABLE = f"{TABLE_NAME}_rollup_delta"
+    # Latest load of LOADS_TABLE when the rollup was last brought in sync with the table
+    ROLLUP_VERSION_TABLE = f"{TABLE_NAME}_rollup_version"
+    CREATE_ROLLUP_VERSION_TABLE_SQL = f"""
+        CREATE TABLE IF NOT EXISTS {ROLLUP_VERSION_TABLE} (
+            Load_ID VARCHAR
+        );
+    """
+
+    # Sketches of the table for the approximate analytics, saved with every commit of a load
+    SKETCHES_TABLE = f"{TABLE_NAME}_sketches"
+    CREATE_SKETCHES_TABLE_SQL = f"""
+        CREATE TABLE IF NOT EXISTS {SKETCHES_TABLE} (
+            Sketches VARCHAR,
+            Rows_Sketched BIGINT,
+            Updated_At TIMESTAMP
+        );
+    """
+
+    # Grid index of the vehicle locations, rebuilt by run() for the spatial analytics
+    SPATIAL_INDEX = SpatialGridIndex(TABLE_NAME)
+
+    # CSV readers feeding the columnar load modes, selected through the reader argument
+    READERS = ("python", "mmap")
+    # Load modes that can read through a DataLoaderStrategy, i.e. without byte offsets
+    STRATEGY_LOAD_MODES = ("columnar", "incremental")
+
+    # Approximate size of the byte ranges handed to each worker in parallel mode
+    PARALLEL_CHUNK_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, db_connection: duckdb.DuckDBPyConnection, csv_path: str, batch_size: int = 5000,
+                 load_mode: str = "serial", workers: Optional[int] = None, checkpoint_every: int = 10,
+                 maintain_rollup: bool = True, metrics: Optional[Metrics] = None, reader: str = "python",
+                 strategy: Optional[DataLoaderStrategy] = None, schema: str = "standard",
+                 maintain_spatial_index: bool = True, maintain_sketches: bool = False) -> None:
         """
         Initialize the data loader with database connection and file parameters.
 
         Args:
             db_connection: Database connection instance
-            csv_path: Path to the CSV file to load
+            csv_path: Path to the file to load: CSV, or any format of DataLoaderStrategy, possibly
+                compressed. A directory or a glob pattern loads every supported file it matches
+                as a shard, with the columnar mode
             batch_size: Number of records to process in each batch
+            load_mode: Load strategy used by run(), one of LOAD_MODES
+            workers: Number of worker processes for the parallel mode, or of shards loaded at
+                once from a directory or glob (defaults to the CPU count)
+            checkpoint_every: Number of batches committed together by the checkpointed mode
+            maintain_rollup: Whether run() keeps ROLLUP_TABLE up to date with the table
+            metrics: Receives the timings of every load phase (read, parse, convert, insert,
+                commit, validate) and the row, byte and coerced NULL counters
+            reader: CSV reader of the columnar and incremental modes, one of READERS
+            strategy: Reader of the input file (defaults to the strategy of the file extension
+                when the file is not a plain CSV file, or when the mmap reader is selected)
+            schema: Storage layout run() leaves the table in, one of SCHEMAS (see CompactSchema).
+                A table that is already compact stays compact, COMPACT_SCHEMA.expand() restores
+                the standard layout
+            maintain_spatial_index: Whether run() rebuilds SPATIAL_INDEX from the table
+            maintain_sketches: Whether run() keeps the VehicleSketches in SKETCHES_TABLE up to
+                date with the table, for the approximate analytics
+
+        Raises:
+            ValueError: If the load mode, reader, input format or schema is not supported, or
+                they don't go together
         """
+        if load_mode not in self.LOAD_MODES:
+            raise ValueError(f"Unsupported load mode '{load_mode}', expected one of {self.LOAD_MODES}")
+        if reader not in self.READERS:
+            raise ValueError(f"Unsupported reader '{reader}', expected one of {self.READERS}")
+        if schema not in self.SCHEMAS:
+            raise ValueError(f"Unsupported schema '{schema}', expected one of {self.SCHEMAS}")
+
         self.logger = logging.getLogger(__name__)
         self.db_connection = db_connection
         self.csv_path = csv_path
         self.batch_size = batch_size
+        self.load_mode = load_mode
+        self.workers = workers or os.cpu_count() or 1
+        self.checkpoint_every = checkpoint_every
+        self.maintain_rollup = maintain_rollup
+        self.maintain_spatial_index = maintain_spatial_index
+        self.maintain_sketches = maintain_sketches
+        self.metrics = metrics or Metrics()
+        self.reader = reader
+        self.schema = schema
+        self.coerced_nulls: Dict[str, int] = {}
+        self.last_load_changes: Dict[str, int] = {}
+        self.load_statistics: Optional[LoadStatistics] = None
+        self._baseline_aggregates: Tuple[int, ...] = ()
+        self._tracking_rollup_delta = False
+        self._rollup_delta_applied = False
+        # Sketches updated with every batch inserted, while run() maintains them
+        self.sketches: Optional[VehicleSketches] = None
         self._validate_csv_path()
 
+        if self.multi_file and load_mode != "columnar":
+            raise ValueError(f"Directory and glob inputs are only supported by the columnar load mode, not '{load_mode}'")
+        if strategy is None and not self.multi_file and (reader == "mmap" or not is_plain_csv(csv_path)):
+            strategy = DataLoaderStrategy.for_path(
+                csv_path, conversion_plan=self.CONVERSION_PLAN, column_names=self.CSV_TO_DB_COLUMNS, batch_size=batch_size
+            )
+        if strategy is not None and load_mode not in self.STRATEGY_LOAD_MODES:
+            raise ValueError(
+                f"{type(strategy).__name__} input is only supported by the {self.STRATEGY_LOAD_MODES} load modes"
+            )
+        self.strategy = strategy
+
+    @property
+    def insert_query(self) -> str:
+        """Parameterized INSERT statement covering every mapped column."""
+        db_columns = list(self.CSV_TO_DB_COLUMNS.values())
+        placeholders = ", ".join(["?"] * len(db_columns))
+        return f"INSERT INTO {self.TABLE_NAME} ({', '.join(db_columns)}) VALUES ({placeholders})"
+
     def _validate_csv_path(self) -> None:
         """
-        Validate that the CSV file exists at the specified path.
+        Validate that the CSV file exists at the specified path, and list the input files.
+
+        A directory stands for the supported files it contains, a glob pattern for the files
+        it matches; either one sets multi_file.
 
         Raises:
-            FileNotFoundError: If the CSV file does not exist
+            FileNotFoundError: If the CSV file does not exist, or no input file matches
         """
-        if not os.path.isfile(self.csv_path):
+        if os.path.isdir(self.csv_path):
+            self.multi_file = True
+            paths = [os.path.join(self.csv_path, name) for name in os.listdir(self.csv_path) if is_supported_input(name)]
+        elif any(char in self.csv_path for char in "*?["):
+            self.multi_file = True
+            paths = glob.glob(self.csv_path)
+        else:
+            self.multi_file = False
+            paths = [self.csv_path]
+
+        self.input_files = sorted(path for path in paths if os.path.isfile(path))
+        if not self.input_files:
             raise FileNotFoundError(f"The file {self.csv_path} does not exist.")
 
     def create_table(self) -> None:
@@ -87,7 +311,157 @@ class ElectricVehicleDataLoader:
         self.db_connection.execute(self.CREATE_TABLE_SQL)
         self.logger.info("Table creation completed")
 
-    def _convert_value(self, col: str, val: Any) -> Optional[Union[int, str]]:
+    def _insert_table(self, table: pa.Table, table_name: Optional[str] = None, summarized: bool = False) -> None:
+        """
+        Insert a columnar batch with a single INSERT ... SELECT over an in-memory relation.
+
+        Args:
+            table: Batch typed according to ARROW_SCHEMA
+            table_name: Target table (defaults to TABLE_NAME)
+            summarized: Whether the caller already added the batch to the load statistics,
+                the sketches and the rollup delta
+        """
+        columns = ", ".join(table.column_names)
+        if self.load_statistics is not None and not summarized:
+            self.load_statistics.update(table)
+        if self.sketches is not None and not summarized:
+            with self.metrics.timer("load.sketch"):
+                self.sketches.update(table)
+        self.db_connection.register("electric_vehicles_batch", table)
+        try:
+            with self.metrics.timer("load.insert", table=table_name or self.TABLE_NAME):
+                self.db_connection.execute(
+                    f"INSERT INTO {table_name or self.TABLE_NAME} ({columns}) SELECT {columns} FROM electric_vehicles_batch"
+                )
+                if table_name is None and not summarized:
+                    self._track_rollup_delta("electric_vehicles_batch")
+        finally:
+            self.db_connection.unregister("electric_vehicles_batch")
+        self.metrics.increment("load.rows", table.num_rows, table=table_name or self.TABLE_NAME)
+
+    def _commit(self) -> None:
+        """Commit the current transaction, timing it."""
+        with self.metrics.timer("load.commit"):
+            self.db_connection.execute("COMMIT")
+
+    def _read_batches(self, start_offset: int = 0) -> Iterator[Tuple[pa.Table, Optional[int]]]:
+        """
+        Read the CSV file as typed Arrow batches of batch_size records.
+
+        Records are assembled from raw lines so the byte offset reached after each batch is
+        known, which lets a load resume from a checkpoint. Values coerced to NULL during
+        conversion are accumulated in coerced_nulls. Files read through a strategy (the mmap
+        reader, other formats) are read by _read_strategy_batches() instead and carry no byte
+        offset.
+
+        Args:
+            start_offset: Byte offset of the first record to read (0 to start after the header)
+
+        Yields:
+            Columnar batches following ARROW_SCHEMA, with the byte offset just past each batch
+        """
+        if self.strategy is not None:
+            yield from ((batch, None) for batch in self._read_strategy_batches())
+            return
+
+        with open(self.csv_path, "rb") as csvfile:
+            header = _read_record(csvfile)
+            fieldnames = next(csv.reader(io.StringIO(header.decode("utf-8"), newline="")), [])
+            offset = max(start_offset, csvfile.tell())
+            csvfile.seek(offset)
+
+            lines: List[bytes] = []
+            records = 0
+            in_quotes = False
+            batch_start, read_start = offset, time.perf_counter()
+            for line in csvfile:
+                lines.append(line)
+                offset += len(line)
+                # Newlines inside quoted fields do not end the record
+                in_quotes ^= line.count(b'"') % 2 == 1
+                if in_quotes:
+                    continue
+
+                records += 1
+                if records == self.batch_size:
+                    self._record_read(offset - batch_start, read_start)
+                    yield self._convert_lines(lines, fieldnames), offset
+                    lines, records = [], 0
+                    batch_start, read_start = offset, time.perf_counter()
+
+            if lines:
+                self._record_read(offset - batch_start, read_start)
+                yield self._convert_lines(lines, fieldnames), offset
+
+    def _record_read(self, num_bytes: int, start_time: float) -> None:
+        self.metrics.observe("load.read", time.perf_counter() - start_time)
+        self.metrics.increment("load.bytes", num_bytes)
+
+    def _read_strategy_batches(self) -> Iterator[pa.Table]:
+        """
+        Read the input file as typed Arrow batches through the loader strategy.
+
+        Yields:
+            Columnar batches following ARROW_SCHEMA
+        """
+        record_batches = self.strategy.record_batches()
+        position = 0
+        while True:
+            # Reading, decompressing and tokenizing happen together in the strategy
+            with self.metrics.timer("load.parse"):
+                record_batch = next(record_batches, None)
+            if record_batch is None:
+                break
+            # Strategies read blocks ahead of the batches they return, so this is approximate
+            self.metrics.increment("load.bytes", self.strategy.bytes_read - position)
+            position = self.strategy.bytes_read
+
+            with self.metrics.timer("load.convert"):
+                batch, coerced = self.strategy.convert(record_batch)
+            self._record_coerced_nulls(coerced)
+            yield batch
+
+    def _convert_lines(self, lines: List[bytes], fieldnames: List[str]) -> pa.Table:
+        """Parse and convert the raw lines of a batch of records."""
+        with self.metrics.timer("load.parse"):
+            text = b"".join(lines).decode("utf-8")
+            records = list(csv.reader(io.StringIO(text, newline="")))
+        with self.metrics.timer("load.convert"):
+            batch, coerced = _records_to_table(records, fieldnames)
+        self._record_coerced_nulls(coerced)
+        return batch
+
+    def _reset_load_statistics(self, baseline: bool = True) -> None:
+        """
+        Start collecting statistics for a new load.
+
+        Args:
+            baseline: Whether the load appends to the current table contents, in which case
+                their aggregates are captured so validation only checks the appended rows
+        """
+        self.coerced_nulls = {}
+        self.load_statistics = LoadStatistics(self.ARROW_SCHEMA, key=self.KEY_COLUMN)
+        self._baseline_aggregates = self._table_aggregates() if baseline else ()
+
+    def _table_aggregates(self) -> Tuple[int, ...]:
+        """Compute the load statistics figures over the table with one aggregate query."""
+        return self.db_connection.execute(self.load_statistics.aggregate_query(self.TABLE_NAME)).fetchone()
+
+    def _record_coerced_nulls(self, coerced: Dict[str, int]) -> None:
+        """Accumulate the per-column count of values coerced to NULL during conversion."""
+        for col, count in coerced.items():
+            self.coerced_nulls[col] = self.coerced_nulls.get(col, 0) + count
+            if count:
+                self.metrics.increment("load.coerced_nulls", count, column=col)
+
+    def _log_coerced_nulls(self) -> None:
+        """Report the columns where unparseable values were stored as NULL."""
+        bad_columns = {col: count for col, count in self.coerced_nulls.items() if count}
+        if bad_columns:
+            self.logger.warning(f"Values coerced to NULL during conversion: {bad_columns}")
+
+    @classmethod
+    def _convert_value(cls, col: str, val: Any) -> Optional[Union[int, str]]:
         """
         Convert values to appropriate types for database insertion.
 
@@ -100,19 +474,12 @@ class ElectricVehicleDataLoader:
         """
         if not val:
             return None
-        
-        # Define converters for specific columns
-        converters = {
-            "Model_Year": int,
-            "Electric_Range": int,
-            "Base_MSRP": int,
-            "DOL_Vehicle_ID": int
-        }
-        
+
         # Apply conversion if a converter is defined for the column
-        if col in converters:
+        converter = cls.COLUMN_CONVERTERS.get(col)
+        if converter:
             try:
-                return converters[col](val)
+                return converter(val)
             except (ValueError, TypeError):
                 return None  
         else:
@@ -140,13 +507,12 @@ class ElectricVehicleDataLoader:
             Exception: If any error occurs during data loading
         """
         self.logger.info(f"Starting data load process for table: {self.TABLE_NAME}")
-        
-        db_columns = list(self.CSV_TO_DB_COLUMNS.values())
-        placeholders = ", ".join(["?"] * len(db_columns))
-        insert_query = f"INSERT INTO {self.TABLE_NAME} ({', '.join(db_columns)}) VALUES ({placeholders})"
-        
+
+        insert_query = self.insert_query
+
         start_time = time.perf_counter()
         rows_processed = 0
+        self._reset_load_statistics()
 
         # Use transactions for ensure data integrity
         self.db_connection.execute("BEGIN TRANSACTION")
@@ -156,19 +522,24 @@ class ElectricVehicleDataLoader:
 
                 # Process rows in batches to reduce number of database calls
                 while True:
-                    batch = [
-                        # Type conversion for numeric fields
-                        [self._convert_value(self.CSV_TO_DB_COLUMNS[csv_col], row.get(csv_col)) for csv_col in self.CSV_TO_DB_COLUMNS]
-                        for row in islice(reader, self.batch_size)
-                    ]
+                    # Rows are read, parsed and converted together as the reader is consumed
+                    with self.metrics.timer("load.convert"):
+                        batch = [
+                            # Type conversion for numeric fields
+                            [self._convert_value(self.CSV_TO_DB_COLUMNS[csv_col], row.get(csv_col)) for csv_col in self.CSV_TO_DB_COLUMNS]
+                            for row in islice(reader, self.batch_size)
+                        ]
                     if not batch:
                         break 
 
-                    self.db_connection.executemany(insert_query, batch)
+                    with self.metrics.timer("load.insert", table=self.TABLE_NAME):
+                        self.db_connection.executemany(insert_query, batch)
+                    self.metrics.increment("load.rows", len(batch), table=self.TABLE_NAME)
+                    self.load_statistics.update_rows(batch)
                     rows_processed += len(batch)
                     self.logger.info(f"Processed {rows_processed:,} rows")
             
-            self.db_connection.execute("COMMIT")
+            self._commit()
             end_time = time.perf_counter()
             self.logger.info(f"Data loaded in {end_time - start_time:.2f} seconds, {rows_processed:,} rows total.")
 
@@ -178,28 +549,977 @@ class ElectricVehicleDataLoader:
             self.logger.error(f"Error loading data: {str(e)}")
             raise
 
+    def load_data_columnar(self) -> None:
+        """
+        Load data from CSV file into database using column-oriented Arrow batches.
+
+        Each batch is converted column by column into Arrow arrays typed like the table and
+        inserted with one INSERT ... SELECT statement, avoiding per-row parameter binding.
+
+        Raises:
+            Exception: If any error occurs during data loading
+        """
+        self.logger.info(f"Starting columnar data load process for table: {self.TABLE_NAME}")
+
+        start_time = time.perf_counter()
+        rows_processed = 0
+        self._reset_load_statistics()
+
+        self.db_connection.execute("BEGIN TRANSACTION")
+        try:
+            for batch, _ in self._read_batches():
+                self._insert_table(batch)
+                rows_processed += batch.num_rows
+                self.logger.info(f"Processed {rows_processed:,} rows")
+
+            self._apply_rollup_delta()
+            self._save_sketches()
+            self._commit()
+            end_time = time.perf_counter()
+            self.logger.info(f"Data loaded in {end_time - start_time:.2f} seconds, {rows_processed:,} rows total.")
+            self._log_coerced_nulls()
+
+        except Exception as e:
+            self.db_connection.execute("ROLLBACK")
+            self.logger.error(f"Error loading data: {str(e)}")
+            raise
+
+    def load_data_files(self) -> None:
+        """
+        Load the files of a directory or glob input as shards, skipping the ones already ingested.
+
+        Up to workers shards are read and converted at once, each by a loader on its own
+        cursor into its own staging table. The staging tables are then merged into the table
+        in a single transaction, which also records the files in INGESTED_FILES_TABLE, so
+        either every shard is loaded or none is. Staging tables are dropped whether the load
+        succeeds or not, and the ones left behind by a process that died mid-load are
+        dropped before loading.
+
+        Raises:
+            ValueError: If a file changed since it was ingested
+            Exception: If any error occurs during data loading
+        """
+        self.db_connection.execute(self.CREATE_INGESTED_FILES_TABLE_SQL)
+        self._drop_staging_tables()
+        file_stats = self._pending_files()
+        self.logger.info(
+            f"Starting sharded data load process for table: {self.TABLE_NAME} "
+            f"({len(file_stats)} new of {len(self.input_files)} files, {self.workers} workers)"
+        )
+
+        start_time = time.perf_counter()
+        self._reset_load_statistics()
+        staging_tables = {path: f"{self.STAGING_TABLE_PREFIX}{uuid.uuid4().hex[:8]}" for path in file_stats}
+
+        try:
+            for staging_table in staging_tables.values():
+                self.db_connection.execute(f"CREATE TABLE {staging_table} AS SELECT * FROM {self.TABLE_NAME} LIMIT 0")
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {
+                    path: executor.submit(self._load_shard, path, staging_table)
+                    for path, staging_table in staging_tables.items()
+                }
+                shards = {path: future.result() for path, future in futures.items()}
+
+            self.db_connection.execute("BEGIN TRANSACTION")
+            try:
+                for path, shard in shards.items():
+                    self.db_connection.execute(f"INSERT INTO {self.TABLE_NAME} SELECT * FROM {staging_tables[path]}")
+                    self._track_rollup_delta(staging_tables[path])
+                    self.db_connection.execute(
+                        f"INSERT INTO {self.INGESTED_FILES_TABLE} VALUES (?, ?, ?, ?, current_timestamp)",
+                        [os.path.abspath(path), file_stats[path].st_size, file_stats[path].st_mtime,
+                         shard.load_statistics.rows]
+                    )
+                    self.load_statistics.merge(shard.load_statistics)
+                    for col, count in shard.coerced_nulls.items():
+                        self.coerced_nulls[col] = self.coerced_nulls.get(col, 0) + count
+                    if self.sketches is not None:
+                        self.sketches.merge(shard.sketches)
+
+                self._apply_rollup_delta()
+                self._save_sketches()
+                self._commit()
+            except Exception:
+                self.db_connection.execute("ROLLBACK")
+                raise
+
+            end_time = time.perf_counter()
+            self.logger.info(
+                f"Data loaded in {end_time - start_time:.2f} seconds, {self.load_statistics.rows:,} rows total "
+                f"from {len(shards)} files."
+            )
+            self._log_coerced_nulls()
+
+        except Exception as e:
+            self.logger.error(f"Error loading data: {str(e)}")
+            raise
+        finally:
+            for staging_table in staging_tables.values():
+                self.db_connection.execute(f"DROP TABLE IF EXISTS {staging_table}")
+
+    def _drop_staging_tables(self) -> None:
+        """Drop the shard staging tables left behind by a load that did not finish."""
+        orphans = self.db_connection.execute(
+            "SELECT table_name FROM duckdb_tables() WHERE starts_with(table_name, ?)", [self.STAGING_TABLE_PREFIX]
+        ).fetchall()
+        for (staging_table,) in orphans:
+            self.logger.warning(f"Dropping staging table {staging_table} left behind by an earlier load")
+            self.db_connection.execute(f"DROP TABLE IF EXISTS {staging_table}")
+
+    def _pending_files(self) -> Dict[str, os.stat_result]:
+        """
+        List the input files not ingested yet.
+
+        Returns:
+            The status of each file to load, by path
+
+        Raises:
+            ValueError: If a file changed since it was ingested
+        """
+        ingested = {
+            path: (file_size, file_mtime)
+            for path, file_size, file_mtime in self.db_connection.execute(
+                f"SELECT File_Path, File_Size, File_Mtime FROM {self.INGESTED_FILES_TABLE}"
+            ).fetchall()
+        }
+        pending = {}
+        for path in self.input_files:
+            file_stat = os.stat(path)
+            ingested_version = ingested.get(os.path.abspath(path))
+            if ingested_version is None:
+                pending[path] = file_stat
+            elif ingested_version != (file_stat.st_size, file_stat.st_mtime):
+                raise ValueError(
+                    f"{path} changed since it was ingested; remove its rows and its entry in "
+                    f"{self.INGESTED_FILES_TABLE} before reloading it."
+                )
+        return pending
+
+    def _load_shard(self, path: str, staging_table: str) -> "ElectricVehicleDataLoader":
+        """
+        Read and convert one file into a staging table, on a cursor of its own.
+
+        Returns:
+            The loader of the shard, holding its load statistics and coerced NULL counts
+        """
+        cursor = self.db_connection.cursor()
+        try:
+            shard = type(self)(
+                cursor, path, batch_size=self.batch_size, load_mode="columnar", maintain_rollup=False,
+                metrics=self.metrics, reader=self.reader
+            )
+            shard._reset_load_statistics(baseline=False)
+            if self.sketches is not None:
+                shard.sketches = self.sketches.empty_copy()
+            with self.metrics.timer("load.shard", file=os.path.basename(path)):
+                cursor.execute("BEGIN TRANSACTION")
+                for batch, _ in shard._read_batches():
+                    shard._insert_table(batch, staging_table)
+                cursor.execute("COMMIT")
+            self.logger.info(f"Staged {shard.load_statistics.rows:,} rows from {path}")
+            return shard
+        finally:
+            cursor.close()
+
+    def load_data_parallel(self) -> None:
+        """
+        Load data from CSV file into database using a pool of worker processes.
+
+        The file is split into byte ranges that end on record boundaries, each range is
+        parsed and converted into an Arrow batch by a worker, and the batches are inserted
+        in file order by this process inside a single transaction.
+
+        The workers also compute the load statistics, the sketches and the rollup counts of
+        their batch, so this process only merges them and inserts. Every insert still goes
+        through this single writer, so once the workers outpace it the load is bound by the
+        insert rate, and with as many workers as cores the writer competes with them for
+        CPU. Compare with the columnar mode through the benchmark's worker sweep before
+        relying on it.
+
+        Raises:
+            Exception: If any error occurs during data loading
+        """
+        self.logger.info(f"Starting parallel data load process for table: {self.TABLE_NAME} ({self.workers} workers)")
+
+        fieldnames, chunks = split_csv_into_chunks(self.csv_path, self.PARALLEL_CHUNK_BYTES)
+
+        start_time = time.perf_counter()
+        rows_processed = 0
+        self._reset_load_statistics()
+        # What each worker summarizes besides converting its range
+        summaries = (
+            self.load_statistics.empty_copy(), self.sketches.empty_copy() if self.sketches is not None else None,
+            self.ROLLUP_DIMENSIONS if self._tracking_rollup_delta else None
+        )
+        # A fresh interpreter per worker; fork is unsafe once DuckDB has started its threads
+        context = multiprocessing.get_context("spawn")
+
+        self.db_connection.execute("BEGIN TRANSACTION")
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+                # Keep a bounded window of chunks in flight so results are consumed in order
+                # without holding the whole parsed file in memory
+                pending = deque()
+                chunk_iter = iter(chunks)
+                for start, end in islice(chunk_iter, 2 * self.workers):
+                    pending.append((executor.submit(_parse_csv_chunk, self.csv_path, start, end, fieldnames, *summaries), end - start))
+
+                while pending:
+                    future, num_bytes = pending.popleft()
+                    # Workers read, parse, convert and summarize their range; only the wait shows up here
+                    with self.metrics.timer("load.wait_for_workers"):
+                        batch, coerced, statistics, sketches, rollup_counts = future.result()
+                    self.metrics.increment("load.bytes", num_bytes)
+                    for start, end in islice(chunk_iter, 1):
+                        pending.append((executor.submit(_parse_csv_chunk, self.csv_path, start, end, fieldnames, *summaries), end - start))
+
+                    self._insert_table(batch, summarized=True)
+                    self._merge_chunk_summaries(statistics, sketches, rollup_counts)
+                    self._record_coerced_nulls(coerced)
+                    rows_processed += batch.num_rows
+                    self.logger.info(f"Processed {rows_processed:,} rows")
+
+            self._apply_rollup_delta()
+            self._save_sketches()
+            self._commit()
+            end_time = time.perf_counter()
+            self.logger.info(f"Data loaded in {end_time - start_time:.2f} seconds, {rows_processed:,} rows total.")
+            self._log_coerced_nulls()
+
+        except Exception as e:
+            self.db_connection.execute("ROLLBACK")
+            self.logger.error(f"Error loading data: {str(e)}")
+            raise
+
+    def _merge_chunk_summaries(self, statistics: LoadStatistics, sketches: Optional[VehicleSketches],
+                               rollup_counts: Optional[pa.Table]) -> None:
+        """
+        Add the summaries a worker computed over its batch to the ones of the load.
+
+        Args:
+            statistics: Load statistics of the batch
+            sketches: Sketches of the batch, when the load maintains them
+            rollup_counts: Rows of the batch counted by ROLLUP_DIMENSIONS, when the rollup delta is tracked
+        """
+        self.load_statistics.merge(statistics)
+        if sketches is not None:
+            with self.metrics.timer("load.sketch"):
+                self.sketches.merge(sketches)
+        if rollup_counts is not None:
+            self.db_connection.register("electric_vehicles_rollup_counts", rollup_counts)
+            try:
+                self._track_rollup_delta("electric_vehicles_rollup_counts", count="SUM(num_cars)")
+            finally:
+                self.db_connection.unregister("electric_vehicles_rollup_counts")
+
+    def load_data_incremental(self) -> None:
+        """
+        Synchronize the table with the CSV file, applying only the rows that changed.
+
+        The file is staged in a temporary table and every row is hashed. The hashes are compared
+        with the ones recorded by the previous incremental load, keyed on KEY_COLUMN, and only
+        the inserted, updated and deleted rows are applied, inside a single transaction.
+
+        Raises:
+            ValueError: If the file contains NULL or duplicate keys
+            Exception: If any error occurs during data loading
+        """
+        self.logger.info(f"Starting incremental data load process for table: {self.TABLE_NAME}")
+
+        key = self.KEY_COLUMN
+        columns = ", ".join(self.DB_COLUMN_TYPES)
+        start_time = time.perf_counter()
+        rows_processed = 0
+        self._reset_load_statistics(baseline=False)
+        # Sketches cannot forget the rows updated or deleted, refresh_sketches() rebuilds them
+        self.sketches = None
+
+        self.db_connection.execute("BEGIN TRANSACTION")
+        try:
+            self.db_connection.execute(self.CREATE_ROW_HASHES_TABLE_SQL)
+            self._refresh_row_hashes()
+
+            # Stage the new file, in the standard layout even if the table is compact
+            self.db_connection.execute(f"""
+                CREATE OR REPLACE TEMP TABLE {self.TABLE_NAME}_staging ({
+                    ', '.join(f'{col} {col_type}' for col, col_type in self.DB_COLUMN_TYPES.items())
+                })
+            """)
+            for batch, _ in self._read_batches():
+                self._insert_table(batch, f"{self.TABLE_NAME}_staging")
+                rows_processed += batch.num_rows
+                self.logger.info(f"Staged {rows_processed:,} rows")
+
+            invalid_keys = self.db_connection.execute(f"""
+                SELECT COUNT(*) - COUNT(DISTINCT {key}) FROM {self.TABLE_NAME}_staging
+            """).fetchone()[0]
+            if invalid_keys:
+                raise ValueError(f"Incremental loads require unique, non-NULL {key} values ({invalid_keys:,} invalid rows)")
+
+            # Compute the delta against the hashes of the current table contents
+            self.db_connection.execute(f"""
+                CREATE OR REPLACE TEMP TABLE {self.TABLE_NAME}_delta AS
+                SELECT
+                    COALESCE(staged.{key}, current.{key}) AS {key},
+                    CASE
+                        WHEN current.{key} IS NULL THEN 'insert'
+                        WHEN staged.{key} IS NULL THEN 'delete'
+                        ELSE 'update'
+                    END AS Change_Type,
+                    staged.Row_Hash
+                FROM (SELECT {key}, {self.ROW_HASH_SQL} AS Row_Hash FROM {self.TABLE_NAME}_staging) AS staged
+                FULL OUTER JOIN {self.ROW_HASHES_TABLE} AS current ON staged.{key} = current.{key}
+                WHERE staged.Row_Hash IS DISTINCT FROM current.Row_Hash
+            """)
+
+            # Apply the delta to the table and to the recorded hashes, and to the rollup
+            changed_keys = f"{key} IN (SELECT {key} FROM {self.TABLE_NAME}_delta WHERE Change_Type <> 'insert')"
+            added_keys = f"{key} IN (SELECT {key} FROM {self.TABLE_NAME}_delta WHERE Change_Type <> 'delete')"
+            self._track_rollup_delta(self.TABLE_NAME, sign=-1, where=changed_keys)
+            self._track_rollup_delta(f"{self.TABLE_NAME}_staging", where=added_keys)
+            for table in (self.TABLE_NAME, self.ROW_HASHES_TABLE):
+                self.db_connection.execute(f"""
+                    DELETE FROM {table} WHERE {changed_keys}
+                """)
+            if self.COMPACT_SCHEMA.is_compact(self.db_connection):
+                self.COMPACT_SCHEMA.append(self.db_connection, f"{self.TABLE_NAME}_staging", where=added_keys)
+            else:
+                self.db_connection.execute(f"""
+                    INSERT INTO {self.TABLE_NAME} ({columns})
+                    SELECT {columns} FROM {self.TABLE_NAME}_staging WHERE {added_keys}
+                """)
+            self.db_connection.execute(f"""
+                INSERT INTO {self.ROW_HASHES_TABLE}
+                SELECT {key}, Row_Hash FROM {self.TABLE_NAME}_delta WHERE Change_Type <> 'delete'
+            """)
+
+            self.last_load_changes = dict(self.db_connection.execute(f"""
+                SELECT Change_Type, COUNT(*) FROM {self.TABLE_NAME}_delta GROUP BY Change_Type
+            """).fetchall())
+            for table in ("staging", "delta"):
+                self.db_connection.execute(f"DROP TABLE {self.TABLE_NAME}_{table}")
+
+            self._apply_rollup_delta()
+            self._commit()
+            end_time = time.perf_counter()
+            self.logger.info(
+                f"Data synchronized in {end_time - start_time:.2f} seconds, {rows_processed:,} rows staged, "
+                f"changes applied: {self.last_load_changes}"
+            )
+            self._log_coerced_nulls()
+
+        except Exception as e:
+            self.db_connection.execute("ROLLBACK")
+            self.logger.error(f"Error loading data: {str(e)}")
+            raise
+
+    def _refresh_row_hashes(self) -> None:
+        """
+        Rebuild the recorded row hashes if the table was modified outside incremental loads.
+
+        Keys that appear more than once in the table get a NULL hash, so the next delta
+        replaces all their copies with the single row from the file.
+        """
+        key = self.KEY_COLUMN
+        hashed_rows, keyed_rows = self.db_connection.execute(f"""
+            SELECT (SELECT COUNT(*) FROM {self.ROW_HASHES_TABLE}), (SELECT COUNT({key}) FROM {self.TABLE_NAME})
+        """).fetchone()
+        if hashed_rows == keyed_rows:
+            return
+
+        self.logger.info("Row hashes are out of date, rebuilding them from the table...")
+        self.db_connection.execute(f"DELETE FROM {self.ROW_HASHES_TABLE}")
+        self.db_connection.execute(f"""
+            INSERT INTO {self.ROW_HASHES_TABLE}
+            SELECT {key}, CASE WHEN COUNT(*) = 1 THEN ANY_VALUE({self.ROW_HASH_SQL}) END
+            FROM {self.TABLE_NAME}
+            WHERE {key} IS NOT NULL
+            GROUP BY {key}
+        """)
+
+    def load_data_checkpointed(self) -> None:
+        """
+        Load data from CSV file into database, committing every checkpoint_every batches.
+
+        Each commit also records the byte offset and row count reached in CHECKPOINTS_TABLE,
+        so a load interrupted by an error resumes from the last committed batch instead of
+        starting over. Only the batches since the last checkpoint are rolled back on error.
+
+        Raises:
+            ValueError: If the file changed since the interrupted load it would resume
+            Exception: If any error occurs during data loading
+        """
+        self.logger.info(f"Starting checkpointed data load process for table: {self.TABLE_NAME}")
+
+        self.db_connection.execute(self.CREATE_CHECKPOINTS_TABLE_SQL)
+        file_stat = os.stat(self.csv_path)
+        start_time = time.perf_counter()
+        self._reset_load_statistics()
+        start_offset, rows_processed = self._resume_checkpoint(file_stat)
+
+        self.db_connection.execute("BEGIN TRANSACTION")
+        try:
+            for batch_number, (batch, offset) in enumerate(self._read_batches(start_offset), start=1):
+                self._insert_table(batch)
+                rows_processed += batch.num_rows
+                self.logger.info(f"Processed {rows_processed:,} rows")
+
+                if batch_number % self.checkpoint_every == 0:
+                    self._save_checkpoint(file_stat, offset, rows_processed, completed=False)
+                    self._apply_rollup_delta()
+                    self._save_sketches()
+                    self._commit()
+                    self.db_connection.execute("BEGIN TRANSACTION")
+
+            self._save_checkpoint(file_stat, file_stat.st_size, rows_processed, completed=True)
+            self._apply_rollup_delta()
+            self._save_sketches()
+            self._commit()
+            end_time = time.perf_counter()
+            self.logger.info(f"Data loaded in {end_time - start_time:.2f} seconds, {rows_processed:,} rows total.")
+            self._log_coerced_nulls()
+
+        except Exception as e:
+            self.db_connection.execute("ROLLBACK")
+            self.logger.error(f"Error loading data: {str(e)}")
+            raise
+
+    def _resume_checkpoint(self, file_stat: os.stat_result) -> Tuple[int, int]:
+        """
+        Look up the progress of an interrupted checkpointed load of the CSV file.
+
+        The statistics of the rows already loaded are restored, so validation still covers
+        the whole file.
+
+        Args:
+            file_stat: Current status of the CSV file
+
+        Returns:
+            The byte offset to resume from and the number of rows already loaded
+
+        Raises:
+            ValueError: If the file changed since the interrupted load
+        """
+        checkpoint = self.db_connection.execute(f"""
+            SELECT File_Size, File_Mtime, Byte_Offset, Rows_Loaded, Load_Statistics
+            FROM {self.CHECKPOINTS_TABLE}
+            WHERE CSV_Path = ? AND NOT Completed
+        """, [os.path.abspath(self.csv_path)]).fetchone()
+        if checkpoint is None:
+            return 0, 0
+
+        file_size, file_mtime, byte_offset, rows_loaded, load_statistics = checkpoint
+        if (file_size, file_mtime) != (file_stat.st_size, file_stat.st_mtime):
+            raise ValueError(
+                f"{self.csv_path} changed since the interrupted load of {rows_loaded:,} rows; "
+                f"remove those rows and its entry in {self.CHECKPOINTS_TABLE} before reloading it."
+            )
+
+        self.logger.info(f"Resuming load from byte {byte_offset:,} ({rows_loaded:,} rows already loaded)")
+        self.load_statistics = LoadStatistics.from_json(self.ARROW_SCHEMA, load_statistics, key=self.KEY_COLUMN)
+        self._baseline_aggregates = subtract_rows(self._baseline_aggregates, self.load_statistics.as_row())
+        return byte_offset, rows_loaded
+
+    def _save_checkpoint(self, file_stat: os.stat_result, byte_offset: int, rows_loaded: int, completed: bool) -> None:
+        """Record the progress of the current load, in the transaction being committed."""
+        csv_path = os.path.abspath(self.csv_path)
+        self.db_connection.execute(f"DELETE FROM {self.CHECKPOINTS_TABLE} WHERE CSV_Path = ?", [csv_path])
+        self.db_connection.execute(
+            f"INSERT INTO {self.CHECKPOINTS_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, current_timestamp)",
+            [csv_path, file_stat.st_size, file_stat.st_mtime, byte_offset, rows_loaded, completed,
+             self.load_statistics.to_json()]
+        )
+
+    def _start_rollup_delta(self) -> None:
+        """
+        Create the rollup if needed and start tracking the rows the next load adds or removes.
+
+        Nothing is tracked when a load was recorded since the rollup was last in sync, e.g. a
+        run() with maintain_rollup=False, since refresh_rollup() rebuilds it anyway.
+        """
+        for create_sql in (self.CREATE_ROLLUP_TABLE_SQL, self.CREATE_ROLLUP_VERSION_TABLE_SQL, self.CREATE_LOADS_TABLE_SQL):
+            self.db_connection.execute(create_sql)
+        self.db_connection.execute(
+            f"CREATE OR REPLACE TEMP TABLE {self.ROLLUP_DELTA_TABLE} AS SELECT * FROM {self.ROLLUP_TABLE} LIMIT 0"
+        )
+        self._tracking_rollup_delta = self.db_connection.execute(f"""
+            SELECT (SELECT MAX(Load_ID) FROM {self.ROLLUP_VERSION_TABLE})
+                IS NOT DISTINCT FROM (SELECT Load_ID FROM {self.LOADS_TABLE} ORDER BY Loaded_At DESC LIMIT 1)
+        """).fetchone()[0]
+        self._rollup_delta_applied = False
+
+    def _track_rollup_delta(self, source: str, sign: int = 1, where: str = "TRUE", count: str = "COUNT(*)") -> None:
+        """
+        Record the counts of rows added to (or, with a negative sign, removed from) the table.
+
+        Args:
+            source: Table or registered relation holding the rows
+            sign: 1 for rows being added, -1 for rows being removed
+            where: Condition selecting the rows of the source
+            count: Aggregate counting the rows of a group, e.g. SUM(num_cars) over rows already counted
+        """
+        if not self._tracking_rollup_delta:
+            return
+        dimensions = ", ".join(self.ROLLUP_DIMENSIONS)
+        self.db_connection.execute(f"""
+            INSERT INTO {self.ROLLUP_DELTA_TABLE}
+            SELECT {dimensions}, {sign} * {count} FROM {source} WHERE {where} GROUP BY {dimensions}
+        """)
+
+    def _apply_rollup_delta(self) -> None:
+        """
+        Merge the tracked counts into the rollup, in the transaction being committed.
+
+        Only the groups touched by the load are updated, so the cost follows the size of the
+        change rather than the size of the table.
+        """
+        if not self._tracking_rollup_delta:
+            return
+        self._rollup_delta_applied = True
+        dimensions = ", ".join(self.ROLLUP_DIMENSIONS)
+        match = " AND ".join(f"{self.ROLLUP_TABLE}.{col} IS NOT DISTINCT FROM delta.{col}" for col in self.ROLLUP_DIMENSIONS)
+        delta = f"""(
+            SELECT {dimensions}, SUM(num_cars) AS num_cars FROM {self.ROLLUP_DELTA_TABLE} GROUP BY {dimensions}
+        ) AS delta"""
+        self.db_connection.execute(f"""
+            UPDATE {self.ROLLUP_TABLE} SET num_cars = {self.ROLLUP_TABLE}.num_cars + delta.num_cars
+            FROM {delta} WHERE {match}
+        """)
+        self.db_connection.execute(f"""
+            INSERT INTO {self.ROLLUP_TABLE}
+            SELECT * FROM {delta}
+            WHERE delta.num_cars <> 0 AND NOT EXISTS (SELECT 1 FROM {self.ROLLUP_TABLE} WHERE {match})
+        """)
+        self.db_connection.execute(f"DELETE FROM {self.ROLLUP_TABLE} WHERE num_cars = 0")
+        self.db_connection.execute(f"DELETE FROM {self.ROLLUP_DELTA_TABLE}")
+
+    def refresh_rollup(self, rebuild: bool = False) -> None:
+        """
+        Make sure ROLLUP_TABLE matches the table after a load.
+
+        The columnar load modes keep the rollup up to date as they commit. The rollup is
+        rebuilt from the table when the load did not apply its changes to it (first build,
+        serial or built_in loads, load methods called outside run(), or a load recorded
+        while the rollup was not maintained), or when its total differs from the table row
+        count. Changes made outside the loader that keep the row count are not detected,
+        rebuild forces a rebuild after them. The latest recorded load is then stored in
+        ROLLUP_VERSION_TABLE.
+
+        Args:
+            rebuild: Whether to rebuild the rollup even if it looks in sync
+        """
+        delta_applied, self._rollup_delta_applied = self._rollup_delta_applied, False
+        self._tracking_rollup_delta = False
+        self.db_connection.execute(f"DROP TABLE IF EXISTS {self.ROLLUP_DELTA_TABLE}")
+        for create_sql in (self.CREATE_ROLLUP_TABLE_SQL, self.CREATE_LOADS_TABLE_SQL):
+            self.db_connection.execute(create_sql)
+        in_sync = not rebuild and delta_applied and self.db_connection.execute(f"""
+            SELECT (SELECT COALESCE(SUM(num_cars), 0) FROM {self.ROLLUP_TABLE}) = (SELECT COUNT(*) FROM {self.TABLE_NAME})
+        """).fetchone()[0]
+
+        if not in_sync:
+            self.logger.info("Rollup is out of date, rebuilding it from the table...")
+            dimensions = ", ".join(self.ROLLUP_DIMENSIONS)
+            self.db_connection.execute("BEGIN TRANSACTION")
+            self.db_connection.execute(f"DELETE FROM {self.ROLLUP_TABLE}")
+            self.db_connection.execute(f"""
+                INSERT INTO {self.ROLLUP_TABLE}
+                SELECT {dimensions}, COUNT(*) FROM {self.TABLE_NAME} GROUP BY {dimensions}
+            """)
+            self._commit()
+        self.db_connection.execute(f"""
+            CREATE OR REPLACE TABLE {self.ROLLUP_VERSION_TABLE} AS
+            SELECT Load_ID FROM {self.LOADS_TABLE} ORDER BY Loaded_At DESC LIMIT 1
+        """)
+
+    def _start_sketches(self) -> None:
+        """Load the saved sketches, or start empty ones, and update them with every batch of the next load."""
+        self.db_connection.execute(self.CREATE_SKETCHES_TABLE_SQL)
+        saved = self.db_connection.execute(f"SELECT Sketches FROM {self.SKETCHES_TABLE}").fetchone()
+        self.sketches = VehicleSketches.from_json(saved[0]) if saved else VehicleSketches()
+
+    def _save_sketches(self) -> None:
+        """Save the sketches, in the transaction being committed."""
+        if self.sketches is None:
+            return
+        self.db_connection.execute(f"DELETE FROM {self.SKETCHES_TABLE}")
+        self.db_connection.execute(
+            f"INSERT INTO {self.SKETCHES_TABLE} VALUES (?, ?, current_timestamp)",
+            [self.sketches.to_json(), self.sketches.rows]
+        )
+
+    def refresh_sketches(self) -> None:
+        """
+        Make sure SKETCHES_TABLE matches the table after a load.
+
+        The columnar load modes update the sketches with every batch and save them as they
+        commit. When they cover a different number of rows than the table (first build,
+        serial, built_in or incremental loads, or changes made outside the loader), they
+        are rebuilt by streaming the table.
+        """
+        sketches, self.sketches = self.sketches, None
+        self.db_connection.execute(self.CREATE_SKETCHES_TABLE_SQL)
+        row_count = self.db_connection.execute(f"SELECT COUNT(*) FROM {self.TABLE_NAME}").fetchone()[0]
+        if sketches is not None and sketches.rows == row_count:
+            return
+
+        self.logger.info("Sketches are out of date, rebuilding them from the table...")
+        self.sketches = VehicleSketches()
+        columns = dict.fromkeys(VehicleSketches.VEHICLE_COLUMNS + VehicleSketches.DISTINCT_COLUMNS)
+        result = self.db_connection.execute(f"""
+            SELECT {', '.join(f'CAST({col} AS {self.DB_COLUMN_TYPES[col]}) AS {col}' for col in columns)}
+            FROM {self.TABLE_NAME}
+        """)
+        reader = result.to_arrow_reader(self.batch_size) if hasattr(result, "to_arrow_reader") else result.fetch_record_batch(self.batch_size)
+        for record_batch in reader:
+            self.sketches.update(pa.Table.from_batches([record_batch]))
+        self.db_connection.execute("BEGIN TRANSACTION")
+        self._save_sketches()
+        self._commit()
+        self.sketches = None
+
+    def refresh_spatial_index(self) -> None:
+        """Rebuild SPATIAL_INDEX from the locations in the table, parsing them once for every query."""
+        self.logger.info("Building spatial index...")
+        indexed = self.SPATIAL_INDEX.build(self.db_connection)
+        self.logger.info(f"Spatial index built ({indexed:,} located vehicles)")
+
+    def compact_table(self) -> None:
+        """
+        Bring the table to the compact layout after a load.
+
+        The rows appended to the standard layout while the compact table was set aside are
+        appended to it, which only rewrites it when their values do not fit its types. A table
+        still in the standard layout is rewritten in the compact layout, discovering its ENUM
+        types from the loaded rows, and a checkpoint then persists it and frees the blocks of
+        the standard layout, which later writes reuse instead of growing the database file.
+        """
+        if self._table_exists(self.COMPACT_TABLE):
+            self.logger.info("Appending the loaded rows to the compact table...")
+            with self.metrics.timer("load.compact"):
+                self.db_connection.execute("BEGIN TRANSACTION")
+                try:
+                    if self._baseline_aggregates:
+                        # Validation compares the whole table, net of the rows that were already there
+                        compact_aggregates = self.db_connection.execute(
+                            self.load_statistics.aggregate_query(self.COMPACT_TABLE)
+                        ).fetchone()
+                        self._baseline_aggregates = tuple(
+                            a + b for a, b in zip(self._baseline_aggregates, compact_aggregates)
+                        )
+                    self.db_connection.execute(f"ALTER TABLE {self.TABLE_NAME} RENAME TO {self.TABLE_NAME}_appended")
+                    self.db_connection.execute(f"ALTER TABLE {self.COMPACT_TABLE} RENAME TO {self.TABLE_NAME}")
+                    rewritten = self.COMPACT_SCHEMA.append(self.db_connection, f"{self.TABLE_NAME}_appended")
+                    self.db_connection.execute(f"DROP TABLE {self.TABLE_NAME}_appended")
+                    self._commit()
+                except Exception:
+                    self.db_connection.execute("ROLLBACK")
+                    raise
+            self.logger.info(
+                "Compact table rewritten, the loaded values did not fit its types" if rewritten
+                else "Loaded rows appended to the compact table"
+            )
+            return
+        if self.COMPACT_SCHEMA.is_compact(self.db_connection):
+            return
+
+        self.logger.info("Compacting electric vehicles table...")
+        with self.metrics.timer("load.compact"):
+            compact_types = self.COMPACT_SCHEMA.compact(self.db_connection)
+            self.db_connection.execute("CHECKPOINT")
+        self.logger.info(f"Table compacted: {compact_types}")
+
+    def _set_compact_table_aside(self) -> None:
+        """
+        Move a compact table aside, so the next load appends the standard layout to an empty table.
+
+        compact_table() appends the loaded rows to it afterwards. A table set aside by an
+        interrupted load stays there, with the rows loaded so far. Incremental loads apply
+        their changes to the compact table itself.
+        """
+        if self.load_mode == "incremental" and not self.multi_file:
+            if self._table_exists(self.COMPACT_TABLE):
+                self.compact_table()
+            return
+        if self._table_exists(self.COMPACT_TABLE) or not self.COMPACT_SCHEMA.is_compact(self.db_connection):
+            return
+        self.db_connection.execute("BEGIN TRANSACTION")
+        self.db_connection.execute(f"ALTER TABLE {self.TABLE_NAME} RENAME TO {self.COMPACT_TABLE}")
+        self.db_connection.execute(self.CREATE_TABLE_SQL)
+        self._commit()
+
+    def _table_exists(self, table_name: str) -> bool:
+        """Whether the database holds a table with this name."""
+        return self.db_connection.execute(
+            "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = ?", [table_name]
+        ).fetchone()[0] > 0
+
     def validate_data_load(self) -> None:
         """
-        Validates that the number of rows loaded into the database matches
-        the number of rows in the source CSV file, excluding the header row.
-        
+        Validates the loaded rows against the statistics collected while loading them.
+
+        The record count, per-column NULL counts and per-column checksums gathered from the
+        converted batches are compared with one aggregate query over the table, net of the
+        rows that were already there. Loads that collect no statistics (built_in) fall back
+        to counting the records of the source CSV file.
+
         Raises:
-            AssertionError: If the row counts don't match or if the table is empty.
+            AssertionError: If the figures don't match.
         """
         self.logger.info("Validating data load...")
-        
-        with open(self.csv_path, 'r', encoding='utf-8') as csv_file:
-            csv_row_count = sum(1 for _ in csv_file) - 1  # Subtract 1 for header row
-        
+
+        if self.load_statistics is None:
+            self._validate_row_count()
+            return
+
+        expected = self.load_statistics.as_row()
+        actual = subtract_rows(self._table_aggregates(), self._baseline_aggregates or [0] * len(expected))
+        mismatches = [
+            f"{name} (loaded: {loaded}, DB: {stored})"
+            for name, loaded, stored in zip(self.load_statistics.metric_names(), expected, actual)
+            if loaded != stored
+        ]
+        if mismatches:
+            raise AssertionError(f"Load validation failed: {', '.join(mismatches)}\n\n")
+
+        self.logger.info(f"Validation successful. Row count, NULL counts and checksums match ({expected[0]:,} rows)\n\n")
+
+    def _validate_row_count(self) -> None:
+        """
+        Validates that the number of rows loaded into the database matches
+        the number of records in the source files, excluding their header rows.
+
+        Raises:
+            AssertionError: If the row counts don't match.
+        """
+        csv_row_count = sum(self._count_records(path) for path in self.input_files)
+
         db_row_count = self.db_connection.execute("SELECT COUNT(*) FROM electric_vehicles;").fetchone()[0]
-        
+
         if db_row_count != csv_row_count:
             raise AssertionError(f"Row count mismatch: (CSV: {csv_row_count}, DB: {db_row_count})\n\n")
-        
+
         self.logger.info(f"Validation successful. Row count matches (CSV: {csv_row_count:,}, DB: {csv_row_count:,})\n\n")
 
+    def _count_records(self, path: str) -> int:
+        """Number of records of one input file, read through its strategy unless it is a plain CSV file."""
+        strategy = self.strategy if not self.multi_file else None
+        if strategy is None and is_plain_csv(path):
+            with open(path, newline='', encoding='utf-8') as csv_file:
+                return sum(1 for record in csv.reader(csv_file) if record) - 1  # Subtract 1 for header row
+
+        strategy = strategy or DataLoaderStrategy.for_path(
+            path, conversion_plan=self.CONVERSION_PLAN, column_names=self.CSV_TO_DB_COLUMNS, batch_size=self.batch_size
+        )
+        return sum(record_batch.num_rows for record_batch in strategy.record_batches())
+
+    def record_load(self) -> str:
+        """
+        Record a new version of the table in LOADS_TABLE.
+
+        Returns:
+            The load ID, which consumers such as the analytics result cache use to
+            detect that the table changed
+        """
+        load_id = uuid.uuid4().hex
+        self.db_connection.execute(self.CREATE_LOADS_TABLE_SQL)
+        self.db_connection.execute(
+            f"INSERT INTO {self.LOADS_TABLE} VALUES (?, ?, ?, current_timestamp)",
+            [load_id, self.load_mode, os.path.abspath(self.csv_path)]
+        )
+        self.logger.info(f"Recorded load {load_id}")
+        return load_id
+
+    def load(self) -> None:
+        """Load the CSV file with the strategy selected by load_mode, or the shards of a directory or glob."""
+        if self.multi_file:
+            self.load_data_files()
+            return
+        loaders = {
+            "serial": self.load_data,
+            "parallel": self.load_data_parallel,
+            "columnar": self.load_data_columnar,
+            "incremental": self.load_data_incremental,
+            "checkpointed": self.load_data_checkpointed,
+            "built_in": self.load_data_built_in
+        }
+        loaders[self.load_mode]()
+
     def run(self) -> None:
         self.create_table()
-        #self.load_data_built_in()
-        self.load_data()
-        self.validate_data_load()
+        # A table already compact, or set aside by an interrupted load, stays compact whatever the schema
+        compact = (
+            self.schema == "compact" or self.COMPACT_SCHEMA.is_compact(self.db_connection)
+            or self._table_exists(self.COMPACT_TABLE)
+        )
+        if compact:
+            self._set_compact_table_aside()
+        if self.maintain_rollup:
+            self._start_rollup_delta()
+        if self.maintain_sketches:
+            self._start_sketches()
+        with self.metrics.timer("load.total", load_mode=self.load_mode):
+            self.load()
+        if compact:
+            self.compact_table()
+        # Recorded first, so the rollup version refers to this load
+        self.record_load()
+        if self.maintain_rollup:
+            with self.metrics.timer("load.rollup"):
+                self.refresh_rollup()
+        if self.maintain_sketches:
+            with self.metrics.timer("load.sketches"):
+                self.refresh_sketches()
+        if self.maintain_spatial_index:
+            with self.metrics.timer("load.spatial_index"):
+                self.refresh_spatial_index()
+        with self.metrics.timer("load.validate"):
+            self.validate_data_load()
+        self.metrics.record_peak_memory(phase="load")
+
+
+def _count_quotes(buffer: mmap.mmap, start: int, end: int, block_size: int = 16 * 1024 * 1024) -> int:
+    """Count double quote characters in buffer[start:end] without copying it all at once."""
+    count = 0
+    for block_start in range(start, end, block_size):
+        count += buffer[block_start:min(block_start + block_size, end)].count(b'"')
+    return count
+
+
+def _next_record_end(buffer: mmap.mmap, pos: int, in_quotes: bool = False) -> int:
+    """
+    Find the first record boundary at or after pos, skipping newlines enclosed in quotes.
+
+    Args:
+        buffer: Memory-mapped CSV file
+        pos: Offset to start searching from
+        in_quotes: Whether pos lies inside a quoted field
+
+    Returns:
+        Offset just past the terminating newline of the record, or the buffer size
+    """
+    while True:
+        newline = buffer.find(b"\n", pos)
+        if newline == -1:
+            return len(buffer)
+        # An odd number of quotes toggles the quoting state; escaped quotes ("") cancel out
+        in_quotes ^= _count_quotes(buffer, pos, newline) % 2 == 1
+        if not in_quotes:
+            return newline + 1
+        pos = newline + 1
+
+
+def split_csv_into_chunks(csv_path: str, chunk_bytes: int) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """
+    Split a CSV file into byte ranges that each contain whole records.
+
+    Args:
+        csv_path: Path to the CSV file
+        chunk_bytes: Approximate size of each range
+
+    Returns:
+        The parsed header and a list of (start, end) byte offsets covering every data record
+    """
+    with open(csv_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return [], []
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            header_end = _next_record_end(buffer, 0)
+            fieldnames = next(csv.reader(io.StringIO(buffer[:header_end].decode("utf-8"), newline="")), [])
+
+            chunks = []
+            start = header_end
+            while start < size:
+                # Every range starts on a record boundary, so the quoting state at the nominal
+                # split point follows from the quotes seen since the start of the range
+                end = start + chunk_bytes
+                if end < size:
+                    end = _next_record_end(buffer, end, _count_quotes(buffer, start, end) % 2 == 1)
+                chunks.append((start, min(end, size)))
+                start = end
+
+    return fieldnames, chunks
+
+
+def _records_to_table(records: Iterable[List[str]], fieldnames: List[str]) -> Tuple[pa.Table, Dict[str, int]]:
+    """
+    Convert parsed CSV records into an Arrow table typed like the database table.
+
+    Args:
+        records: Records as produced by csv.reader
+        fieldnames: CSV header
+
+    Returns:
+        Columnar batch following ElectricVehicleDataLoader.ARROW_SCHEMA, and the number of
+        values coerced to NULL per column
+    """
+    # DictReader skips blank lines, keep the same behaviour
+    rows = [record for record in records if record]
+
+    # Transpose into columns, padding short records with NULL as DictReader does
+    width = len(fieldnames)
+    if min(map(len, rows), default=width) < width:
+        rows = [row + [None] * (width - len(row)) for row in rows]
+    raw_columns = list(zip(*rows)) if rows else [()] * width
+
+    # Resolve each mapped column to its position in the header (last one wins, as in DictReader)
+    positions = {name: i for i, name in enumerate(fieldnames)}
+    columns = {
+        db_col: raw_columns[positions[csv_col]]
+        for csv_col, db_col in ElectricVehicleDataLoader.CSV_TO_DB_COLUMNS.items()
+        if csv_col in positions
+    }
+    return ElectricVehicleDataLoader.CONVERSION_PLAN.convert(columns, len(rows))
+
+
+def _read_record(csvfile: BinaryIO) -> bytes:
+    """Read one whole record from a binary CSV file, following quoted newlines."""
+    record = csvfile.readline()
+    while record.count(b'"') % 2 == 1:
+        line = csvfile.readline()
+        if not line:
+            break
+        record += line
+    return record
+
+
+def _parse_csv_chunk(csv_path: str, start: int, end: int, fieldnames: List[str],
+                     statistics: Optional[LoadStatistics] = None, sketches: Optional[VehicleSketches] = None,
+                     rollup_dimensions: Optional[Sequence[str]] = None
+                     ) -> Tuple[pa.Table, Dict[str, int], Optional[LoadStatistics], Optional[VehicleSketches], Optional[pa.Table]]:
+    """
+    Parse, convert and summarize the records stored in a byte range of the CSV file.
+
+    Runs in a worker process, so it only relies on picklable arguments.
+
+    Args:
+        csv_path: Path to the CSV file
+        start: Offset of the first byte of the range
+        end: Offset just past the last byte of the range
+        fieldnames: CSV header
+        statistics: Empty load statistics to update with the batch, if any
+        sketches: Empty sketches to update with the batch, if any
+        rollup_dimensions: Columns to count the rows of the batch by, if any
+
+    Returns:
+        Columnar batch with the converted records of the range, the number of values coerced
+        to NULL per column, the updated statistics and sketches, and the rollup counts
+        (rollup_dimensions then num_cars)
+    """
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+
+    batch, coerced = _records_to_table(csv.reader(io.StringIO(text, newline="")), fieldnames)
+    if statistics is not None:
+        statistics.update(batch)
+    if sketches is not None:
+        sketches.update(batch)
+    rollup_counts = None
+    if rollup_dimensions is not None:
+        keys = list(rollup_dimensions)
+        rollup_counts = batch.group_by(keys).aggregate([([], "count_all")]).rename_columns(keys + ["num_cars"])
+    return batch, coerced, statistics, sketches, rollup_counts
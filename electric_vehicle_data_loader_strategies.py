@@ -0,0 +1,275 @@
+import csv
+import io
+import json
+import pyarrow as pa
+
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple, Type, Union
+
+from electric_vehicle_type_converter import TypeConversionPlan
+
+# Magic bytes of the compressed streams decompressed transparently, and their Arrow codec
+COMPRESSION_MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"\x28\xb5\x2f\xfd": "zstd",
+    b"BZh": "bz2",
+}
+COMPRESSION_SUFFIXES = {".gz", ".gzip", ".zst", ".bz2"}
+
+
+class DataLoaderStrategy(ABC):
+    """
+    Streams an input file as typed Arrow batches following the table schema.
+
+    Each format reads its source in blocks of raw Arrow columns, named either like the CSV
+    headers or like the database columns. Those are converted with the table's conversion
+    plan, so every format feeds the same insert pipeline, with NULL coercion counted the
+    same way. Compressed files are decompressed on the fly, without a temporary copy.
+    """
+
+    BLOCK_BYTES = 16 * 1024 * 1024
+    # Whether record_batches() already reads empty values as NULL, so the string columns that
+    # are VARCHAR in the table need no conversion
+    EMPTY_VALUES_ARE_NULL = False
+
+    def __init__(self, path: Union[str, Path], conversion_plan: TypeConversionPlan, column_names: Mapping[str, str],
+                 batch_size: int = 5000, block_bytes: int = BLOCK_BYTES) -> None:
+        """
+        Args:
+            path: Input file
+            conversion_plan: Conversion of raw columns to the table schema
+            column_names: Source column names mapped to database column names (database
+                column names are accepted as they are)
+            batch_size: Records per batch, for the formats that read by record count
+            block_bytes: Bytes per block, for the formats that read by block
+        """
+        self.path = Path(path)
+        self.conversion_plan = conversion_plan
+        self.column_names = {**{name: name for name in conversion_plan.schema.names}, **column_names}
+        self.batch_size = batch_size
+        self.block_bytes = block_bytes
+        self._raw: Optional[pa.NativeFile] = None
+
+    @abstractmethod
+    def record_batches(self) -> Iterator[pa.RecordBatch]:
+        """Read the source as batches of raw columns, as named in the source."""
+
+    def convert(self, record_batch: Union[pa.RecordBatch, pa.Table]) -> Tuple[pa.Table, Dict[str, int]]:
+        """
+        Convert a batch of raw columns to the table schema.
+
+        Columns that already have their database type are kept as they are, every other
+        one goes through the conversion plan as strings. String columns are only kept as
+        they are when the strategy reads empty values as NULL. Unknown columns are dropped
+        and missing ones filled with NULL.
+
+        Returns:
+            The typed batch, and the number of values coerced to NULL per column
+        """
+        raw: Dict[str, pa.Array] = {}
+        typed: Dict[str, pa.Array] = {}
+        schema = self.conversion_plan.schema
+        for name, column in zip(record_batch.schema.names, record_batch.columns):
+            db_col = self.column_names.get(name)
+            if db_col is None:
+                continue
+            if isinstance(column, pa.ChunkedArray):
+                column = column.combine_chunks()
+            target = schema.field(db_col).type
+            if column.type == target and (self.EMPTY_VALUES_ARE_NULL or not pa.types.is_string(target)):
+                typed[db_col] = column
+            else:
+                raw[db_col] = column if pa.types.is_string(column.type) else column.cast(pa.string())
+
+        table, coerced = self.conversion_plan.convert(raw, record_batch.num_rows)
+        for db_col, column in typed.items():
+            index = schema.get_field_index(db_col)
+            table = table.set_column(index, schema.field(index), column)
+        return table, coerced
+
+    def read_batches(self) -> Iterator[Tuple[pa.Table, Dict[str, int]]]:
+        """Read the source as typed batches, with the values coerced to NULL in each one."""
+        for record_batch in self.record_batches():
+            yield self.convert(record_batch)
+
+    @property
+    def bytes_read(self) -> int:
+        """Bytes of the file (compressed, if it is) consumed so far."""
+        return self._raw.tell() if self._raw is not None and not self._raw.closed else 0
+
+    @contextmanager
+    def _open(self) -> Iterator[pa.NativeFile]:
+        """Open the file as a stream, decompressing it on the fly when it is compressed."""
+        compression = detect_compression(self.path)
+        if compression is None:
+            # Memory-mapped, so reading blocks costs no copy through a read buffer
+            self._raw = pa.memory_map(str(self.path), "r")
+            stream = self._raw
+        else:
+            self._raw = pa.OSFile(str(self.path), "r")
+            stream = pa.CompressedInputStream(self._raw, compression)
+        try:
+            yield stream
+        finally:
+            stream.close()
+            self._raw.close()
+
+    @classmethod
+    def for_path(cls, path: Union[str, Path], **kwargs: Any) -> "DataLoaderStrategy":
+        """
+        Pick the strategy of a file from its extension, ignoring a compression extension.
+
+        Args:
+            path: Input file
+            **kwargs: Strategy arguments
+
+        Raises:
+            ValueError: If the format is not supported
+        """
+        strategy = STRATEGIES.get(_format_suffix(path))
+        if strategy is None:
+            raise ValueError(f"No loader strategy for {path}, supported extensions are {sorted(STRATEGIES)}")
+        return strategy(path, **kwargs)
+
+
+class CSVDataLoader(DataLoaderStrategy):
+    """
+    CSV files, tokenized natively by pyarrow.csv in blocks of block_bytes.
+
+    Every column is read as strings, so malformed values are coerced by the conversion
+    plan instead of failing the read. Empty values are read as NULL by the tokenizer, so the
+    VARCHAR columns keep its buffers and only the integer columns are converted. Quoted
+    values may contain newlines.
+    """
+
+    EMPTY_VALUES_ARE_NULL = True
+
+    def record_batches(self) -> Iterator[pa.RecordBatch]:
+        # The readers of each format are imported by their strategy only, plain CSV loads skip them
+        import pyarrow.csv as pa_csv
+
+        header = self._read_header()
+        with self._open() as source:
+            reader = pa_csv.open_csv(
+                source,
+                read_options=pa_csv.ReadOptions(block_size=self.block_bytes),
+                parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={name: pa.string() for name in header}, strings_can_be_null=True, null_values=[""]
+                )
+            )
+            yield from reader
+
+    def _read_header(self) -> List[str]:
+        with self._open() as source:
+            head = b""
+            while True:
+                chunk = source.read(64 * 1024)
+                head += chunk
+                # The header ends at the first newline outside quotes
+                end = _record_end(head)
+                if end is not None or not chunk:
+                    break
+        return next(csv.reader(io.StringIO(head[:end].decode("utf-8"), newline="")), [])
+
+
+class JSONDataLoader(DataLoaderStrategy):
+    """
+    Newline-delimited JSON files, one object per vehicle.
+
+    Blocks of whole lines are parsed natively by pyarrow.json. A block where a field mixes
+    value types (e.g. a number and a string) is parsed line by line instead, so a malformed
+    value is coerced to NULL like in a CSV file rather than failing the load.
+    """
+
+    def record_batches(self) -> Iterator[pa.RecordBatch]:
+        with self._open() as source:
+            remainder = b""
+            while True:
+                block = source.read(self.block_bytes)
+                if not block:
+                    break
+                block = remainder + block
+                end = block.rfind(b"\n") + 1
+                remainder = block[end:]
+                if end:
+                    yield self._parse_lines(block[:end])
+            if remainder.strip():
+                yield self._parse_lines(remainder)
+
+    def _parse_lines(self, data: bytes) -> pa.Table:
+        import pyarrow.json as pa_json
+
+        try:
+            return pa_json.read_json(pa.BufferReader(data))
+        except pa.ArrowInvalid:
+            rows = [json.loads(line) for line in data.splitlines() if line.strip()]
+            names = dict.fromkeys(name for row in rows for name in row)
+            return pa.table({
+                name: pa.array([_json_text(row.get(name)) for row in rows], type=pa.string()) for name in names
+            })
+
+
+class ParquetDataLoader(DataLoaderStrategy):
+    """Parquet files, read in batches of batch_size rows; typed columns are kept as they are."""
+
+    def record_batches(self) -> Iterator[pa.RecordBatch]:
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(str(self.path), memory_map=True)
+        columns = [name for name in parquet_file.schema_arrow.names if name in self.column_names]
+        yield from parquet_file.iter_batches(batch_size=self.batch_size, columns=columns)
+
+
+# Strategies by file extension
+STRATEGIES: Dict[str, Type[DataLoaderStrategy]] = {
+    ".csv": CSVDataLoader,
+    ".json": JSONDataLoader,
+    ".jsonl": JSONDataLoader,
+    ".ndjson": JSONDataLoader,
+    ".parquet": ParquetDataLoader,
+}
+
+
+def detect_compression(path: Union[str, Path]) -> Optional[str]:
+    """Arrow codec of a compressed file, from its first bytes (None if it is not compressed)."""
+    with open(path, "rb") as f:
+        head = f.read(4)
+    return next((codec for magic, codec in COMPRESSION_MAGIC.items() if head.startswith(magic)), None)
+
+
+def is_supported_input(path: Union[str, Path]) -> bool:
+    """Whether a file has the extension of a supported format, compressed or not."""
+    return _format_suffix(path) in STRATEGIES
+
+
+def is_plain_csv(path: Union[str, Path]) -> bool:
+    """Whether a file is an uncompressed CSV file, which the python reader handles itself."""
+    return _format_suffix(path) not in STRATEGIES.keys() - {".csv"} and detect_compression(path) is None
+
+
+def _format_suffix(path: Union[str, Path]) -> str:
+    suffixes = [suffix.lower() for suffix in Path(path).suffixes]
+    while suffixes and suffixes[-1] in COMPRESSION_SUFFIXES:
+        suffixes.pop()
+    return suffixes[-1] if suffixes else ""
+
+
+def _record_end(data: bytes) -> Optional[int]:
+    """Offset just past the first record of CSV data, None if it is incomplete."""
+    in_quotes = False
+    for i, byte in enumerate(data):
+        if byte == ord('"'):
+            in_quotes = not in_quotes
+        elif byte == ord("\n") and not in_quotes:
+            return i + 1
+    return None
+
+
+def _json_text(value: Any) -> Optional[str]:
+    """Raw text of a JSON value for the conversion plan."""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
@@ -0,0 +1,144 @@
+import duckdb
+import json
+import pyarrow as pa
+
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+# In-memory database the batch figures are computed in, each update on a cursor of its own
+_CONNECTION = duckdb.connect()
+
+
+class LoadStatistics:
+    """
+    Running statistics over the converted values written by a load.
+
+    Tracks the record count, the NULL count of every column and a checksum per column:
+    the sum of a 64-bit hash of every value, as text, together with the key of its row.
+    A value changed without changing its length, or values swapped between rows, change
+    the checksum. The figures of a batch are computed by the same aggregate query as the
+    figures of the table, so a load can be validated without reading the source file a
+    second time.
+    """
+
+    def __init__(self, schema: pa.Schema, key: Optional[str] = None) -> None:
+        """
+        Args:
+            schema: Arrow schema of the batches being loaded
+            key: Column identifying the rows, hashed with every value (None hashes the values alone)
+        """
+        self.schema = schema
+        self.key = key
+        self.rows = 0
+        self.null_counts = {name: 0 for name in schema.names}
+        self.checksums = {name: 0 for name in schema.names}
+
+    def empty_copy(self) -> "LoadStatistics":
+        """Statistics over the same schema and key with no rows, which merge() into these ones."""
+        return type(self)(self.schema, self.key)
+
+    def update(self, batch: pa.Table) -> None:
+        """
+        Add a converted batch to the statistics.
+
+        Args:
+            batch: Batch following the statistics schema
+        """
+        cursor = _CONNECTION.cursor()
+        try:
+            cursor.register("load_statistics_batch", batch)
+            row = cursor.execute(self.aggregate_query("load_statistics_batch")).fetchone()
+        finally:
+            cursor.close()
+        self.rows += row[0]
+        for i, name in enumerate(self.schema.names):
+            self.null_counts[name] += row[1 + 2 * i]
+            self.checksums[name] += row[2 + 2 * i]
+
+    def update_rows(self, rows: Sequence[Sequence[Any]]) -> None:
+        """
+        Add a batch of converted rows, ordered as the schema columns, to the statistics.
+
+        Args:
+            rows: Converted rows
+        """
+        columns = list(zip(*rows)) if rows else [()] * len(self.schema)
+        self.update(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema
+        ))
+
+    def merge(self, other: "LoadStatistics") -> None:
+        """
+        Add the statistics of another load, e.g. of a shard loaded separately.
+
+        Args:
+            other: Statistics over the same schema
+        """
+        self.rows += other.rows
+        for name in self.schema.names:
+            self.null_counts[name] += other.null_counts[name]
+            self.checksums[name] += other.checksums[name]
+
+    def metric_names(self) -> List[str]:
+        """Names of the figures returned by as_row(), in order."""
+        names = ["rows"]
+        for name in self.schema.names:
+            names += [f"nulls({name})", f"checksum({name})"]
+        return names
+
+    def as_row(self) -> Tuple[int, ...]:
+        """Statistics laid out like the result of aggregate_query()."""
+        row = [self.rows]
+        for name in self.schema.names:
+            row += [self.null_counts[name], self.checksums[name]]
+        return tuple(row)
+
+    def aggregate_query(self, table_name: str) -> str:
+        """
+        Build the query computing the same figures over a table.
+
+        Args:
+            table_name: Table holding the loaded data, text columns may be stored as ENUM
+                or integer codes (see CompactSchema)
+
+        Returns:
+            A single-row query laid out like as_row()
+        """
+        # Values are hashed as text, which is the same in the batches and in both table layouts
+        key = f"CAST({self.key} AS VARCHAR), " if self.key else ""
+        aggregates = ["COUNT(*)"]
+        for name in self.schema.names:
+            aggregates += [
+                f"COUNT(*) - COUNT({name})",
+                f"COALESCE(SUM(hash({key}CAST({name} AS VARCHAR))), 0)::HUGEINT",
+            ]
+        return f"SELECT {', '.join(aggregates)} FROM {table_name}"
+
+    def to_json(self) -> str:
+        """Serialize the figures, e.g. to persist them with a load checkpoint."""
+        return json.dumps({"rows": self.rows, "null_counts": self.null_counts, "checksums": self.checksums})
+
+    @classmethod
+    def from_json(cls, schema: pa.Schema, payload: str, key: Optional[str] = None) -> "LoadStatistics":
+        """
+        Restore statistics serialized with to_json().
+
+        Args:
+            schema: Arrow schema of the batches being loaded
+            payload: Serialized statistics
+            key: Column identifying the rows, as passed to the serialized statistics
+
+        Returns:
+            The restored statistics
+        """
+        data = json.loads(payload)
+        statistics = cls(schema, key)
+        statistics.rows = data["rows"]
+        statistics.null_counts.update(data["null_counts"])
+        statistics.checksums.update(data["checksums"])
+        return statistics
+
+
+def subtract_rows(row: Iterable[Any], other: Iterable[Any]) -> Tuple[int, ...]:
+    """Element-wise difference of two aggregate rows, treating NULL as 0."""
+    return tuple((a or 0) - (b or 0) for a, b in zip(row, other))
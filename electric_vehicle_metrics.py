@@ -0,0 +1,214 @@
+import json
+import os
+import re
+import resource
+import sys
+import threading
+import time
+
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+
+class MetricEvent(NamedTuple):
+    """One measurement: a timer observation in seconds, a counter increment or a gauge value."""
+    kind: str
+    name: str
+    value: float
+    labels: Dict[str, str]
+    timestamp: float
+
+
+class MetricsSink(ABC):
+    """Destination of metric events. Sinks are called under the lock of their Metrics instance."""
+
+    @abstractmethod
+    def record(self, event: MetricEvent) -> None:
+        """Store or forward one event."""
+
+    def close(self) -> None:
+        pass
+
+
+class InMemoryMetricsSink(MetricsSink):
+    """Keeps every event, e.g. for tests or to summarize a run in process."""
+
+    def __init__(self) -> None:
+        self.events: List[MetricEvent] = []
+
+    def record(self, event: MetricEvent) -> None:
+        self.events.append(event)
+
+    def select(self, name: str, **labels: str) -> List[MetricEvent]:
+        """Events of a metric whose labels include the given ones."""
+        return [
+            event for event in self.events
+            if event.name == name and all(event.labels.get(key) == value for key, value in labels.items())
+        ]
+
+    def total(self, name: str, **labels: str) -> float:
+        """Sum of the values of a metric, e.g. the time spent in a phase or a counter total."""
+        return sum(event.value for event in self.select(name, **labels))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, sum and maximum of the values of each metric, across labels."""
+        summary: Dict[str, Dict[str, float]] = {}
+        for event in self.events:
+            entry = summary.setdefault(event.name, {"count": 0, "sum": 0.0, "max": event.value})
+            entry["count"] += 1
+            entry["sum"] += event.value
+            entry["max"] = max(entry["max"], event.value)
+        return summary
+
+
+class JsonLinesMetricsSink(MetricsSink):
+    """Appends every event to a file as one JSON object per line."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        """
+        Args:
+            path: File the events are appended to
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def record(self, event: MetricEvent) -> None:
+        self._file.write(json.dumps(event._asdict()) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class PrometheusMetricsSink(MetricsSink):
+    """
+    Aggregates events into Prometheus text exposition format.
+
+    Timers become summaries (<name>_seconds_count and <name>_seconds_sum), counters become
+    <name>_total and gauges keep their last value. render() returns the text, and write()
+    publishes it atomically, e.g. for the node_exporter textfile collector.
+    """
+
+    def __init__(self, namespace: str = "electric_vehicles", path: Optional[Union[str, Path]] = None) -> None:
+        """
+        Args:
+            namespace: Prefix of every metric name
+            path: File written by close() (None to only render on demand)
+        """
+        self.namespace = namespace
+        self.path = Path(path) if path is not None else None
+        self._series: Dict[Tuple[str, str, Tuple[Tuple[str, str], ...]], List[float]] = {}
+
+    def record(self, event: MetricEvent) -> None:
+        key = (event.kind, event.name, tuple(sorted(event.labels.items())))
+        series = self._series.setdefault(key, [0, 0.0])
+        if event.kind == "gauge":
+            series[:] = [1, event.value]
+        else:
+            series[0] += 1
+            series[1] += event.value
+
+    def render(self) -> str:
+        """Current values of every metric, in Prometheus text format."""
+        lines: List[str] = []
+        declared = set()
+        for (kind, name, labels), (count, total) in sorted(self._series.items()):
+            base = f"{self.namespace}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}"
+            if kind == "timer":
+                samples = [("summary", f"{base}_seconds", f"{base}_seconds_count", count),
+                           ("summary", f"{base}_seconds", f"{base}_seconds_sum", total)]
+            elif kind == "counter":
+                samples = [("counter", f"{base}_total", f"{base}_total", total)]
+            else:
+                samples = [("gauge", base, base, total)]
+
+            for metric_type, family, sample_name, value in samples:
+                if family not in declared:
+                    lines.append(f"# TYPE {family} {metric_type}")
+                    declared.add(family)
+                lines.append(f"{sample_name}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Union[str, Path]) -> None:
+        """Publish the rendered metrics to a file, replacing it atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staging_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        staging_path.write_text(self.render(), encoding="utf-8")
+        os.replace(staging_path, path)
+
+    def close(self) -> None:
+        if self.path is not None:
+            self.write(self.path)
+
+
+class Metrics:
+    """
+    Records timers, counters and gauges, and forwards them to pluggable sinks.
+
+    Without sinks every call returns immediately, so instrumented code paths cost next to
+    nothing when metrics are not collected. Instances can be shared across threads.
+    """
+
+    def __init__(self, sinks: Sequence[MetricsSink] = ()) -> None:
+        """
+        Args:
+            sinks: Destinations of the recorded events
+        """
+        self.sinks = list(sinks)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        """Time the enclosed block, also when it raises."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start_time, **labels)
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        """Record a duration measured by the caller."""
+        self._emit("timer", name, seconds, labels)
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        """Add to a counter."""
+        self._emit("counter", name, value, labels)
+
+    def gauge(self, name: str, value: float, **labels: str) -> None:
+        """Set a gauge."""
+        self._emit("gauge", name, value, labels)
+
+    def record_peak_memory(self, **labels: str) -> None:
+        """Set the process.peak_rss_bytes gauge to the peak resident set size so far."""
+        self.gauge("process.peak_rss_bytes", peak_rss_bytes(), **labels)
+
+    def _emit(self, kind: str, name: str, value: float, labels: Dict[str, Any]) -> None:
+        if not self.sinks:
+            return
+        event = MetricEvent(kind, name, value, {key: str(label) for key, label in labels.items()}, time.time())
+        with self._lock:
+            for sink in self.sinks:
+                sink.record(event)
+
+    def close(self) -> None:
+        """Flush and close every sink."""
+        with self._lock:
+            for sink in self.sinks:
+                sink.close()
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of the current process (ru_maxrss is in KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
@@ -0,0 +1,147 @@
+import logging
+import os
+import shutil
+import uuid
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+
+class PartitionedParquetWriter:
+    """
+    Writes Arrow data as Hive-style Parquet partitions (<key>=<value>/<prefix>_<value>.parquet).
+
+    Rows are routed to their partition in a single pass over the input, partition files are
+    written concurrently, and each partition is built aside and published by a single
+    rename: a new partition directory is moved into place, and the file of an existing one
+    is replaced with os.replace. Readers therefore see either the old or the new file of a
+    partition, never a half-written one or none. Other files found in a partition, and
+    partitions left over from earlier runs that are not part of the new output, are removed
+    afterwards.
+    """
+
+    # Directory value used for NULL partition values, as in Hive
+    NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+    def __init__(self, output_dir: Union[str, Path], partition_column: str, file_prefix: str = "part",
+                 partition_key: Optional[str] = None, workers: int = 4, compression: str = "snappy") -> None:
+        """
+        Args:
+            output_dir: Directory holding the partition directories
+            partition_column: Column the rows are partitioned by
+            file_prefix: Prefix of the Parquet file written in each partition
+            partition_key: Name used in the partition directories (defaults to the lower-cased column)
+            workers: Number of partition files written concurrently
+            compression: Parquet compression codec
+        """
+        self.logger = logging.getLogger(__name__)
+        self.output_dir = Path(output_dir)
+        self.partition_column = partition_column
+        self.file_prefix = file_prefix
+        self.partition_key = partition_key or partition_column.lower()
+        self.workers = workers
+        self.compression = compression
+
+    def partition_name(self, value: Any) -> str:
+        """Directory name of the partition holding a value."""
+        return f"{self.partition_key}={self._format_value(value)}"
+
+    def _format_value(self, value: Any) -> str:
+        return self.NULL_PARTITION if value is None else quote(str(value), safe="")
+
+    def write(self, data: Union[pa.Table, pa.RecordBatchReader]) -> List[Path]:
+        """
+        Write every partition of the data, replacing the previous output.
+
+        Args:
+            data: Rows to write, either in memory or streamed as record batches
+
+        Returns:
+            Paths of the Parquet files written, one per partition
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        staging_dir = self.output_dir / f".{self.partition_key}-{uuid.uuid4().hex}.tmp"
+        writers: Dict[str, pq.ParquetWriter] = {}
+        schema = data.schema
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for batch in self._batches(data):
+                    # Slices of one batch belong to distinct partitions, so they can be
+                    # written concurrently without sharing a writer
+                    futures = [
+                        executor.submit(self._write_slice, writers, staging_dir, value, rows, schema)
+                        for value, rows in self._split(batch)
+                    ]
+                    for future in futures:
+                        future.result()
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        written = [self._publish(staging_dir, name) for name in sorted(writers)]
+        self._remove_stale_partitions(set(writers))
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        self.logger.info(f"Wrote {len(written)} {self.partition_key} partitions to {self.output_dir}")
+        return written
+
+    @staticmethod
+    def _batches(data: Union[pa.Table, pa.RecordBatchReader]) -> Iterator[pa.Table]:
+        if isinstance(data, pa.Table):
+            yield data
+            return
+        for batch in data:
+            yield pa.Table.from_batches([batch])
+
+    def _split(self, table: pa.Table) -> Iterator[Tuple[Any, pa.Table]]:
+        """Group the rows of a batch by partition value, as zero-copy slices of the sorted batch."""
+        if not table.num_rows:
+            return
+        table = table.sort_by(self.partition_column)
+        offset = 0
+        for group in pc.value_counts(table.column(self.partition_column)):
+            count = group["counts"].as_py()
+            yield group["values"].as_py(), table.slice(offset, count)
+            offset += count
+
+    def _write_slice(self, writers: Dict[str, pq.ParquetWriter], staging_dir: Path, value: Any,
+                     rows: pa.Table, schema: pa.Schema) -> None:
+        name = self.partition_name(value)
+        writer = writers.get(name)
+        if writer is None:
+            partition_dir = staging_dir / name
+            partition_dir.mkdir(parents=True, exist_ok=True)
+            path = partition_dir / f"{self.file_prefix}_{self._format_value(value)}.parquet"
+            writer = writers[name] = pq.ParquetWriter(path, schema, compression=self.compression)
+        writer.write_table(rows)
+
+    def _publish(self, staging_dir: Path, name: str) -> Path:
+        """Move a fully written partition into place, replacing its previous file atomically."""
+        target = self.output_dir / name
+        if not target.is_dir():
+            os.rename(staging_dir / name, target)
+            return next(target.glob("*.parquet"))
+
+        path = next((staging_dir / name).glob("*.parquet"))
+        published = target / path.name
+        os.replace(path, published)
+        for stale in target.iterdir():
+            if stale == published:
+                continue
+            self.logger.info(f"Removing stale file {name}/{stale.name}")
+            if stale.is_dir():
+                shutil.rmtree(stale)
+            else:
+                stale.unlink()
+        return published
+
+    def _remove_stale_partitions(self, current: set) -> None:
+        for partition_dir in self.output_dir.glob(f"{self.partition_key}=*"):
+            if partition_dir.is_dir() and partition_dir.name not in current:
+                self.logger.info(f"Removing stale partition {partition_dir.name}")
+                shutil.rmtree(partition_dir)
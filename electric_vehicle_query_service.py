@@ -0,0 +1,377 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import duckdb
+import json
+import logging
+import queue
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from electric_vehicle_analytics import ElectricVehicleAnalytics
+from electric_vehicle_metrics import Metrics
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+ARROW_STREAM_TYPE = "application/vnd.apache.arrow.stream"
+JSON_TYPE = "application/json"
+STATUS_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class CursorPool:
+    """
+    Fixed pool of cursors on one DuckDB connection, each used by one query at a time.
+
+    Cursors are opened once, so a query only pays for its own execution, and the
+    statements ElectricVehicleAnalytics prepares on a cursor are reused by later queries.
+    """
+
+    def __init__(self, connection: duckdb.DuckDBPyConnection, size: int) -> None:
+        """
+        Args:
+            connection: Connection the cursors are opened on
+            size: Number of cursors, i.e. of queries that can run at once
+        """
+        self._cursors: "queue.Queue[duckdb.DuckDBPyConnection]" = queue.Queue()
+        for _ in range(size):
+            self._cursors.put(connection.cursor())
+        self.size = size
+
+    @contextmanager
+    def cursor(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """Borrow a cursor, waiting for one to be returned if they are all in use."""
+        cursor = self._cursors.get()
+        try:
+            yield cursor
+        finally:
+            self._cursors.put(cursor)
+
+    def close(self) -> None:
+        for _ in range(self.size):
+            self._cursors.get().close()
+
+
+class ElectricVehicleQueryService:
+    """
+    Resident HTTP service answering analytics queries over a loaded DuckDB database.
+
+    The database is opened once, so clients no longer pay the process startup, imports
+    and connection open of every run. Requests are parsed on an asyncio event loop and
+    each query runs on a thread pool with a cursor of its own, so slow queries do not
+    hold up the others. Results are returned as JSON records, or as an Arrow IPC stream
+    when the client asks for ARROW_STREAM_TYPE (Accept header or format=arrow).
+
+    Routes (GET):
+    - /health
+    - /reports/<name>: the reports of ElectricVehicleAnalytics.REPORTS
+    - /report?group_by=Make,Model&n=3&per=&state=&min_model_year=&max_model_year=&ev_type=
+    - /vehicles/bounding_box?min_longitude=&min_latitude=&max_longitude=&max_latitude=
+    - /vehicles/radius?longitude=&latitude=&radius_km=
+    - /vehicles/nearest?longitude=&latitude=&k=
+    - /cells?min_longitude=&min_latitude=&max_longitude=&max_latitude= (the box is optional)
+    - /approximate/top_vehicles?n=3 and /approximate/postal_codes
+    """
+
+    def __init__(self, db_connection: duckdb.DuckDBPyConnection, workers: int = 4,
+                 analytics: Optional[ElectricVehicleAnalytics] = None, metrics: Optional[Metrics] = None) -> None:
+        """
+        Args:
+            db_connection: Connection to the database, typically opened read-only
+            workers: Number of queries run at once, each on its own cursor
+            analytics: Analytics answering the queries (defaults to one on db_connection)
+            metrics: Receives the latency of every request, by route, and the error counts
+        """
+        self.logger = logging.getLogger(__name__)
+        self.db_connection = db_connection
+        self.metrics = metrics or Metrics()
+        self.analytics = analytics or ElectricVehicleAnalytics(db_connection, metrics=self.metrics)
+        self.pool = CursorPool(db_connection, workers)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query")
+        self.routes: Dict[str, Callable[[Mapping[str, str], Any], pd.DataFrame]] = {
+            "/report": self._report,
+            "/vehicles/bounding_box": self._bounding_box,
+            "/vehicles/radius": self._radius,
+            "/vehicles/nearest": self._nearest,
+            "/cells": self._cells,
+            "/approximate/top_vehicles": lambda params, cursor: self.analytics.approximate_top_vehicles(
+                _int(params, "n", 3), cursor
+            ),
+            "/approximate/postal_codes": lambda params, cursor: (
+                self.analytics.approximate_most_popular_vehicle_by_postal_code(cursor)
+            ),
+        }
+        for name, *_ in self.analytics.REPORTS:
+            self.routes[f"/reports/{name}"] = lambda params, cursor, name=name: getattr(self.analytics, name)(cursor)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080, unix_socket: Optional[str] = None) -> asyncio.AbstractServer:
+        """
+        Start listening, on a TCP port or on a Unix socket.
+
+        Returns:
+            The server, already accepting connections
+        """
+        if unix_socket is not None:
+            server = await asyncio.start_unix_server(self._serve_client, path=unix_socket)
+            self.logger.info(f"Query service listening on {unix_socket}")
+        else:
+            server = await asyncio.start_server(self._serve_client, host, port)
+            self.logger.info(f"Query service listening on {host}:{server.sockets[0].getsockname()[1]}")
+        return server
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+
+    async def handle(self, method: str, target: str, headers: Mapping[str, str]) -> Tuple[int, str, bytes]:
+        """
+        Answer one request.
+
+        Returns:
+            The status code, content type and body of the response
+        """
+        url = urlsplit(target)
+        params = dict(parse_qsl(url.query))
+        if url.path == "/health":
+            return 200, JSON_TYPE, b'{"status": "ok"}'
+        route = self.routes.get(url.path)
+        if route is None:
+            return _error(404, f"Unknown route {url.path}")
+        if method != "GET":
+            return _error(405, f"{method} is not supported, use GET")
+
+        arrow = params.pop("format", None) == "arrow" or ARROW_STREAM_TYPE in headers.get("accept", "")
+        loop = asyncio.get_running_loop()
+        try:
+            with self.metrics.timer("service.request", route=url.path):
+                body = await loop.run_in_executor(self.executor, self._execute, route, params, arrow)
+        except (ValueError, TypeError, KeyError) as e:
+            self.metrics.increment("service.errors", route=url.path, status="400")
+            return _error(400, str(e))
+        except Exception as e:
+            self.logger.exception(f"Query {target} failed")
+            self.metrics.increment("service.errors", route=url.path, status="500")
+            return _error(500, str(e))
+        return 200, ARROW_STREAM_TYPE if arrow else JSON_TYPE, body
+
+    def _execute(self, route: Callable[[Mapping[str, str], Any], pd.DataFrame], params: Mapping[str, str],
+                 arrow: bool) -> bytes:
+        """Run a query on a pooled cursor and serialize its result. Runs on the thread pool."""
+        with self.pool.cursor() as cursor:
+            df = route(params, cursor)
+        if arrow:
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return sink.getvalue().to_pybytes()
+        return df.to_json(orient="records").encode()
+
+    def _report(self, params: Mapping[str, str], cursor) -> pd.DataFrame:
+        if not params.get("group_by"):
+            raise ValueError("group_by is required")
+        return self.analytics.report(
+            params["group_by"].split(","), n=_int(params, "n"), per=params.get("per"), state=params.get("state"),
+            model_years=(_int(params, "min_model_year"), _int(params, "max_model_year")),
+            ev_type=params.get("ev_type"), connection=cursor
+        )
+
+    def _bounding_box(self, params: Mapping[str, str], cursor) -> pd.DataFrame:
+        return self.analytics.vehicles_in_bounding_box(*_bounding_box(params, required=True), connection=cursor)
+
+    def _radius(self, params: Mapping[str, str], cursor) -> pd.DataFrame:
+        return self.analytics.vehicles_within_radius(
+            _float(params, "longitude"), _float(params, "latitude"), _float(params, "radius_km"), connection=cursor
+        )
+
+    def _nearest(self, params: Mapping[str, str], cursor) -> pd.DataFrame:
+        return self.analytics.nearest_vehicles(
+            _float(params, "longitude"), _float(params, "latitude"), _int(params, "k", 10), connection=cursor
+        )
+
+    def _cells(self, params: Mapping[str, str], cursor) -> pd.DataFrame:
+        return self.analytics.count_cars_per_cell(_bounding_box(params, required=False), connection=cursor)
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve the HTTP/1.1 requests of one connection, kept alive until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if int(headers.get("content-length", 0)):
+                    await reader.readexactly(int(headers["content-length"]))
+
+                status, content_type, body = await self.handle(method, target, headers)
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_REASONS[status]}\r\n"
+                    f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # Client went away, or sent something that is not HTTP
+            pass
+        finally:
+            writer.close()
+
+
+async def fetch(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, target: str,
+                accept: str = JSON_TYPE) -> Tuple[int, bytes]:
+    """
+    Send a GET request on an open keep-alive connection and read the response.
+
+    Returns:
+        The status code and body of the response
+    """
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\nAccept: {accept}\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    content_length = 0
+    while True:
+        line = await reader.readline()
+        if not line.strip():
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            content_length = int(value)
+    return status, await reader.readexactly(content_length)
+
+
+async def load_test(targets: Sequence[str], host: str = "127.0.0.1", port: int = 8080, unix_socket: Optional[str] = None,
+                    clients: int = 16, requests_per_client: int = 50, accept: str = JSON_TYPE) -> Dict[str, Any]:
+    """
+    Measure the service latency under concurrent load.
+
+    Every client opens a keep-alive connection and sends requests_per_client requests
+    back to back, cycling through the targets from a different starting point.
+
+    Returns:
+        The request and error counts, the latency percentiles in seconds and the throughput
+    """
+    from electric_vehicle_benchmark import percentiles
+
+    async def client(offset: int) -> Tuple[List[float], int]:
+        if unix_socket is not None:
+            reader, writer = await asyncio.open_unix_connection(unix_socket)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        latencies, errors = [], 0
+        try:
+            for i in range(requests_per_client):
+                start_time = time.perf_counter()
+                status, _ = await fetch(reader, writer, targets[(offset + i) % len(targets)], accept)
+                latencies.append(time.perf_counter() - start_time)
+                errors += status != 200
+        finally:
+            writer.close()
+            await writer.wait_closed()
+        return latencies, errors
+
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*(client(offset) for offset in range(clients)))
+    elapsed = time.perf_counter() - start_time
+    latencies = [latency for client_latencies, _ in results for latency in client_latencies]
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "clients": clients,
+        "seconds": percentiles(latencies),
+        "requests_per_second": len(latencies) / elapsed,
+    }
+
+
+def _error(status: int, message: str) -> Tuple[int, str, bytes]:
+    return status, JSON_TYPE, json.dumps({"error": message}).encode()
+
+
+def _float(params: Mapping[str, str], name: str) -> float:
+    if name not in params:
+        raise ValueError(f"{name} is required")
+    return float(params[name])
+
+
+def _int(params: Mapping[str, str], name: str, default: Optional[int] = None) -> Optional[int]:
+    return int(params[name]) if params.get(name) else default
+
+
+def _bounding_box(params: Mapping[str, str], required: bool) -> Optional[Tuple[float, float, float, float]]:
+    names = ("min_longitude", "min_latitude", "max_longitude", "max_latitude")
+    if not required and not any(name in params for name in names):
+        return None
+    return tuple(_float(params, name) for name in names)
+
+
+DEFAULT_TARGETS = [f"/reports/{name}" for name, *_ in ElectricVehicleAnalytics.REPORTS]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the electric vehicle analytics over HTTP, or load test the service.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve = subparsers.add_parser("serve", help="Serve a loaded database")
+    serve.add_argument("--db", default="db/electric_vehicles.duckdb")
+    serve.add_argument("--workers", type=int, default=4, help="Queries run at once")
+    serve.add_argument("--cache-mb", type=int, default=256, help="Memory budget of the report result cache, 0 disables it")
+    serve.add_argument("--use-rollup", action="store_true", help="Answer the reports from the rollup maintained by the loader")
+    bench = subparsers.add_parser("load-test", help="Measure the latency of a running service")
+    bench.add_argument("--targets", nargs="+", default=DEFAULT_TARGETS)
+    bench.add_argument("--clients", type=int, default=16)
+    bench.add_argument("--requests", type=int, default=50, help="Requests per client")
+    bench.add_argument("--arrow", action="store_true", help="Request Arrow IPC instead of JSON")
+    for subparser in (serve, bench):
+        subparser.add_argument("--host", default="127.0.0.1")
+        subparser.add_argument("--port", type=int, default=8080)
+        subparser.add_argument("--unix-socket", help="Unix socket path, instead of a TCP port")
+    args = parser.parse_args(argv)
+
+    if args.command == "load-test":
+        results = asyncio.run(load_test(
+            args.targets, args.host, args.port, args.unix_socket, args.clients, args.requests,
+            ARROW_STREAM_TYPE if args.arrow else JSON_TYPE
+        ))
+        print(json.dumps(results, indent=2))
+        return
+
+    async def serve_forever() -> None:
+        from electric_vehicle_result_cache import ReportResultCache
+
+        # Read-only, so a running load can't be mixed up with the queries
+        connection = duckdb.connect(args.db, read_only=True)
+        analytics = ElectricVehicleAnalytics(
+            connection, cache=ReportResultCache(args.cache_mb * 1024 * 1024) if args.cache_mb else None,
+            use_rollup=args.use_rollup
+        )
+        service = ElectricVehicleQueryService(connection, workers=args.workers, analytics=analytics)
+        try:
+            server = await service.start(args.host, args.port, args.unix_socket)
+            async with server:
+                await server.serve_forever()
+        finally:
+            service.close()
+            connection.close()
+
+    asyncio.run(serve_forever())
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    main()
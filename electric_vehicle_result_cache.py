@@ -0,0 +1,125 @@
+import hashlib
+import threading
+import pandas as pd
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional, Tuple, Union
+
+
+class ReportResultCache:
+    """
+    LRU cache of report results, bounded by the memory they use.
+
+    Keys are tuples whose last element is a fingerprint of the table version, so results
+    computed before a load are never served after it. Results can also be persisted as
+    Parquet files, which survive process restarts and are read back when the in-memory
+    entry is missing.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, cache_dir: Optional[Union[str, Path]] = None) -> None:
+        """
+        Args:
+            max_bytes: Memory budget for cached results
+            cache_dir: Directory where results are also persisted as Parquet (None keeps them in memory only)
+        """
+        self.max_bytes = max_bytes
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._entries: "OrderedDict[Hashable, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[pd.DataFrame]:
+        """
+        Look up a cached result.
+
+        Args:
+            key: Cache key, ending with the table version fingerprint
+
+        Returns:
+            A copy of the cached result, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0].copy()
+
+        path = self._path(key)
+        if path is not None and path.exists():
+            df = pd.read_parquet(path)
+            with self._lock:
+                self.disk_hits += 1
+            self._store(key, df)
+            return df.copy()
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: Tuple[Any, ...], df: pd.DataFrame) -> None:
+        """
+        Cache a result, evicting the least recently used entries beyond the memory budget.
+
+        Args:
+            key: Cache key, ending with the table version fingerprint
+            df: Result to cache
+        """
+        path = self._path(key)
+        if path is not None:
+            # Older versions of the same result can no longer be hit
+            for stale in self.cache_dir.glob(f"{path.name.split('-')[0]}-*.parquet"):
+                stale.unlink(missing_ok=True)
+            df.to_parquet(path, index=False)
+        self._store(key, df.copy())
+
+    def _store(self, key: Tuple[Any, ...], df: pd.DataFrame) -> None:
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (df, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def _path(self, key: Tuple[Any, ...]) -> Optional[Path]:
+        """Parquet file of a key: the result identity (all but the last element), then its version."""
+        if self.cache_dir is None:
+            return None
+        result_id = hashlib.sha256(repr(key[:-1]).encode()).hexdigest()[:16]
+        version = hashlib.sha256(repr(key[-1]).encode()).hexdigest()[:16]
+        return self.cache_dir / f"{result_id}-{version}.parquet"
+
+    def clear(self) -> None:
+        """Drop every in-memory entry."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and memory usage."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes
+            }
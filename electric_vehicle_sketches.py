@@ -0,0 +1,465 @@
+import base64
+import json
+import math
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+
+class Estimate(NamedTuple):
+    """
+    Approximate answer of a sketch: the true value lies within error of value with
+    probability confidence. Counts never under-estimate, so they lie in [value - error, value].
+    """
+    value: int
+    error: int
+    confidence: float
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch of the counts of arbitrary keys, in depth rows of width counters.
+
+    Each key is counted in one counter per row, and its estimate is the smallest of those
+    counters. Collisions only add to a counter, so an estimate never falls below the true
+    count and exceeds it by at most e / width of the total count, with probability
+    1 - exp(-depth).
+    """
+
+    def __init__(self, width: int = 2 ** 14, depth: int = 4) -> None:
+        """
+        Args:
+            width: Counters per row, the error shrinks in proportion
+            depth: Rows, the failure probability shrinks exponentially
+        """
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.table = np.zeros((depth, width), dtype=np.int64)
+
+    def add(self, hashes: np.ndarray, counts: Sequence[int]) -> None:
+        """Add the counts of a batch of keys, given by their hash_columns() hashes."""
+        if not len(hashes):
+            return
+        counts = np.asarray(counts, dtype=np.int64)
+        for row, columns in enumerate(self._columns(hashes)):
+            np.add.at(self.table[row], columns, counts)
+        self.total += int(counts.sum())
+
+    def estimate(self, key_hash: int) -> Estimate:
+        """Estimated count of a key, given by its hash_columns() hash."""
+        columns = self._columns(np.array([key_hash], dtype=np.uint64))
+        value = min(int(self.table[row, row_columns[0]]) for row, row_columns in enumerate(columns))
+        return Estimate(value, self.error_bound, self.confidence)
+
+    @property
+    def error_bound(self) -> int:
+        return math.ceil(math.e / self.width * self.total)
+
+    @property
+    def confidence(self) -> float:
+        return 1 - math.exp(-self.depth)
+
+    def merge(self, other: "CountMinSketch") -> None:
+        """
+        Add the counts of another sketch of the same shape.
+
+        Raises:
+            ValueError: If the sketches have a different width or depth
+        """
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError(f"Cannot merge a {other.depth}x{other.width} Count-Min sketch into a {self.depth}x{self.width} one")
+        self.table += other.table
+        self.total += other.total
+
+    def _columns(self, hashes: np.ndarray) -> List[np.ndarray]:
+        """Counter of every key in each row, from two hashes of it (Kirsch-Mitzenmacher)."""
+        # Odd steps visit distinct counters across the rows of a power-of-two width
+        step = _mix64(hashes ^ np.uint64(0x5BD1E9955BD1E995)) | np.uint64(1)
+        with np.errstate(over="ignore"):
+            return [((hashes + np.uint64(row) * step) % np.uint64(self.width)).astype(np.int64) for row in range(self.depth)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "width": self.width, "depth": self.depth, "total": self.total,
+            "table": base64.b64encode(self.table.astype("<i8").tobytes()).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CountMinSketch":
+        sketch = cls(data["width"], data["depth"])
+        sketch.total = data["total"]
+        sketch.table = np.frombuffer(base64.b64decode(data["table"]), dtype="<i8").reshape(sketch.depth, sketch.width).copy()
+        return sketch
+
+
+class SpaceSaving:
+    """
+    Heavy hitters of a stream of weighted keys, in at most capacity counters (Space-Saving).
+
+    A key without a counter takes over the smallest one once they are all in use, and
+    inherits its count as error. Every counted key therefore over-estimates its true count
+    by at most its error, which never exceeds total / capacity, and every key more frequent
+    than that has a counter.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        """
+        Args:
+            capacity: Number of keys tracked
+        """
+        self.capacity = capacity
+        self.total = 0
+        # Count and error by key
+        self.counters: Dict[Hashable, List[int]] = {}
+
+    def add(self, key: Hashable, count: int = 1) -> None:
+        self.total += count
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += count
+        elif len(self.counters) < self.capacity:
+            self.counters[key] = [count, 0]
+        else:
+            smallest = min(self.counters, key=lambda k: self.counters[k][0])
+            floor = self.counters.pop(smallest)[0]
+            self.counters[key] = [floor + count, floor]
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[Hashable, Estimate]]:
+        """
+        The n most frequent keys (all of them by default), most frequent first.
+
+        Returns:
+            Each key with its estimated count and the most it over-estimates it by
+        """
+        ranked = sorted(self.counters.items(), key=lambda item: (-item[1][0], _key_text(item[0])))
+        return [(key, Estimate(count, error, 1.0)) for key, (count, error) in ranked[:n]]
+
+    def merge(self, other: "SpaceSaving") -> None:
+        """
+        Add the keys of another summary, keeping the capacity most frequent.
+
+        A key missing from a full summary may have been counted up to its smallest count
+        there, which is added to both its count and its error, so the bounds still hold.
+        """
+        floors = [
+            min((count for count, _ in summary.counters.values()), default=0) if len(summary.counters) >= summary.capacity else 0
+            for summary in (self, other)
+        ]
+        merged: Dict[Hashable, List[int]] = {}
+        for key in self.counters.keys() | other.counters.keys():
+            count, error = 0, 0
+            for summary, floor in zip((self, other), floors):
+                counter = summary.counters.get(key, [floor, floor])
+                count, error = count + counter[0], error + counter[1]
+            merged[key] = [count, error]
+        ranked = sorted(merged.items(), key=lambda item: (-item[1][0], _key_text(item[0])))
+        self.counters = dict(ranked[:self.capacity])
+        self.total += other.total
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity, "total": self.total,
+            "counters": [[list(key), count, error] for key, (count, error) in self.counters.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SpaceSaving":
+        summary = cls(data["capacity"])
+        summary.total = data["total"]
+        summary.counters = {tuple(key): [count, error] for key, count, error in data["counters"]}
+        return summary
+
+
+class HyperLogLog:
+    """
+    Distinct count of a stream of values in 2^precision one-byte registers (HyperLogLog).
+
+    The standard error of the estimate is 1.04 / sqrt(2^precision), about 0.8% with the
+    default precision. Adding a value twice changes nothing, so sketches of overlapping
+    streams merge into the sketch of their union.
+    """
+
+    def __init__(self, precision: int = 14) -> None:
+        """
+        Args:
+            precision: Bits of the hash selecting a register, from 4 to 18
+        """
+        if not 4 <= precision <= 18:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 18, got {precision}")
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    def add(self, values: Union[pa.Array, pa.ChunkedArray]) -> None:
+        """Add a column of values; NULL is ignored like by COUNT(DISTINCT)."""
+        values = pc.unique(values).drop_null()
+        self.add_hashes(hash_columns([values]))
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        """Add the hash_columns() hashes of values."""
+        if not len(hashes):
+            return
+        value_bits = 64 - self.precision
+        registers = (hashes >> np.uint64(value_bits)).astype(np.int64)
+        remainder = (hashes & np.uint64((1 << value_bits) - 1)).astype(np.float64)
+        # Position of the leftmost 1 in the remaining bits; the remainders fit a double exactly
+        ranks = value_bits - np.frexp(remainder)[1] + 1
+        np.maximum.at(self.registers, registers, ranks.astype(np.uint8))
+
+    def estimate(self) -> Estimate:
+        """Estimated distinct count, with an error bound of two standard errors."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Linear counting is more accurate while many registers are still empty
+        value = m * math.log(m / zeros) if zeros and raw <= 2.5 * m else raw
+        return Estimate(round(value), math.ceil(2 * self.standard_error * value), 0.95)
+
+    @property
+    def standard_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """
+        Add the values of another sketch of the same precision.
+
+        Raises:
+            ValueError: If the sketches have a different precision
+        """
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge a HyperLogLog of precision {other.precision} into one of precision {self.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"precision": self.precision, "registers": base64.b64encode(self.registers.tobytes()).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HyperLogLog":
+        sketch = cls(data["precision"])
+        sketch.registers = np.frombuffer(base64.b64decode(data["registers"]), dtype=np.uint8).copy()
+        return sketch
+
+
+class VehicleSketches:
+    """
+    Sketches of the electric vehicles table, for approximate analytics on very large tables.
+
+    They are updated from the converted batches of a load, so keeping them costs no scan
+    of the table, and they answer in time independent of the number of vehicles:
+    - the most popular vehicles overall, and in each postal code (Space-Saving)
+    - the count of any vehicle, overall or in a postal code (Count-Min)
+    - the distinct count of DISTINCT_COLUMNS (HyperLogLog)
+
+    Sketches only ever add rows, so loads that delete or replace rows rebuild them.
+    """
+
+    # Columns of the batches the sketches read
+    VEHICLE_COLUMNS = ("Postal_Code", "Make", "Model")
+    DISTINCT_COLUMNS = ("DOL_Vehicle_ID", "VIN", "Postal_Code", "Census_Tract")
+    # Seeds of the vehicle and the postal code and vehicle keys, which share the Count-Min sketch
+    VEHICLE_SEED = 1
+    POSTAL_CODE_VEHICLE_SEED = 2
+    # Groups of postal code and vehicle buffered before they are counted by the Space-Saving summaries
+    PENDING_GROUPS = 64 * 1024
+
+    def __init__(self, vehicle_capacity: int = 256, postal_code_capacity: int = 16, count_width: int = 2 ** 14,
+                 count_depth: int = 4, precision: int = 14) -> None:
+        """
+        Args:
+            vehicle_capacity: Vehicles (Make, Model) tracked for the top vehicles overall
+            postal_code_capacity: Vehicles tracked in each postal code
+            count_width: Counters per row of the Count-Min sketch
+            count_depth: Rows of the Count-Min sketch
+            precision: Precision of the HyperLogLog sketches
+        """
+        self.rows = 0
+        self.postal_code_capacity = postal_code_capacity
+        self.vehicles = SpaceSaving(vehicle_capacity)
+        self.postal_code_vehicles: Dict[Optional[str], SpaceSaving] = {}
+        self.counts = CountMinSketch(count_width, count_depth)
+        self.distinct = {col: HyperLogLog(precision) for col in self.DISTINCT_COLUMNS}
+        self._pending_groups: List[pa.Table] = []
+
+    def empty_copy(self) -> "VehicleSketches":
+        """Sketches with the same parameters and no rows, which merge() into these ones."""
+        return type(self)(
+            self.vehicles.capacity, self.postal_code_capacity, self.counts.width, self.counts.depth,
+            next(iter(self.distinct.values())).precision
+        )
+
+    def update(self, batch: pa.Table) -> None:
+        """
+        Add a converted batch to the sketches.
+
+        Rows are first counted by postal code and vehicle, so the sketches are updated once
+        per group rather than once per row. The Space-Saving summaries are updated in Python,
+        so their groups are buffered across batches, where the same groups keep coming back,
+        and counted together once PENDING_GROUPS accumulate.
+
+        Args:
+            batch: Batch with the VEHICLE_COLUMNS and DISTINCT_COLUMNS
+        """
+        groups = _count_groups(batch.select(list(self.VEHICLE_COLUMNS)), list(self.VEHICLE_COLUMNS))
+        vehicles = _count_groups(groups, ["Make", "Model"])
+        self.counts.add(hash_columns(vehicles.columns[:2], self.VEHICLE_SEED), vehicles.column("count"))
+        self.counts.add(hash_columns(groups.columns[:3], self.POSTAL_CODE_VEHICLE_SEED), groups.column("count"))
+        for col, sketch in self.distinct.items():
+            sketch.add(batch.column(col))
+        self.rows += batch.num_rows
+
+        self._pending_groups.append(groups)
+        if sum(pending.num_rows for pending in self._pending_groups) >= self.PENDING_GROUPS:
+            self._count_pending_groups()
+
+    def _count_pending_groups(self) -> None:
+        """Add the buffered groups to the Space-Saving summaries."""
+        if not self._pending_groups:
+            return
+        groups = _count_groups(pa.concat_tables(self._pending_groups), list(self.VEHICLE_COLUMNS))
+        self._pending_groups = []
+
+        vehicles = _count_groups(groups, ["Make", "Model"])
+        for make, model, count in zip(*(column.to_pylist() for column in vehicles.columns)):
+            self.vehicles.add((make, model), count)
+        for postal_code, make, model, count in zip(*(column.to_pylist() for column in groups.columns)):
+            summary = self.postal_code_vehicles.get(postal_code)
+            if summary is None:
+                summary = self.postal_code_vehicles[postal_code] = SpaceSaving(self.postal_code_capacity)
+            summary.add((make, model), count)
+
+    def merge(self, other: "VehicleSketches") -> None:
+        """Add the rows of sketches with the same parameters, e.g. of a shard loaded separately."""
+        self._count_pending_groups()
+        other._count_pending_groups()
+        self.vehicles.merge(other.vehicles)
+        for postal_code, summary in other.postal_code_vehicles.items():
+            self.postal_code_vehicles.setdefault(postal_code, SpaceSaving(self.postal_code_capacity)).merge(summary)
+        self.counts.merge(other.counts)
+        for col, sketch in self.distinct.items():
+            sketch.merge(other.distinct[col])
+        self.rows += other.rows
+
+    def top_vehicles(self, n: int) -> List[Tuple[str, str, Estimate]]:
+        """The n most popular vehicles: make, model and estimated count, most popular first."""
+        self._count_pending_groups()
+        return [(make, model, estimate) for (make, model), estimate in self.vehicles.top(n)]
+
+    def top_vehicle_by_postal_code(self) -> List[Tuple[Optional[str], str, str, Estimate]]:
+        """The most popular vehicle of each postal code: postal code, make, model and estimated count."""
+        self._count_pending_groups()
+        return [
+            (postal_code, make, model, estimate)
+            for postal_code, summary in self.postal_code_vehicles.items()
+            for (make, model), estimate in summary.top(1)
+        ]
+
+    def vehicle_count(self, make: str, model: str, postal_code: Optional[str] = None) -> Estimate:
+        """Estimated number of vehicles of a make and model, overall or in one postal code."""
+        if postal_code is None:
+            return self.counts.estimate(_hash_key((make, model), self.VEHICLE_SEED))
+        return self.counts.estimate(_hash_key((postal_code, make, model), self.POSTAL_CODE_VEHICLE_SEED))
+
+    def distinct_count(self, col: str) -> Estimate:
+        """
+        Estimated number of distinct non-NULL values of a column.
+
+        Raises:
+            ValueError: If the column is not one of DISTINCT_COLUMNS
+        """
+        if col not in self.distinct:
+            raise ValueError(f"No distinct count sketch for '{col}', expected one of {self.DISTINCT_COLUMNS}")
+        return self.distinct[col].estimate()
+
+    def to_json(self) -> str:
+        self._count_pending_groups()
+        return json.dumps({
+            "rows": self.rows,
+            "postal_code_capacity": self.postal_code_capacity,
+            "vehicles": self.vehicles.to_dict(),
+            "postal_code_vehicles": [[postal_code, summary.to_dict()] for postal_code, summary in self.postal_code_vehicles.items()],
+            "counts": self.counts.to_dict(),
+            "distinct": {col: sketch.to_dict() for col, sketch in self.distinct.items()},
+        })
+
+    @classmethod
+    def from_json(cls, text: str) -> "VehicleSketches":
+        data = json.loads(text)
+        sketches = cls(postal_code_capacity=data["postal_code_capacity"])
+        sketches.rows = data["rows"]
+        sketches.vehicles = SpaceSaving.from_dict(data["vehicles"])
+        sketches.postal_code_vehicles = {
+            postal_code: SpaceSaving.from_dict(summary) for postal_code, summary in data["postal_code_vehicles"]
+        }
+        sketches.counts = CountMinSketch.from_dict(data["counts"])
+        sketches.distinct = {col: HyperLogLog.from_dict(sketch) for col, sketch in data["distinct"].items()}
+        return sketches
+
+
+def _key_text(key: Any) -> str:
+    """Text a key is hashed and ordered by; NULL renders apart from every string."""
+    if isinstance(key, tuple):
+        return "\x1f".join(_key_text(part) for part in key)
+    return "\x00" if key is None else str(key)
+
+
+def _count_groups(table: pa.Table, keys: List[str]) -> pa.Table:
+    """Count the rows of a table by keys, or sum their count column if it has one."""
+    if "count" in table.column_names:
+        counts = table.group_by(keys).aggregate([("count", "sum")])
+        return counts.rename_columns(keys + ["count"])
+    return table.group_by(keys).aggregate([([], "count_all")]).rename_columns(keys + ["count"])
+
+
+def hash_columns(columns: Sequence[Union[pa.Array, pa.ChunkedArray]], seed: int = 0) -> np.ndarray:
+    """
+    64-bit hash of every row of integer and string columns, computed over the Arrow buffers.
+
+    Values hash the same across processes and runs, so persisted sketches can be merged
+    with sketches of later loads.
+    """
+    hashes = np.full(len(columns[0]) if columns else 0, seed, dtype=np.uint64)
+    for column in columns:
+        if isinstance(column, pa.ChunkedArray):
+            column = column.combine_chunks()
+        with np.errstate(over="ignore"):
+            hashes = _mix64(hashes * np.uint64(0x9E3779B97F4A7C15) + _hash_array(column))
+    return hashes
+
+
+def _hash_array(array: pa.Array) -> np.ndarray:
+    """64-bit hash of every value of an integer or string array, NULL hashing to a constant."""
+    if pa.types.is_integer(array.type):
+        hashes = _mix64(array.fill_null(0).to_numpy(zero_copy_only=False).astype(np.uint64))
+    else:
+        # Polynomial hash of the bytes of every string, from cumulative sums over the data buffer
+        array = array.cast(pa.large_string())
+        offsets = np.frombuffer(array.buffers()[1], dtype=np.int64)[array.offset:array.offset + len(array) + 1]
+        data = np.frombuffer(array.buffers()[2], dtype=np.uint8) if array.buffers()[2] is not None else np.zeros(0, np.uint8)
+        data = data[offsets[0]:offsets[-1]].astype(np.uint64) + np.uint64(1)
+        starts, lengths = offsets[:-1] - offsets[0], np.diff(offsets)
+        with np.errstate(over="ignore"):
+            powers = np.cumprod(np.full(int(lengths.max(initial=0)), 0x100000001B3, dtype=np.uint64))
+            positions = np.arange(len(data)) - np.repeat(starts, lengths)
+            sums = np.concatenate([np.zeros(1, np.uint64), np.cumsum(data * powers[positions], dtype=np.uint64)])
+            hashes = _mix64((sums[starts + lengths] - sums[starts]) ^ _mix64(lengths.astype(np.uint64)))
+    if array.null_count:
+        hashes[~array.is_valid().to_numpy(zero_copy_only=False)] = np.uint64(0x8A5CD789635D2DFF)
+    return hashes
+
+
+def _hash_key(key: Sequence[Any], seed: int) -> int:
+    """hash_columns() hash of a single key."""
+    columns = [pa.array([value], type=pa.int64() if isinstance(value, int) else pa.string()) for value in key]
+    return int(hash_columns(columns, seed)[0])
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """64-bit hash of integers (the SplitMix64 finalizer), vectorized."""
+    with np.errstate(over="ignore"):
+        values = values + np.uint64(0x9E3779B97F4A7C15)
+        values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return values ^ (values >> np.uint64(31))
@@ -0,0 +1,116 @@
+import duckdb
+import math
+
+from typing import Tuple
+
+from electric_vehicle_compact_schema import CompactSchema
+
+# Mean Earth radius, in kilometers
+EARTH_RADIUS_KM = 6371.0088
+# Length of a degree of latitude, in kilometers
+KM_PER_DEGREE = 2 * math.pi * EARTH_RADIUS_KM / 360
+
+
+class SpatialGridIndex:
+    """
+    Grid index over the vehicle locations, for bounding-box, radius and per-cell queries.
+
+    Each located vehicle is stored with its coordinates and the cell of a regular grid of
+    cell_degrees that contains it, along with the columns the spatial queries return. The
+    index is sorted by cell, so the min/max statistics DuckDB keeps per row group let a
+    query on a few cells skip almost the whole index instead of scanning the table and
+    parsing every Vehicle_Location.
+    """
+
+    INDEX_TABLE = "electric_vehicles_grid"
+    # Columns of the table copied into the index, so queries never go back to the table
+    COLUMNS = ("DOL_Vehicle_ID", "Make", "Model", "Model_Year", "Electric_Vehicle_Type", "City")
+    # About 1.1km of latitude, and 0.75km of longitude in Washington
+    CELL_DEGREES = 0.01
+
+    def __init__(self, table_name: str, cell_degrees: float = CELL_DEGREES) -> None:
+        """
+        Args:
+            table_name: Table of the vehicles, in the standard or the compact layout
+            cell_degrees: Width and height of a grid cell, in degrees
+        """
+        self.table_name = table_name
+        self.cell_degrees = cell_degrees
+
+    def build(self, connection: duckdb.DuckDBPyConnection) -> int:
+        """
+        Rebuild the index from the table. Vehicles without a valid location are left out.
+
+        Returns:
+            The number of vehicles indexed
+        """
+        longitude, latitude = CompactSchema.COORDINATE_COLUMNS
+        compact = connection.execute(
+            "SELECT COUNT(*) FROM duckdb_columns() WHERE table_name = ? AND column_name = ?",
+            [self.table_name, longitude]
+        ).fetchone()[0]
+        if compact:
+            coordinates = f"{longitude}, {latitude}"
+        else:
+            location, pattern = CompactSchema.LOCATION_COLUMN, CompactSchema.LOCATION_PATTERN
+            coordinates = ", ".join(
+                f"TRY_CAST(regexp_extract({location}, '{pattern}', {group}) AS DOUBLE) AS {name}"
+                for group, name in enumerate(CompactSchema.COORDINATE_COLUMNS, start=1)
+            )
+
+        connection.execute("BEGIN TRANSACTION")
+        try:
+            connection.execute(f"""
+                CREATE OR REPLACE TABLE {self.INDEX_TABLE} AS
+                SELECT {self.cell_sql(longitude)} AS Cell_X, {self.cell_sql(latitude)} AS Cell_Y, *
+                FROM (SELECT {coordinates}, {', '.join(self.COLUMNS)} FROM {self.table_name})
+                WHERE {longitude} BETWEEN -180 AND 180 AND {latitude} BETWEEN -90 AND 90
+                ORDER BY Cell_Y, Cell_X
+            """)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return connection.execute(f"SELECT COUNT(*) FROM {self.INDEX_TABLE}").fetchone()[0]
+
+    def cell_sql(self, coordinate: str) -> str:
+        """SQL of the cell number along a coordinate column, computed like cell()."""
+        return f"CAST(floor({coordinate} / CAST({self.cell_degrees!r} AS DOUBLE)) AS INTEGER)"
+
+    def cell(self, coordinate: float) -> int:
+        """Cell number along one axis of a longitude or latitude."""
+        return math.floor(coordinate / self.cell_degrees)
+
+    def cell_ranges(self, min_longitude: float, min_latitude: float, max_longitude: float,
+                    max_latitude: float) -> Tuple[int, int, int, int]:
+        """First and last cells of a bounding box: X range, then Y range."""
+        return self.cell(min_longitude), self.cell(max_longitude), self.cell(min_latitude), self.cell(max_latitude)
+
+
+def radius_bounding_box(longitude: float, latitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    Bounding box of the points within radius_km of a point. Boxes are clipped at the
+    antimeridian rather than wrapped around it.
+
+    Returns:
+        Minimum longitude, minimum latitude, maximum longitude and maximum latitude
+    """
+    # Padded by a rounding margin, so points exactly on the circle stay in the box
+    delta_latitude = radius_km / KM_PER_DEGREE + 1e-9
+    min_latitude, max_latitude = max(latitude - delta_latitude, -90.0), min(latitude + delta_latitude, 90.0)
+    # Meridians converge, so the longitude span is taken at the box edge closest to a pole
+    narrowest = math.cos(math.radians(max(abs(min_latitude), abs(max_latitude))))
+    delta_longitude = radius_km / (KM_PER_DEGREE * narrowest) + 1e-9 if narrowest > 1e-9 else math.inf
+    if delta_longitude >= 180:
+        return -180.0, min_latitude, 180.0, max_latitude
+    return max(longitude - delta_longitude, -180.0), min_latitude, min(longitude + delta_longitude, 180.0), max_latitude
+
+
+def haversine_sql(longitude: str, latitude: str, origin_longitude: str, origin_latitude: str) -> str:
+    """SQL of the great-circle distance in kilometers between two points, given as SQL expressions."""
+    return (
+        f"2 * {EARTH_RADIUS_KM} * asin(sqrt("
+        f"pow(sin(radians({latitude} - {origin_latitude}) / 2), 2) + "
+        f"cos(radians({origin_latitude})) * cos(radians({latitude})) * "
+        f"pow(sin(radians({longitude} - {origin_longitude}) / 2), 2)))"
+    )
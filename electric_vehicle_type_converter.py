@@ -0,0 +1,113 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from functools import partial
+from typing import Callable, Dict, Mapping, Optional, Sequence, Tuple
+
+# Converter signature: raw string column -> (typed column, number of values coerced to NULL)
+ColumnConverter = Callable[[pa.Array], Tuple[pa.Array, int]]
+
+
+class TypeConversionPlan:
+    """
+    Vectorized conversion of raw CSV string columns into typed Arrow columns.
+
+    The plan is compiled once from a mapping of column names to DuckDB types and applied to
+    whole batch columns. Empty strings become NULL, and values that cannot be converted to
+    the column type are coerced to NULL and counted per column.
+    """
+
+    ARROW_TYPES = {
+        "VARCHAR": pa.string(),
+        "INTEGER": pa.int32(),
+        "BIGINT": pa.int64()
+    }
+
+    # Integers are parsed through int64, so longer digit runs are rejected before casting
+    INTEGER_PATTERN = r"^\s*[+-]?[0-9]{1,18}\s*$"
+
+    def __init__(self, column_types: Mapping[str, str]) -> None:
+        """
+        Compile the conversion plan.
+
+        Args:
+            column_types: Database column types, in table order
+
+        Raises:
+            ValueError: If a column type has no vectorized converter
+        """
+        unsupported = {col_type for col_type in column_types.values() if col_type not in self.ARROW_TYPES}
+        if unsupported:
+            raise ValueError(f"No vectorized converter for column types: {sorted(unsupported)}")
+
+        self.schema = pa.schema([(col, self.ARROW_TYPES[col_type]) for col, col_type in column_types.items()])
+        self._converters: Dict[str, ColumnConverter] = {
+            field.name: self._compile(field.type) for field in self.schema
+        }
+
+    @staticmethod
+    def _compile(arrow_type: pa.DataType) -> ColumnConverter:
+        if pa.types.is_integer(arrow_type):
+            return partial(_convert_integer, arrow_type=arrow_type)
+        return _convert_string
+
+    def convert(self, columns: Mapping[str, Sequence[Optional[str]]], num_rows: int) -> Tuple[pa.Table, Dict[str, int]]:
+        """
+        Convert a batch of raw string columns.
+
+        Args:
+            columns: Raw values per column; columns missing from the mapping are filled with NULL
+            num_rows: Number of rows in the batch
+
+        Returns:
+            The typed batch following the plan's schema, and the number of values coerced to
+            NULL per column
+        """
+        arrays = []
+        coerced = {}
+        for field in self.schema:
+            values = columns.get(field.name)
+            if values is None:
+                arrays.append(pa.nulls(num_rows, type=field.type))
+                coerced[field.name] = 0
+                continue
+
+            raw = values if isinstance(values, pa.Array) else pa.array(values, type=pa.string())
+            array, coerced[field.name] = self._converters[field.name](raw)
+            arrays.append(array)
+
+        return pa.Table.from_arrays(arrays, schema=self.schema), coerced
+
+
+def _convert_string(values: pa.Array) -> Tuple[pa.Array, int]:
+    """Map empty strings to NULL, leaving every other value untouched."""
+    return pc.if_else(pc.equal(values, ""), pa.scalar(None, pa.string()), values), 0
+
+
+def _convert_integer(values: pa.Array, arrow_type: pa.DataType) -> Tuple[pa.Array, int]:
+    """Parse integers, coercing malformed or out-of-range values to NULL."""
+    present = pc.not_equal(values, "")
+    parseable = pc.match_substring_regex(values, TypeConversionPlan.INTEGER_PATTERN)
+    parsed = pc.cast(
+        pc.utf8_trim_whitespace(pc.if_else(parseable, values, pa.scalar(None, pa.string()))),
+        pa.int64()
+    )
+
+    if arrow_type != pa.int64():
+        bounds = pc.and_(
+            pc.greater_equal(parsed, pa.scalar(_integer_min(arrow_type), pa.int64())),
+            pc.less_equal(parsed, pa.scalar(_integer_max(arrow_type), pa.int64()))
+        )
+        parsed = pc.cast(pc.if_else(bounds, parsed, pa.scalar(None, pa.int64())), arrow_type)
+
+    coerced = pc.sum(pc.and_(present, pc.is_null(parsed))).as_py() or 0
+    return parsed, coerced
+
+
+def _integer_min(arrow_type: pa.DataType) -> int:
+    return -(1 << (arrow_type.bit_width - 1)) if pa.types.is_signed_integer(arrow_type) else 0
+
+
+def _integer_max(arrow_type: pa.DataType) -> int:
+    bits = arrow_type.bit_width - 1 if pa.types.is_signed_integer(arrow_type) else arrow_type.bit_width
+    return (1 << bits) - 1
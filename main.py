@@ -1,29 +1,180 @@
-import os
-import duckdb
+import argparse
+import csv
 import logging
+import os
+import sys
+
+from typing import Iterator, Optional, Sequence
+
+# Only the standard library is imported up front. DuckDB, pyarrow and pandas are imported
+# by the commands that use them, so `--help` or a single report does not pay for the rest of
+# the pipeline. `load` and `validate` (and `load --help`, which lists the load modes) import
+# the data loader, hence pyarrow and numpy.
+
+DEFAULT_CSV_PATH = "data/Electric_Vehicle_Population_Data.csv"
+DEFAULT_DB_PATH = "db/electric_vehicles.duckdb"
+
+
+class _LoadModes:
+    """
+    ElectricVehicleDataLoader.LOAD_MODES as argparse choices, imported only when a --load-mode
+    value is checked against them or listed in the help.
+    """
+
+    def __iter__(self) -> Iterator[str]:
+        from electric_vehicle_data_loader import ElectricVehicleDataLoader
+
+        return iter(ElectricVehicleDataLoader.LOAD_MODES)
+
+    def __contains__(self, load_mode: object) -> bool:
+        return load_mode in tuple(self)
+
+
+def connect(db_path: str, threads: Optional[int] = None, read_only: bool = False):
+    """
+    Open the database, creating its directory for writes.
+
+    Args:
+        db_path: DuckDB database file
+        threads: Number of DuckDB threads (defaults to the DuckDB default, the CPU count)
+        read_only: Whether the database is opened read-only, so queries can run next to
+            the query service or another reader
+    """
+    import duckdb
+
+    if not read_only:
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    return duckdb.connect(database=db_path, read_only=read_only, config={"threads": threads} if threads else {})
+
+
+def load(args: argparse.Namespace) -> None:
+    from electric_vehicle_data_loader import ElectricVehicleDataLoader
+
+    db_connection = connect(args.db, args.threads)
+    try:
+        ElectricVehicleDataLoader(
+            db_connection, args.csv, batch_size=args.batch_size, load_mode=args.load_mode, workers=args.threads
+        ).run()
+    finally:
+        db_connection.close()
+
+
+def validate(args: argparse.Namespace) -> None:
+    from electric_vehicle_data_loader import ElectricVehicleDataLoader
+
+    db_connection = connect(args.db, args.threads, read_only=True)
+    try:
+        # Without the statistics of a load in this process, the row count is checked against the input
+        # files. The columnar mode accepts every input: directories, globs and every format.
+        ElectricVehicleDataLoader(db_connection, args.csv, load_mode="columnar").validate_data_load()
+    finally:
+        db_connection.close()
+
+
+def report(args: argparse.Namespace) -> None:
+    """Write one report to stdout as CSV, or to a Parquet file with --output."""
+    from electric_vehicle_analytics import ElectricVehicleAnalytics
+
+    if args.name not in ElectricVehicleAnalytics.REPORT_QUERIES:
+        raise ValueError(f"Unknown report '{args.name}', expected one of {list(ElectricVehicleAnalytics.REPORT_QUERIES)}")
+
+    db_connection = connect(args.db, args.threads, read_only=True)
+    try:
+        analytics = ElectricVehicleAnalytics(
+            db_connection, output_dir=os.path.dirname(args.output or "") or ".",
+            use_rollup=args.use_rollup, approximate=args.approximate
+        )
+        if args.approximate and args.name in analytics.APPROXIMATE_REPORTS:
+            # Answered from the sketches, through pandas
+            df = getattr(analytics, args.name)()
+            if args.output:
+                df.to_parquet(args.output, index=False)
+            else:
+                df.to_csv(sys.stdout, index=False)
+        elif args.output:
+            rows = analytics.export_query_to_parquet(analytics.report_query(args.name), args.output)
+            logging.getLogger(__name__).info(f"Exported {rows:,} rows to {args.output}")
+        else:
+            # Rows are fetched as tuples, so printing a report needs neither pandas nor pyarrow
+            result = db_connection.execute(analytics.report_query(args.name))
+            writer = csv.writer(sys.stdout, lineterminator="\n")
+            writer.writerow(column[0] for column in result.description)
+            writer.writerows(result.fetchall())
+    finally:
+        db_connection.close()
+
+
+def run(args: argparse.Namespace) -> None:
+    """Load the CSV file, then compute and write every report."""
+    from electric_vehicle_analytics import ElectricVehicleAnalytics
+    from electric_vehicle_data_loader import ElectricVehicleDataLoader
+
+    db_connection = connect(args.db, args.threads)
+    try:
+        ElectricVehicleDataLoader(
+            db_connection, args.csv, batch_size=args.batch_size, load_mode=args.load_mode, workers=args.threads
+        ).run()
+        ElectricVehicleAnalytics(db_connection, output_dir=args.output_dir).run()
+    finally:
+        db_connection.close()
+
+
+def bench(bench_args: Sequence[str]) -> None:
+    from electric_vehicle_benchmark import main as benchmark_main
+
+    benchmark_main(bench_args)
 
-from electric_vehicle_data_loader import ElectricVehicleDataLoader
-from electric_vehicle_analytics import ElectricVehicleAnalytics
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(levelname)s: %(message)s'
-)
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Load the electric vehicle population data and report on it.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    commands = {
+        "run": subparsers.add_parser("run", help="Load the CSV file and write every report (the default)"),
+        "load": subparsers.add_parser("load", help="Load the CSV file"),
+        "validate": subparsers.add_parser("validate", help="Check the row count of the table against the input files"),
+        "report": subparsers.add_parser("report", help="Compute one report over a loaded database"),
+        "bench": subparsers.add_parser(
+            "bench", help="Run the benchmark, arguments after bench go to electric_vehicle_benchmark.py", add_help=False
+        ),
+    }
+    for name in ("run", "load", "validate", "report"):
+        commands[name].add_argument("--db", default=DEFAULT_DB_PATH, help="DuckDB database file")
+        commands[name].add_argument("--threads", type=int, help="DuckDB threads, and workers of the parallel load mode")
+    for name in ("run", "load", "validate"):
+        commands[name].add_argument("--csv", default=DEFAULT_CSV_PATH, help="CSV file, directory or glob to load")
+    for name in ("run", "load"):
+        commands[name].add_argument("--batch-size", type=int, default=5000)
+        commands[name].add_argument(
+            "--load-mode", default="serial", choices=_LoadModes(), metavar="LOAD_MODE", help="One of %(choices)s"
+        )
+    commands["run"].add_argument("--output-dir", default="analytics_output", help="Directory of the report Parquet files")
+    commands["report"].add_argument("name", help="Report name, e.g. top_3_most_popular_vehicles")
+    commands["report"].add_argument("--output", help="Parquet file to write the report to, instead of stdout")
+    commands["report"].add_argument("--use-rollup", action="store_true", help="Answer from the rollup maintained by the loader")
+    commands["report"].add_argument("--approximate", action="store_true", help="Answer the top vehicle reports from the sketches")
+    return parser
 
-def main():
-    os.makedirs(os.path.join(os.path.dirname(__file__), "db"), exist_ok=True)
-    db_connection = duckdb.connect(database="db/electric_vehicles.duckdb")
-    csv_path = "data/Electric_Vehicle_Population_Data.csv"
 
-    # Run the data loader
-    data_loader = ElectricVehicleDataLoader(db_connection, csv_path)
-    data_loader.run()
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    argv = list(sys.argv[1:] if argv is None else argv) or ["run"]
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == "bench":
+        bench(extra)
+        return
+    if extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
 
-    # Run analytics
-    analytics = ElectricVehicleAnalytics(db_connection)
-    analytics.run()
+    commands = {"run": run, "load": load, "validate": validate, "report": report}
+    try:
+        commands[args.command](args)
+    except (AssertionError, FileNotFoundError, ValueError) as e:
+        parser.exit(1, f"{parser.prog} {args.command}: error: {e}\n")
 
-    db_connection.close()
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(levelname)s: %(message)s'
+    )
     main()
@@ -1,9 +1,17 @@
+import duckdb
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 import pandas as pd
 from io import StringIO
 from pathlib import Path
+import pyarrow
+import pyarrow.parquet as pq
 from electric_vehicle_analytics import ElectricVehicleAnalytics
+from electric_vehicle_compact_schema import CompactSchema
+from electric_vehicle_data_loader import ElectricVehicleDataLoader
+from electric_vehicle_metrics import InMemoryMetricsSink, Metrics
+from electric_vehicle_result_cache import ReportResultCache
+from electric_vehicle_sketches import VehicleSketches
 
 @pytest.fixture
 def mock_db_connection():
@@ -44,6 +52,38 @@ def mock_cars_by_model_year():
         "num_cars": [100, 150, 50]
     })
 
+@pytest.fixture
+def duckdb_connection():
+    # Small fleet where every report has a single answer per group
+    connection = duckdb.connect()
+    connection.execute("""
+        CREATE TABLE electric_vehicles AS
+        SELECT * FROM (VALUES
+            ('Seattle', '98101', 'TESLA', 'MODEL 3', 2021),
+            ('Seattle', '98101', 'TESLA', 'MODEL 3', 2021),
+            ('Seattle', '98101', 'TESLA', 'MODEL 3', 2020),
+            ('Seattle', '98101', 'NISSAN', 'LEAF', 2019),
+            ('Seattle', '98102', 'NISSAN', 'LEAF', 2019),
+            ('Tacoma', '98402', 'NISSAN', 'LEAF', 2019),
+            ('Tacoma', '98402', 'KIA', 'NIRO', 2022),
+            ('Tacoma', '98402', 'TESLA', 'MODEL Y', 2018),
+            ('Tacoma', '98402', 'TESLA', 'MODEL Y', 2023),
+            ('Tacoma', '98402', 'TESLA', 'MODEL Y', 2023),
+            ('Yakima', '98908', 'TESLA', 'MODEL Y', 2023),
+            ('Yakima', '98908', 'TESLA', 'MODEL Y', 2023),
+            (NULL, NULL, 'TESLA', 'MODEL Y', NULL)
+        ) AS t(City, Postal_Code, Make, Model, Model_Year)
+    """)
+    yield connection
+    connection.close()
+
+REPORT_METHODS = [
+    "count_cars_per_city",
+    "top_3_most_popular_vehicles",
+    "most_popular_vehicle_by_postal_code",
+    "count_cars_by_model_year",
+]
+
 def test_count_cars_per_city(analytics, mock_db_connection, mock_cars_per_city):
     # Arrange
     mock_db_connection.execute.return_value.fetchdf.return_value = mock_cars_per_city
@@ -119,3 +159,434 @@ def test_run(analytics, mock_db_connection, mock_cars_per_city, mock_top_vehicle
 
     assert (analytics.output_dir / "model_year=2020" / "electric_cars_2020.parquet").exists()
     assert (analytics.output_dir / "model_year=2021" / "electric_cars_2021.parquet").exists()
+
+@pytest.mark.parametrize("report", REPORT_METHODS)
+def test_single_scan_reports_match(duckdb_connection, tmp_path, report):
+    # Arrange
+    analytics = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path))
+    expected = getattr(analytics, report)()
+
+    # Act
+    analytics._use_report_base()
+    result = getattr(analytics, report)()
+    analytics._use_table()
+
+    # Assert
+    sort_columns = list(expected.columns)
+    pd.testing.assert_frame_equal(
+        result.sort_values(sort_columns).reset_index(drop=True),
+        expected.sort_values(sort_columns).reset_index(drop=True)
+    )
+
+@pytest.mark.parametrize("report", REPORT_METHODS)
+def test_rollup_reports_match(duckdb_connection, tmp_path, report):
+    # Arrange - rollup as maintained by the data loader
+    expected = getattr(ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path)), report)()
+    duckdb_connection.execute(ElectricVehicleDataLoader.CREATE_ROLLUP_TABLE_SQL)
+    duckdb_connection.execute(f"INSERT INTO {ElectricVehicleAnalytics.ROLLUP_TABLE} {ElectricVehicleAnalytics.REPORT_BASE_SQL}")
+    analytics = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path), use_rollup=True)
+
+    # Act
+    result = getattr(analytics, report)()
+
+    # Assert
+    assert f"FROM {analytics.ROLLUP_TABLE}" in analytics.report_query(report)
+    sort_columns = list(expected.columns)
+    pd.testing.assert_frame_equal(
+        result.sort_values(sort_columns).reset_index(drop=True),
+        expected.sort_values(sort_columns).reset_index(drop=True)
+    )
+
+def test_run_single_scan(mock_db_connection, tmp_path, mock_cars_per_city, mock_top_vehicles, mock_popular_by_postal, mock_cars_by_model_year):
+    # Arrange
+    analytics = ElectricVehicleAnalytics(db_connection=mock_db_connection, output_dir=str(tmp_path), single_scan=True)
+    mock_db_connection.execute.return_value.fetchdf.side_effect = [
+        mock_cars_per_city,
+        mock_top_vehicles,
+        mock_popular_by_postal,
+        mock_cars_by_model_year
+    ]
+
+    # Act
+    analytics.run()
+
+    # Assert - the table is scanned once, every report reads the pre-aggregate
+    queries = [c[0][0] for c in mock_db_connection.execute.call_args_list]
+    assert sum("FROM electric_vehicles\n" in query for query in queries) == 1
+    assert sum(f"FROM {analytics.REPORT_BASE_NAME}" in query for query in queries) == 4
+    mock_db_connection.unregister.assert_called_once_with(analytics.REPORT_BASE_NAME)
+    assert analytics._source == analytics.TABLE_NAME
+
+@pytest.mark.parametrize("single_scan", [False, True])
+def test_run_concurrent(duckdb_connection, tmp_path, single_scan):
+    # Arrange
+    sequential = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path / "sequential"))
+    concurrent = ElectricVehicleAnalytics(
+        db_connection=duckdb_connection, output_dir=str(tmp_path / "concurrent"), single_scan=single_scan, workers=4
+    )
+    sequential.run()
+
+    # Act
+    concurrent.run()
+
+    # Assert - same files with the same rows
+    expected_files = sorted(p.relative_to(sequential.output_dir) for p in sequential.output_dir.rglob("*.parquet"))
+    assert sorted(p.relative_to(concurrent.output_dir) for p in concurrent.output_dir.rglob("*.parquet")) == expected_files
+    for relative_path in expected_files:
+        expected = pd.read_parquet(sequential.output_dir / relative_path)
+        result = pd.read_parquet(concurrent.output_dir / relative_path)
+        pd.testing.assert_frame_equal(
+            result.sort_values(list(result.columns)).reset_index(drop=True),
+            expected.sort_values(list(expected.columns)).reset_index(drop=True)
+        )
+
+def test_export_query_to_parquet(duckdb_connection, tmp_path):
+    # Arrange
+    analytics = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path), compression="zstd", row_group_size=5)
+    path = tmp_path / "fleet.parquet"
+
+    # Act
+    rows = analytics.export_query_to_parquet("SELECT * FROM electric_vehicles", path)
+
+    # Assert - batches of row_group_size rows end up as separate row groups
+    metadata = pq.ParquetFile(path).metadata
+    assert rows == 13
+    assert metadata.num_rows == 13
+    assert metadata.num_row_groups == 3
+    assert metadata.row_group(0).column(0).compression == "ZSTD"
+
+def test_run_streaming_export(duckdb_connection, tmp_path):
+    # Arrange
+    buffered = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path / "buffered"))
+    streaming = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path / "streaming"), streaming_export=True)
+    buffered.run()
+
+    # Act
+    streaming.run()
+
+    # Assert
+    for output_file in ["electric_cars_per_city.parquet", "top_3_most_popular_vehicles.parquet", "popular_vehicle_by_postal_code.parquet"]:
+        expected = pd.read_parquet(buffered.output_dir / output_file)
+        result = pd.read_parquet(streaming.output_dir / output_file)
+        pd.testing.assert_frame_equal(
+            result.sort_values(list(result.columns)).reset_index(drop=True),
+            expected.sort_values(list(expected.columns)).reset_index(drop=True)
+        )
+    assert (streaming.output_dir / "model_year=2023" / "electric_cars_2023.parquet").exists()
+
+def test_export_partitioned(duckdb_connection, tmp_path):
+    # Arrange
+    analytics = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path))
+
+    # Act
+    written = analytics.export_partitioned(
+        "SELECT City, Make, Model FROM electric_vehicles", "City", "vehicles", output_dir=tmp_path / "by_city"
+    )
+
+    # Assert
+    assert sorted(p.parent.name for p in written) == ["city=Seattle", "city=Tacoma", "city=Yakima", "city=__HIVE_DEFAULT_PARTITION__"]
+    assert len(pd.read_parquet(tmp_path / "by_city" / "city=Tacoma")) == 5
+
+def test_report_cache(duckdb_connection, tmp_path):
+    # Arrange
+    cache = ReportResultCache()
+    analytics = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path), cache=cache)
+    expected = analytics.count_cars_per_city()
+
+    # Act
+    cached = analytics.count_cars_per_city()
+    duckdb_connection.execute(ElectricVehicleDataLoader.CREATE_LOADS_TABLE_SQL)
+    duckdb_connection.execute(f"INSERT INTO {analytics.LOADS_TABLE} VALUES ('load-1', 'incremental', 'ev.csv', current_timestamp)")
+    reloaded = analytics.count_cars_per_city()
+
+    # Assert - served from the cache until a new load is recorded
+    pd.testing.assert_frame_equal(cached, expected)
+    pd.testing.assert_frame_equal(reloaded, expected)
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 2
+    assert analytics.table_fingerprint() == (13, "load-1")
+
+def test_report_top_n(duckdb_connection, tmp_path):
+    # Arrange
+    analytics = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path))
+
+    # Act
+    result = analytics.report(["Make", "Model"], n=2)
+
+    # Assert - ties are broken on the dimensions
+    assert result.values.tolist() == [["TESLA", "MODEL Y", 6], ["NISSAN", "LEAF", 3]]
+
+def test_report_top_n_per_group(duckdb_connection, tmp_path):
+    # Arrange
+    analytics = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path))
+    expected = analytics.most_popular_vehicle_by_postal_code().rename(columns={"popularity": "num_cars"})
+
+    # Act
+    result = analytics.report(["Postal_Code", "Make", "Model"], n=1, per="Postal_Code")
+
+    # Assert
+    pd.testing.assert_frame_equal(
+        result.sort_values("Postal_Code").reset_index(drop=True),
+        expected.sort_values("Postal_Code").reset_index(drop=True)
+    )
+
+def test_report_reuses_prepared_statement(duckdb_connection, tmp_path):
+    # Arrange
+    analytics = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path))
+
+    # Act
+    recent = analytics.report(["City"], model_years=(2021, 2023))
+    older = analytics.report(["City"], model_years=(2019, 2020))
+    everything = analytics.report(["City"])
+
+    # Assert - one statement per shape, the bounds are bound on each call
+    assert recent.values.tolist() == [["Tacoma", 3], ["Seattle", 2], ["Yakima", 2]]
+    assert older.values.tolist() == [["Seattle", 3], ["Tacoma", 1]]
+    assert everything["num_cars"].sum() == 13
+    assert len(analytics._prepared[duckdb_connection]) == 2
+
+def test_report_filters(tmp_path):
+    # Arrange
+    connection = duckdb.connect()
+    connection.execute("""
+        CREATE TABLE electric_vehicles AS
+        SELECT * FROM (VALUES
+            ('WA', 'TESLA', 'Battery Electric Vehicle (BEV)'),
+            ('WA', 'TESLA', 'Battery Electric Vehicle (BEV)'),
+            ('WA', 'VOLVO', 'Plug-in Hybrid Electric Vehicle (PHEV)'),
+            ('OR', 'VOLVO', 'Battery Electric Vehicle (BEV)'),
+            ('O''B', 'KIA', 'Battery Electric Vehicle (BEV)')
+        ) AS t(State, Make, Electric_Vehicle_Type)
+    """)
+    analytics = ElectricVehicleAnalytics(db_connection=connection, output_dir=str(tmp_path))
+
+    # Act
+    wa_bev = analytics.report(["Make"], state="WA", ev_type="Battery Electric Vehicle (BEV)")
+    quoted = analytics.report(["Make"], state="O'B")
+
+    # Assert
+    assert wa_bev.values.tolist() == [["TESLA", 2]]
+    assert quoted.values.tolist() == [["KIA", 1]]
+
+@pytest.mark.parametrize("arguments", [
+    {"group_by": ["Make; DROP TABLE electric_vehicles"]},
+    {"group_by": []},
+    {"group_by": ["Make", "Model"], "per": "Make"},
+    {"group_by": ["Model"], "n": 1, "per": "Make"},
+    {"group_by": ["Make"], "n": 0},
+    {"group_by": ["Make"], "n": -1},
+])
+def test_report_invalid_shape(analytics, arguments):
+    # Act & Assert
+    with pytest.raises(ValueError):
+        analytics.report(**arguments)
+
+@pytest.mark.parametrize("streaming_export", [False, True])
+def test_run_metrics(duckdb_connection, tmp_path, streaming_export):
+    # Arrange
+    sink = InMemoryMetricsSink()
+    analytics = ElectricVehicleAnalytics(
+        db_connection=duckdb_connection, output_dir=str(tmp_path), streaming_export=streaming_export, metrics=Metrics([sink])
+    )
+
+    # Act
+    analytics.run()
+
+    # Assert
+    phases = ["analytics.export"] if streaming_export else ["analytics.query", "analytics.parquet_write"]
+    assert all(len(sink.select(phase)) == 4 for phase in phases + ["analytics.report"])
+    assert sink.total("analytics.rows_written", output="electric_cars_per_city") == 4
+    assert len(sink.select("analytics.total")) == 1
+    assert sink.select("process.peak_rss_bytes", phase="analytics")[0].value > 0
+
+@pytest.mark.parametrize("report", REPORT_METHODS)
+def test_compact_table_reports_match(duckdb_connection, tmp_path, report):
+    # Arrange
+    analytics = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path))
+    expected = getattr(analytics, report)()
+    CompactSchema(analytics.TABLE_NAME, {
+        "City": "VARCHAR", "Postal_Code": "VARCHAR", "Make": "VARCHAR", "Model": "VARCHAR", "Model_Year": "INTEGER"
+    }).compact(duckdb_connection)
+
+    # Act
+    result = getattr(analytics, report)()
+
+    # Assert - groups of dictionary codes and integers come back as text
+    sort_columns = list(expected.columns)
+    pd.testing.assert_frame_equal(
+        result.sort_values(sort_columns).reset_index(drop=True),
+        expected.sort_values(sort_columns).reset_index(drop=True)
+    )
+
+def test_compact_table_report_per_group(duckdb_connection, tmp_path):
+    # Arrange
+    analytics = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path))
+    expected = analytics.report(["Postal_Code", "Make", "Model"], n=1, per="Postal_Code")
+    CompactSchema(analytics.TABLE_NAME, {
+        "City": "VARCHAR", "Postal_Code": "VARCHAR", "Make": "VARCHAR", "Model": "VARCHAR", "Model_Year": "INTEGER"
+    }).compact(duckdb_connection)
+
+    # Act
+    result = analytics.report(["Postal_Code", "Make", "Model"], n=1, per="Postal_Code")
+
+    # Assert
+    pd.testing.assert_frame_equal(result, expected)
+
+@pytest.fixture
+def located_connection():
+    # Vehicles around Seattle and Tacoma, indexed like ElectricVehicleDataLoader.run() does
+    connection = duckdb.connect()
+    connection.execute("""
+        CREATE TABLE electric_vehicles AS
+        SELECT * FROM (VALUES
+            (1, 'TESLA', 'MODEL 3', 2021, 'Battery Electric Vehicle (BEV)', 'Seattle', 'POINT (-122.331 47.611)'),
+            (2, 'NISSAN', 'LEAF', 2019, 'Battery Electric Vehicle (BEV)', 'Seattle', 'POINT (-122.335 47.615)'),
+            (3, 'TESLA', 'MODEL Y', 2023, 'Battery Electric Vehicle (BEV)', 'Seattle', 'POINT (-122.3 47.65)'),
+            (4, 'VOLVO', 'S60', 2020, 'Plug-in Hybrid Electric Vehicle (PHEV)', 'Tacoma', 'POINT (-122.44 47.25)'),
+            (5, 'KIA', 'NIRO', 2022, 'Battery Electric Vehicle (BEV)', 'Tacoma', NULL)
+        ) AS t(DOL_Vehicle_ID, Make, Model, Model_Year, Electric_Vehicle_Type, City, Vehicle_Location)
+    """)
+    ElectricVehicleAnalytics.SPATIAL_INDEX.build(connection)
+    yield connection
+    connection.close()
+
+def test_vehicles_in_bounding_box(located_connection, tmp_path):
+    # Arrange
+    analytics = ElectricVehicleAnalytics(db_connection=located_connection, output_dir=str(tmp_path))
+
+    # Act
+    vehicles = analytics.vehicles_in_bounding_box(-122.34, 47.6, -122.331, 47.615)
+
+    # Assert - edges are included
+    assert vehicles[["DOL_Vehicle_ID", "Make", "Longitude", "Latitude"]].values.tolist() == [
+        [1, "TESLA", -122.331, 47.611],
+        [2, "NISSAN", -122.335, 47.615],
+    ]
+
+def test_vehicles_within_radius(located_connection, tmp_path):
+    # Arrange - about 0.5km to vehicle 2, 4.6km to vehicle 3 and 41km to Tacoma
+    analytics = ElectricVehicleAnalytics(db_connection=located_connection, output_dir=str(tmp_path))
+
+    # Act
+    near = analytics.vehicles_within_radius(-122.331, 47.611, 1.0)
+    city = analytics.vehicles_within_radius(-122.331, 47.611, 10.0)
+    region = analytics.vehicles_within_radius(-122.331, 47.611, 50.0)
+
+    # Assert
+    assert near["DOL_Vehicle_ID"].tolist() == [1, 2]
+    assert city["DOL_Vehicle_ID"].tolist() == [1, 2, 3]
+    assert region["DOL_Vehicle_ID"].tolist() == [1, 2, 3, 4]
+    assert region["Distance_Km"].iloc[0] == 0
+    assert region["Distance_Km"].iloc[3] == pytest.approx(40.9, abs=0.1)
+
+def test_nearest_vehicles(located_connection, tmp_path):
+    # Arrange
+    analytics = ElectricVehicleAnalytics(db_connection=located_connection, output_dir=str(tmp_path))
+
+    # Act
+    nearest = analytics.nearest_vehicles(-122.43, 47.26, k=2)
+    everything = analytics.nearest_vehicles(-122.43, 47.26, k=10)
+
+    # Assert - vehicles without a location are never returned
+    assert nearest["DOL_Vehicle_ID"].tolist() == [4, 1]
+    assert everything["DOL_Vehicle_ID"].tolist() == [4, 1, 2, 3]
+
+def test_count_cars_per_cell(located_connection, tmp_path):
+    # Arrange
+    analytics = ElectricVehicleAnalytics(db_connection=located_connection, output_dir=str(tmp_path))
+
+    # Act
+    cells = analytics.count_cars_per_cell()
+    seattle = analytics.count_cars_per_cell(bounding_box=(-122.34, 47.6, -122.3, 47.62))
+
+    # Assert - vehicles 1 and 2 share a cell
+    assert cells["num_cars"].tolist() == [2, 1, 1]
+    assert cells.iloc[0][["Cell_X", "Cell_Y"]].tolist() == [-12234, 4761]
+    assert cells.iloc[0]["Min_Longitude"] <= -122.335 and cells.iloc[0]["Max_Longitude"] > -122.331
+    assert seattle["num_cars"].tolist() == [2]
+
+def _save_sketches(connection):
+    # Sketches of the table, as saved by the data loader
+    sketches = VehicleSketches()
+    sketches.update(pyarrow.Table.from_pandas(connection.execute("""
+        SELECT Postal_Code, Make, Model, CAST(row_number() OVER () AS BIGINT) AS DOL_Vehicle_ID,
+            CAST(NULL AS VARCHAR) AS VIN, CAST(NULL AS VARCHAR) AS Census_Tract
+        FROM electric_vehicles
+    """).fetchdf(), preserve_index=False))
+    connection.execute(ElectricVehicleDataLoader.CREATE_SKETCHES_TABLE_SQL)
+    connection.execute(
+        f"INSERT INTO {ElectricVehicleAnalytics.SKETCHES_TABLE} VALUES (?, ?, current_timestamp)",
+        [sketches.to_json(), sketches.rows]
+    )
+
+@pytest.mark.parametrize("report", ["top_3_most_popular_vehicles", "most_popular_vehicle_by_postal_code"])
+def test_approximate_reports_match(duckdb_connection, tmp_path, report):
+    # Arrange - few vehicles, so the sketches are exact
+    expected = getattr(ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path)), report)()
+    _save_sketches(duckdb_connection)
+    analytics = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path), approximate=True)
+
+    # Act
+    result = getattr(analytics, report)()
+
+    # Assert
+    assert (result["max_error"] == 0).all()
+    sort_columns = list(expected.columns)
+    pd.testing.assert_frame_equal(
+        result.drop(columns="max_error").sort_values(sort_columns).reset_index(drop=True),
+        expected.sort_values(sort_columns).reset_index(drop=True)
+    )
+
+def test_approximate_counts(duckdb_connection, tmp_path):
+    # Arrange
+    _save_sketches(duckdb_connection)
+    analytics = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path))
+
+    # Act
+    overall = analytics.approximate_vehicle_count("TESLA", "MODEL Y")
+    in_postal_code = analytics.approximate_vehicle_count("TESLA", "MODEL 3", postal_code="98101")
+    distinct = analytics.approximate_distinct_count("DOL_Vehicle_ID")
+
+    # Assert
+    assert (overall.value, in_postal_code.value) == (6, 3)
+    assert abs(distinct.value - 13) <= distinct.error
+
+def test_approximate_sketches_reloaded(duckdb_connection, tmp_path):
+    # Arrange
+    _save_sketches(duckdb_connection)
+    analytics = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path), approximate=True)
+    first = analytics.sketches()
+    duckdb_connection.execute("INSERT INTO electric_vehicles VALUES ('Seattle', '98101', 'KIA', 'NIRO', 2022)")
+
+    # Act
+    unchanged = analytics.sketches()
+    duckdb_connection.execute(f"DELETE FROM {analytics.SKETCHES_TABLE}")
+    _save_sketches(duckdb_connection)
+    saved_again = analytics.sketches()
+
+    # Assert - the saved sketches are parsed once per save
+    assert unchanged is first
+    assert saved_again is not first
+    assert saved_again.rows == 14
+
+def test_approximate_without_sketches(duckdb_connection, tmp_path):
+    # Arrange
+    analytics = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path), approximate=True)
+
+    # Act & Assert
+    with pytest.raises(ValueError):
+        analytics.top_3_most_popular_vehicles()
+
+def test_run_approximate_streaming_export(duckdb_connection, tmp_path):
+    # Arrange
+    _save_sketches(duckdb_connection)
+    analytics = ElectricVehicleAnalytics(
+        db_connection=duckdb_connection, output_dir=str(tmp_path), approximate=True, streaming_export=True
+    )
+
+    # Act
+    analytics.run()
+
+    # Assert - approximate reports are written from the sketches, the others streamed
+    assert list(pd.read_parquet(tmp_path / "top_3_most_popular_vehicles.parquet").columns) == ["Make", "Model", "popularity", "max_error"]
+    assert len(pd.read_parquet(tmp_path / "electric_cars_per_city.parquet")) == 4
@@ -0,0 +1,59 @@
+import csv
+import duckdb
+import json
+import pytest
+from electric_vehicle_analytics import ElectricVehicleAnalytics
+from electric_vehicle_benchmark import ElectricVehicleBenchmark, generate_csv, main, percentiles
+from electric_vehicle_data_loader import ElectricVehicleDataLoader
+
+def test_generate_csv(tmp_path):
+    # Act
+    path = generate_csv(tmp_path / "fleet.csv", rows=500, seed=7)
+
+    # Assert - loadable without coercions, and reproducible
+    with open(path, newline="", encoding="utf-8") as csvfile:
+        records = list(csv.reader(csvfile))
+    assert records[0] == list(ElectricVehicleDataLoader.CSV_TO_DB_COLUMNS)
+    assert len(records) == 501
+    assert generate_csv(tmp_path / "again.csv", rows=500, seed=7).read_bytes() == path.read_bytes()
+
+    connection = duckdb.connect()
+    loader = ElectricVehicleDataLoader(connection, str(path), load_mode="columnar")
+    loader.run()
+    assert not any(loader.coerced_nulls.values())
+
+def test_percentiles():
+    # Act
+    summary = percentiles([0.4, 0.1, 0.3, 0.2])
+
+    # Assert
+    assert summary == {"p50": 0.2, "p90": 0.4, "p99": 0.4, "mean": pytest.approx(0.25), "min": 0.1, "max": 0.4}
+
+def test_invalid_load_mode(tmp_path):
+    # Act & Assert
+    with pytest.raises(ValueError):
+        ElectricVehicleBenchmark(tmp_path, load_modes=["unknown"])
+
+def test_main_writes_results(tmp_path):
+    # Arrange
+    output = tmp_path / "results.json"
+
+    # Act
+    main([
+        "--rows", "300", "--batch-sizes", "100", "200", "--load-modes", "columnar", "parallel", "built_in", "--workers", "1", "2",
+        "--repeats", "1", "--work-dir", str(tmp_path), "--output", str(output)
+    ])
+
+    # Assert - one entry per mode and batch size, parallel per worker count, built_in once, and one per report
+    results = json.loads(output.read_text())
+    loads = [(load["load_mode"], load["batch_size"], load["workers"]) for load in results["loads"]]
+    assert loads == [
+        ("columnar", 100, None), ("columnar", 200, None), ("parallel", None, 1), ("parallel", None, 2), ("built_in", None, None)
+    ]
+    assert all(load["rows"] == 300 and load["rows_per_second"] > 0 and load["peak_rss_bytes"] > 0 for load in results["loads"])
+    assert [report["report"] for report in results["reports"]] == [name for name, *_ in ElectricVehicleAnalytics.REPORTS]
+    assert [entry["command"] for entry in results["startup"]] == [
+        "import main", "import electric_vehicle_data_loader", "import electric_vehicle_analytics"
+    ] + [f"report {name}" for name, *_ in ElectricVehicleAnalytics.REPORTS]
+    assert all(entry["seconds"]["p50"] > 0 for entry in results["startup"])
+    assert results["environment"]["duckdb"] == duckdb.__version__
@@ -0,0 +1,135 @@
+import duckdb
+import pytest
+from electric_vehicle_compact_schema import CompactSchema
+
+COLUMN_TYPES = {
+    "City": "VARCHAR",
+    "Postal_Code": "VARCHAR",
+    "Model_Year": "INTEGER",
+    "Legislative_District": "VARCHAR",
+    "Vehicle_Location": "VARCHAR",
+    "Census_Tract": "VARCHAR",
+}
+
+@pytest.fixture
+def duckdb_connection():
+    connection = duckdb.connect()
+    connection.execute("""
+        CREATE TABLE electric_vehicles AS
+        SELECT * FROM (VALUES
+            ('Seattle', '98101', 2021, '43', 'POINT (-122.30000 47.60000)', '02101'),
+            ('Tacoma', '98402', 2019, '27', 'POINT (-122.44 47.25)', '53053000100'),
+            ('Seattle', '98101', 2020, NULL, NULL, NULL),
+            (NULL, NULL, NULL, '7', 'unknown', '53077000904')
+        ) AS t(City, Postal_Code, Model_Year, Legislative_District, Vehicle_Location, Census_Tract)
+    """)
+    yield connection
+    connection.close()
+
+@pytest.fixture
+def schema():
+    return CompactSchema("electric_vehicles", COLUMN_TYPES)
+
+def column_types(connection):
+    return dict(connection.execute(
+        "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = 'electric_vehicles' ORDER BY column_index"
+    ).fetchall())
+
+def test_discover(duckdb_connection, schema):
+    # Act
+    compact_types = schema.discover(duckdb_connection)
+
+    # Assert - codes with a leading zero are stored as a dictionary instead of an integer
+    assert compact_types == {
+        "City": "ENUM",
+        "Postal_Code": "UINTEGER",
+        "Legislative_District": "UTINYINT",
+        "Census_Tract": "ENUM",
+    }
+
+def test_compact(duckdb_connection, schema):
+    # Act
+    schema.compact(duckdb_connection)
+
+    # Assert
+    assert schema.is_compact(duckdb_connection)
+    assert column_types(duckdb_connection) == {
+        "City": "ENUM('Seattle', 'Tacoma')",
+        "Postal_Code": "UINTEGER",
+        "Model_Year": "INTEGER",
+        "Legislative_District": "UTINYINT",
+        "Vehicle_Location": "VARCHAR",
+        "Census_Tract": "ENUM('02101', '53053000100', '53077000904')",
+        "Longitude": "DOUBLE",
+        "Latitude": "DOUBLE",
+    }
+    assert duckdb_connection.execute(
+        "SELECT Longitude, Latitude FROM electric_vehicles ORDER BY Model_Year NULLS LAST"
+    ).fetchall() == [(-122.44, 47.25), (None, None), (-122.3, 47.6), (None, None)]
+
+def test_expand_round_trip(duckdb_connection, schema):
+    # Arrange
+    expected = duckdb_connection.execute("SELECT * FROM electric_vehicles ORDER BY ALL").fetchall()
+    schema.compact(duckdb_connection)
+
+    # Act
+    schema.expand(duckdb_connection)
+
+    # Assert - every value comes back as written, trailing zeros and locations that are not a POINT included
+    assert not schema.is_compact(duckdb_connection)
+    assert column_types(duckdb_connection) == COLUMN_TYPES
+    assert duckdb_connection.execute("SELECT * FROM electric_vehicles ORDER BY ALL").fetchall() == expected
+
+def test_compact_twice(duckdb_connection, schema):
+    # Arrange - values added after a compaction extend the dictionaries on the next one
+    schema.compact(duckdb_connection)
+    schema.expand(duckdb_connection)
+    duckdb_connection.execute("INSERT INTO electric_vehicles VALUES ('Bellevue', '98004', 2023, '48', NULL, NULL)")
+
+    # Act
+    schema.compact(duckdb_connection)
+    schema.compact(duckdb_connection)
+
+    # Assert
+    assert column_types(duckdb_connection)["City"] == "ENUM('Bellevue', 'Seattle', 'Tacoma')"
+    assert duckdb_connection.execute("SELECT COUNT(*) FROM electric_vehicles").fetchone()[0] == 5
+
+def test_append(duckdb_connection, schema):
+    # Arrange
+    schema.compact(duckdb_connection)
+    duckdb_connection.execute("""
+        CREATE TABLE new_vehicles AS
+        SELECT * FROM (VALUES ('Tacoma', '98403', 2024, '27', 'POINT (-122.45 47.26)', '53053000100'))
+        AS t(City, Postal_Code, Model_Year, Legislative_District, Vehicle_Location, Census_Tract)
+    """)
+
+    # Act
+    rewritten = schema.append(duckdb_connection, "new_vehicles")
+
+    # Assert - the values fit the stored types, the row is appended in place
+    assert not rewritten
+    assert column_types(duckdb_connection)["City"] == "ENUM('Seattle', 'Tacoma')"
+    assert duckdb_connection.execute(
+        "SELECT Postal_Code, Longitude, Latitude FROM electric_vehicles WHERE Model_Year = 2024"
+    ).fetchall() == [(98403, -122.45, 47.26)]
+
+@pytest.mark.parametrize("city, postal_code", [("Bellevue", "98004"), ("Seattle", "09810"), ("Seattle", "98101-1234")])
+def test_append_rewrites(duckdb_connection, schema, city, postal_code):
+    # Arrange - a city missing from the ENUM, or a postal code that does not cast back to the same text
+    expected = duckdb_connection.execute("SELECT * FROM electric_vehicles").fetchall() + [
+        (city, postal_code, 2023, "48", None, None)
+    ]
+    schema.compact(duckdb_connection)
+    duckdb_connection.execute(f"""
+        CREATE TABLE new_vehicles AS
+        SELECT * FROM (VALUES ('{city}', '{postal_code}', 2023, '48', NULL, NULL))
+        AS t(City, Postal_Code, Model_Year, Legislative_District, Vehicle_Location, Census_Tract)
+    """)
+
+    # Act
+    rewritten = schema.append(duckdb_connection, "new_vehicles")
+    schema.expand(duckdb_connection)
+
+    # Assert
+    assert rewritten
+    assert sorted(duckdb_connection.execute("SELECT * FROM electric_vehicles").fetchall(), key=str) == sorted(expected, key=str)
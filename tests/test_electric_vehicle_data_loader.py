@@ -1,7 +1,11 @@
+import duckdb
+import logging
 import pytest
 from unittest.mock import Mock, patch, call, mock_open
 from io import StringIO
-from electric_vehicle_data_loader import ElectricVehicleDataLoader
+from electric_vehicle_data_loader import ElectricVehicleDataLoader, _parse_csv_chunk, split_csv_into_chunks
+from electric_vehicle_metrics import InMemoryMetricsSink, Metrics
+from electric_vehicle_sketches import VehicleSketches
 
 @pytest.fixture
 def mock_db_connection():
@@ -63,7 +67,7 @@ def test_convert_value(data_loader):
     # Act & Assert - non-convertible column
     assert data_loader._convert_value("Make", "Tesla") == "Tesla"
 
-@patch("builtins.open", new_callable=mock_open)
+@patch("electric_vehicle_data_loader.open", new_callable=mock_open, create=True)
 def test_load_data(mock_open_file, data_loader, mock_db_connection, sample_csv_content):
     # Arrange
     mock_open_file.return_value = StringIO(sample_csv_content)
@@ -96,7 +100,7 @@ def test_load_data(mock_open_file, data_loader, mock_db_connection, sample_csv_c
     ]
     mock_db_connection.executemany.assert_has_calls(expected_calls, any_order=False)
 
-@patch("builtins.open", new_callable=mock_open)
+@patch("electric_vehicle_data_loader.open", new_callable=mock_open, create=True)
 def test_validate_data_load_success(mock_open_file, data_loader, mock_db_connection, sample_csv_content):
     # Arrange
     mock_open_file.return_value = StringIO(sample_csv_content)
@@ -108,7 +112,7 @@ def test_validate_data_load_success(mock_open_file, data_loader, mock_db_connect
     # Assert
     mock_db_connection.execute.assert_called_with("SELECT COUNT(*) FROM electric_vehicles;")
 
-@patch("builtins.open", new_callable=mock_open)
+@patch("electric_vehicle_data_loader.open", new_callable=mock_open, create=True)
 def test_validate_data_load_mismatch(mock_open_file, data_loader, mock_db_connection, sample_csv_content):
     # Arrange
     mock_open_file.return_value = StringIO(sample_csv_content)
@@ -118,24 +122,665 @@ def test_validate_data_load_mismatch(mock_open_file, data_loader, mock_db_connec
     with pytest.raises(AssertionError):
         data_loader.validate_data_load()
 
-@patch("builtins.open", new_callable=mock_open)
+@patch("electric_vehicle_data_loader.open", new_callable=mock_open, create=True)
 def test_run(mock_open_file, data_loader, mock_db_connection, sample_csv_content):
-    # Arrange
-    mock_open_file.side_effect = [
-        StringIO(sample_csv_content),  # First call in load_data()
-        StringIO(sample_csv_content)   # Second call in validate_data_load()
-    ]
-    mock_db_connection.execute.return_value.fetchone.return_value = [3]
+    # Arrange - the aggregate queries return the statistics gathered so far, i.e. what was inserted
+    mock_open_file.return_value = StringIO(sample_csv_content)
+    mock_db_connection.execute.return_value.fetchone.side_effect = lambda: (
+        data_loader.load_statistics.as_row() if data_loader.load_statistics else (True,)
+    )
 
-    # Act
-    data_loader.run()
+    # Act - on a table in the standard layout
+    with patch.object(data_loader.COMPACT_SCHEMA, "is_compact", return_value=False), \
+            patch.object(data_loader, "_table_exists", return_value=False):
+        data_loader.run()
 
     # Assert
     mock_db_connection.execute.assert_any_call(data_loader.CREATE_TABLE_SQL)
     mock_db_connection.execute.assert_any_call("BEGIN TRANSACTION")
     mock_db_connection.execute.assert_any_call("COMMIT")
-    mock_db_connection.execute.assert_called_with("SELECT COUNT(*) FROM electric_vehicles;")
+    mock_db_connection.execute.assert_called_with(data_loader.load_statistics.aggregate_query("electric_vehicles"))
 
     # Verify executemany was called 3 times for batch inserts
     assert mock_db_connection.executemany.call_count == 3
-    assert mock_open_file.call_count == 2
+
+    # A new table version is recorded
+    mock_db_connection.execute.assert_any_call(data_loader.CREATE_LOADS_TABLE_SQL)
+
+    # Validation is computed during the load, the CSV file is read only once
+    assert mock_open_file.call_count == 1
+    assert data_loader.load_statistics.rows == 3
+    assert data_loader.load_statistics.null_counts["Legislative_District"] == 2
+
+@pytest.fixture
+def multiline_csv_path(tmp_path, sample_csv_content):
+    # Quoted fields containing newlines, commas and escaped quotes must stay in one record
+    lines = sample_csv_content.splitlines()
+    records = [
+        '5YJ3E1EB4L,Yakima,"Yakima\nValley",WA,98908,2020,TESLA,"MODEL ""3""",Battery Electric Vehicle (BEV),Clean Alternative Fuel Vehicle Eligible,322,0,14,127175366,"POINT (-120.56916 46.58514)",PACIFICORP,53077000904',
+        '7JRBR0FL9M,Lane,Eugene,OR,97404,bad,VOLVO,"S60,\n\nT8",Plug-in Hybrid Electric Vehicle (PHEV),Not eligible due to low battery range,22,0,,144502018,POINT (-123.12802 44.09573),,41039002401',
+    ]
+    csv_path = tmp_path / "multiline_ev_data.csv"
+    csv_path.write_text("\n".join(lines + records * 20) + "\n", encoding="utf-8")
+    return csv_path
+
+@pytest.fixture
+def duckdb_connection():
+    connection = duckdb.connect()
+    yield connection
+    connection.close()
+
+def test_invalid_load_mode(mock_db_connection, tmp_path, sample_csv_content):
+    # Arrange
+    csv_path = tmp_path / "test_ev_data.csv"
+    csv_path.write_text(sample_csv_content)
+
+    # Act & Assert
+    with pytest.raises(ValueError):
+        ElectricVehicleDataLoader(db_connection=mock_db_connection, csv_path=str(csv_path), load_mode="unknown")
+
+def test_split_csv_into_chunks(multiline_csv_path):
+    # Arrange
+    content = multiline_csv_path.read_bytes()
+
+    # Act
+    fieldnames, chunks = split_csv_into_chunks(str(multiline_csv_path), chunk_bytes=100)
+
+    # Assert - ranges are contiguous, cover every record and each one parses to whole records
+    assert fieldnames == list(ElectricVehicleDataLoader.CSV_TO_DB_COLUMNS)
+    assert chunks[0][0] == content.index(b"\n") + 1
+    assert chunks[-1][1] == len(content)
+    assert all(prev_end == start for (_, prev_end), (start, _) in zip(chunks, chunks[1:]))
+    batches = [_parse_csv_chunk(str(multiline_csv_path), start, end, fieldnames)[0] for start, end in chunks]
+    assert sum(batch.num_rows for batch in batches) == 43
+    assert all(batch.schema == ElectricVehicleDataLoader.ARROW_SCHEMA for batch in batches)
+
+def test_load_data_parallel_matches_serial(duckdb_connection, multiline_csv_path, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(ElectricVehicleDataLoader, "PARALLEL_CHUNK_BYTES", 256)
+    serial_loader = ElectricVehicleDataLoader(duckdb_connection, str(multiline_csv_path), batch_size=7)
+    serial_loader.create_table()
+    serial_loader.load_data()
+    expected = duckdb_connection.execute("SELECT * FROM electric_vehicles").fetchall()
+    duckdb_connection.execute("DELETE FROM electric_vehicles")
+    parallel_loader = ElectricVehicleDataLoader(
+        duckdb_connection, str(multiline_csv_path), batch_size=7, load_mode="parallel", workers=2
+    )
+
+    # Act
+    parallel_loader.load_data_parallel()
+
+    # Assert - same rows, in the same order
+    assert duckdb_connection.execute("SELECT * FROM electric_vehicles").fetchall() == expected
+
+def test_load_data_columnar_matches_serial(duckdb_connection, multiline_csv_path):
+    # Arrange
+    serial_loader = ElectricVehicleDataLoader(duckdb_connection, str(multiline_csv_path), batch_size=7)
+    serial_loader.create_table()
+    serial_loader.load_data()
+    expected = duckdb_connection.execute("SELECT * FROM electric_vehicles").fetchall()
+    duckdb_connection.execute("DELETE FROM electric_vehicles")
+    columnar_loader = ElectricVehicleDataLoader(duckdb_connection, str(multiline_csv_path), batch_size=7, load_mode="columnar")
+
+    # Act
+    columnar_loader.load_data_columnar()
+
+    # Assert
+    assert duckdb_connection.execute("SELECT * FROM electric_vehicles").fetchall() == expected
+    assert columnar_loader.coerced_nulls["Model_Year"] == 20
+    assert columnar_loader.coerced_nulls["Legislative_District"] == 0
+
+def test_load_data_columnar_batches(data_loader, mock_db_connection):
+    # Arrange - batch_size=1 yields one relation per record
+
+    # Act
+    data_loader.load_data_columnar()
+
+    # Assert
+    mock_db_connection.execute.assert_any_call("BEGIN TRANSACTION")
+    mock_db_connection.execute.assert_any_call("COMMIT")
+    assert mock_db_connection.register.call_count == 3
+    assert mock_db_connection.unregister.call_count == 3
+    mock_db_connection.executemany.assert_not_called()
+    batch = mock_db_connection.register.call_args_list[0][0][1]
+    assert batch.to_pylist()[0]["Model_Year"] == 2020
+    assert batch.to_pylist()[0]["Legislative_District"] == "14"
+
+def test_load_data_incremental(duckdb_connection, tmp_path, sample_csv_content):
+    # Arrange - first sync loads the whole file, the second one changes, removes and adds a vehicle
+    header, tesla_yakima, tesla_san_diego, volvo_eugene = sample_csv_content.splitlines()
+    csv_path = tmp_path / "test_ev_data.csv"
+    csv_path.write_text(sample_csv_content)
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(csv_path), load_mode="incremental")
+    loader.create_table()
+    loader.load_data_incremental()
+    assert loader.last_load_changes == {"insert": 3}
+
+    leaf_tacoma = "1N4AZ0CP5D,Pierce,Tacoma,WA,98402,2013,NISSAN,LEAF,Battery Electric Vehicle (BEV),Clean Alternative Fuel Vehicle Eligible,75,0,27,100000001,POINT (-122.43 47.25),PUGET SOUND ENERGY INC,53053061602"
+    csv_path.write_text("\n".join([header, tesla_yakima.replace(",322,", ",330,"), tesla_san_diego, leaf_tacoma]) + "\n")
+
+    # Act
+    loader.load_data_incremental()
+
+    # Assert
+    assert loader.last_load_changes == {"insert": 1, "update": 1, "delete": 1}
+    rows = duckdb_connection.execute(
+        "SELECT DOL_Vehicle_ID, Electric_Range FROM electric_vehicles ORDER BY DOL_Vehicle_ID"
+    ).fetchall()
+    assert rows == [(100000001, 75), (127175366, 330), (266614659, 220)]
+
+def _rollup_matches_table(connection):
+    dimensions = ", ".join(ElectricVehicleDataLoader.ROLLUP_DIMENSIONS)
+    expected = connection.execute(f"SELECT {dimensions}, COUNT(*) FROM electric_vehicles GROUP BY ALL ORDER BY ALL").fetchall()
+    rollup = connection.execute(f"SELECT * FROM {ElectricVehicleDataLoader.ROLLUP_TABLE} ORDER BY ALL").fetchall()
+    return rollup == expected
+
+@pytest.mark.parametrize("load_mode", ["serial", "columnar", "checkpointed"])
+def test_run_maintains_rollup(duckdb_connection, multiline_csv_path, load_mode):
+    # Arrange - the second run appends the file again
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(multiline_csv_path), batch_size=7, load_mode=load_mode, checkpoint_every=2)
+    loader.run()
+    assert _rollup_matches_table(duckdb_connection)
+
+    # Act
+    loader.run()
+
+    # Assert
+    assert _rollup_matches_table(duckdb_connection)
+    assert duckdb_connection.execute(f"SELECT SUM(num_cars) FROM {loader.ROLLUP_TABLE}").fetchone()[0] == 86
+
+def test_run_incremental_updates_rollup_from_delta(duckdb_connection, tmp_path, sample_csv_content, caplog):
+    # Arrange
+    header, tesla_yakima, tesla_san_diego, volvo_eugene = sample_csv_content.splitlines()
+    csv_path = tmp_path / "test_ev_data.csv"
+    csv_path.write_text(sample_csv_content)
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(csv_path), load_mode="incremental")
+    loader.run()
+    csv_path.write_text("\n".join([header, tesla_yakima.replace(",Yakima,WA,", ",Selah,WA,"), tesla_san_diego]) + "\n")
+
+    # Act
+    with caplog.at_level(logging.INFO):
+        loader.run()
+
+    # Assert - the delta alone brought the rollup in sync, no rebuild was needed
+    assert _rollup_matches_table(duckdb_connection)
+    assert "Rollup is out of date" not in caplog.text
+    cities = duckdb_connection.execute(f"SELECT City FROM {loader.ROLLUP_TABLE} ORDER BY City").fetchall()
+    assert cities == [("San Diego",), ("Selah",)]
+
+def test_refresh_rollup_after_untracked_update(duckdb_connection, tmp_path, sample_csv_content):
+    # Arrange - a row moves to another city, the row count does not change
+    csv_path = tmp_path / "test_ev_data.csv"
+    csv_path.write_text(sample_csv_content)
+    ElectricVehicleDataLoader(duckdb_connection, str(csv_path), load_mode="incremental").run()
+    csv_path.write_text(sample_csv_content.replace(",Yakima,WA,", ",Selah,WA,"))
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(csv_path), load_mode="incremental")
+
+    # Act - loaded without tracking the rollup delta
+    loader.load_data_incremental()
+    loader.refresh_rollup()
+
+    # Assert
+    assert loader.last_load_changes == {"update": 1}
+    assert _rollup_matches_table(duckdb_connection)
+
+def test_run_rebuilds_rollup_after_run_without_it(duckdb_connection, tmp_path, sample_csv_content, caplog):
+    # Arrange - a run that does not maintain the rollup updates a row
+    csv_path = tmp_path / "test_ev_data.csv"
+    csv_path.write_text(sample_csv_content)
+    ElectricVehicleDataLoader(duckdb_connection, str(csv_path), load_mode="incremental").run()
+    csv_path.write_text(sample_csv_content.replace(",Yakima,WA,", ",Selah,WA,"))
+    ElectricVehicleDataLoader(duckdb_connection, str(csv_path), load_mode="incremental", maintain_rollup=False).run()
+
+    # Act - the file did not change since
+    with caplog.at_level(logging.INFO):
+        ElectricVehicleDataLoader(duckdb_connection, str(csv_path), load_mode="incremental").run()
+
+    # Assert
+    assert "Rollup is out of date" in caplog.text
+    assert _rollup_matches_table(duckdb_connection)
+
+def test_refresh_rollup_rebuild(duckdb_connection, multiline_csv_path):
+    # Arrange - a change made outside the loader that keeps the row count
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(multiline_csv_path), load_mode="columnar")
+    loader.run()
+    duckdb_connection.execute("UPDATE electric_vehicles SET City = 'Selah' WHERE City = 'Yakima'")
+
+    # Act
+    loader.refresh_rollup(rebuild=True)
+
+    # Assert
+    assert _rollup_matches_table(duckdb_connection)
+
+def test_load_data_incremental_unchanged_file(duckdb_connection, data_loader, mock_db_connection):
+    # Arrange - table populated by a plain append, so the row hashes are rebuilt on first sync
+    data_loader.db_connection = duckdb_connection
+    data_loader.create_table()
+    data_loader.load_data_columnar()
+
+    # Act
+    data_loader.load_data_incremental()
+
+    # Assert
+    assert data_loader.last_load_changes == {}
+    assert duckdb_connection.execute("SELECT COUNT(*) FROM electric_vehicles").fetchone()[0] == 3
+
+def test_load_data_incremental_duplicate_keys(duckdb_connection, multiline_csv_path):
+    # Arrange - the multi-line sample repeats the same vehicles
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(multiline_csv_path), load_mode="incremental")
+    loader.create_table()
+
+    # Act & Assert
+    with pytest.raises(ValueError):
+        loader.load_data_incremental()
+    assert duckdb_connection.execute("SELECT COUNT(*) FROM electric_vehicles").fetchone()[0] == 0
+
+def test_load_data_checkpointed_resumes(duckdb_connection, multiline_csv_path):
+    # Arrange - fail on the fourth batch, after the first two batches were checkpointed
+    loader = ElectricVehicleDataLoader(
+        duckdb_connection, str(multiline_csv_path), batch_size=5, load_mode="checkpointed", checkpoint_every=2
+    )
+    loader.create_table()
+    insert_table = loader._insert_table
+    inserted_batches = []
+
+    def failing_insert(batch, table_name=None):
+        inserted_batches.append(batch)
+        if len(inserted_batches) == 4:
+            raise RuntimeError("disk full")
+        insert_table(batch, table_name)
+
+    with patch.object(loader, "_insert_table", side_effect=failing_insert):
+        with pytest.raises(RuntimeError):
+            loader.load_data_checkpointed()
+    assert duckdb_connection.execute("SELECT COUNT(*) FROM electric_vehicles").fetchone()[0] == 10
+
+    # Act
+    loader.load_data_checkpointed()
+
+    # Assert - the resumed load continues after the checkpoint without duplicating rows
+    assert duckdb_connection.execute("SELECT COUNT(*) FROM electric_vehicles").fetchone()[0] == 43
+    loader.validate_data_load()
+    assert duckdb_connection.execute(
+        f"SELECT Rows_Loaded, Completed FROM {loader.CHECKPOINTS_TABLE}"
+    ).fetchall() == [(43, True)]
+
+def test_load_data_checkpointed_changed_file(duckdb_connection, multiline_csv_path):
+    # Arrange
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(multiline_csv_path), load_mode="checkpointed")
+    loader.create_table()
+    duckdb_connection.execute(loader.CREATE_CHECKPOINTS_TABLE_SQL)
+    loader._reset_load_statistics()
+    loader._save_checkpoint(Mock(st_size=1, st_mtime=0.0), byte_offset=1, rows_loaded=1, completed=False)
+
+    # Act & Assert
+    with pytest.raises(ValueError):
+        loader.load_data_checkpointed()
+
+def test_validate_data_load_statistics(duckdb_connection, multiline_csv_path):
+    # Arrange - rows already in the table are not attributed to the load
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(multiline_csv_path), load_mode="columnar")
+    loader.create_table()
+    loader.load_data_columnar()
+    loader.load_data_columnar()
+
+    # Act & Assert - multi-line records are counted as one row
+    loader.validate_data_load()
+    assert loader.load_statistics.rows == 43
+
+def test_validate_data_load_checksum_mismatch(duckdb_connection, multiline_csv_path):
+    # Arrange - same row count, altered value
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(multiline_csv_path), load_mode="columnar")
+    loader.create_table()
+    loader.load_data_columnar()
+    duckdb_connection.execute("UPDATE electric_vehicles SET Electric_Range = 0 WHERE Electric_Range = 22")
+
+    # Act & Assert
+    with pytest.raises(AssertionError, match="checksum\\(Electric_Range\\)"):
+        loader.validate_data_load()
+
+def test_run_metrics(duckdb_connection, multiline_csv_path):
+    # Arrange
+    sink = InMemoryMetricsSink()
+    loader = ElectricVehicleDataLoader(
+        duckdb_connection, str(multiline_csv_path), batch_size=10, load_mode="columnar", metrics=Metrics([sink])
+    )
+
+    # Act
+    loader.run()
+
+    # Assert - every phase is timed once per batch, or once per run
+    assert all(len(sink.select(phase)) == 5 for phase in ["load.read", "load.parse", "load.convert", "load.insert"])
+    assert all(len(sink.select(phase)) == 1 for phase in ["load.commit", "load.validate", "load.total", "load.rollup"])
+    assert sink.total("load.rows", table="electric_vehicles") == 43
+    assert sink.total("load.bytes") == multiline_csv_path.stat().st_size - len(multiline_csv_path.read_bytes().split(b"\n")[0]) - 1
+    assert sink.total("load.coerced_nulls", column="Model_Year") == 20
+    assert sink.select("process.peak_rss_bytes", phase="load")[0].value > 0
+
+def test_mmap_reader_matches_python_reader(duckdb_connection, multiline_csv_path):
+    # Arrange
+    python_loader = ElectricVehicleDataLoader(duckdb_connection, str(multiline_csv_path), batch_size=7, load_mode="columnar")
+    python_loader.create_table()
+    python_loader.load_data_columnar()
+    expected = duckdb_connection.execute("SELECT * FROM electric_vehicles ORDER BY ALL").fetchall()
+    duckdb_connection.execute("DROP TABLE electric_vehicles")
+    mmap_loader = ElectricVehicleDataLoader(duckdb_connection, str(multiline_csv_path), load_mode="columnar", reader="mmap")
+
+    # Act
+    mmap_loader.run()
+
+    # Assert - quoted newlines, commas and quotes survive, bad values are coerced the same way
+    assert duckdb_connection.execute("SELECT * FROM electric_vehicles ORDER BY ALL").fetchall() == expected
+    assert mmap_loader.coerced_nulls == python_loader.coerced_nulls
+
+def test_mmap_reader_missing_columns(duckdb_connection, tmp_path):
+    # Arrange - columns absent from the header are loaded as NULL
+    csv_path = tmp_path / "partial.csv"
+    csv_path.write_text("Model Year,Make,DOL Vehicle ID\n2020,TESLA,1\n,NISSAN,2\n")
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(csv_path), load_mode="columnar", reader="mmap")
+
+    # Act
+    loader.run()
+
+    # Assert
+    rows = duckdb_connection.execute("SELECT VIN, Model_Year, Make, DOL_Vehicle_ID FROM electric_vehicles ORDER BY 4").fetchall()
+    assert rows == [(None, 2020, "TESLA", 1), (None, None, "NISSAN", 2)]
+
+@pytest.mark.parametrize("arguments", [{"reader": "unknown"}, {"reader": "mmap", "load_mode": "checkpointed"}])
+def test_invalid_reader(mock_db_connection, multiline_csv_path, arguments):
+    # Act & Assert
+    with pytest.raises(ValueError):
+        ElectricVehicleDataLoader(db_connection=mock_db_connection, csv_path=str(multiline_csv_path), **arguments)
+
+@pytest.fixture
+def shards_dir(tmp_path, sample_csv_content, multiline_csv_path):
+    shards = tmp_path / "shards"
+    shards.mkdir()
+    (shards / "part-0.csv").write_text(sample_csv_content)
+    (shards / "part-1.csv").write_bytes(multiline_csv_path.read_bytes())
+    (shards / "README.txt").write_text("not a shard")
+    return shards
+
+def test_load_data_files_directory(duckdb_connection, shards_dir):
+    # Arrange
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(shards_dir), batch_size=7, load_mode="columnar", workers=2)
+
+    # Act
+    loader.run()
+
+    # Assert - every shard is merged once, staging tables are dropped
+    assert loader.input_files == [str(shards_dir / "part-0.csv"), str(shards_dir / "part-1.csv")]
+    assert duckdb_connection.execute("SELECT COUNT(*) FROM electric_vehicles").fetchone()[0] == 3 + 43
+    assert loader.coerced_nulls["Model_Year"] == 20
+    assert _rollup_matches_table(duckdb_connection)
+    assert duckdb_connection.execute(
+        f"SELECT parse_filename(File_Path), Rows_Loaded FROM {loader.INGESTED_FILES_TABLE} ORDER BY 1"
+    ).fetchall() == [("part-0.csv", 3), ("part-1.csv", 43)]
+    assert not duckdb_connection.execute(
+        "SELECT table_name FROM duckdb_tables() WHERE table_name LIKE 'electric_vehicles_shard_%'"
+    ).fetchall()
+
+def test_load_data_files_skips_ingested(duckdb_connection, shards_dir, sample_csv_content):
+    # Arrange
+    ElectricVehicleDataLoader(duckdb_connection, str(shards_dir / "part-*.csv"), load_mode="columnar").run()
+    (shards_dir / "part-2.csv").write_text(sample_csv_content)
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(shards_dir / "part-*.csv"), load_mode="columnar")
+
+    # Act
+    loader.run()
+
+    # Assert - only the new shard is loaded, and validated on its own
+    assert loader.load_statistics.rows == 3
+    assert duckdb_connection.execute("SELECT COUNT(*) FROM electric_vehicles").fetchone()[0] == 3 + 43 + 3
+
+def test_load_data_files_changed_file(duckdb_connection, shards_dir, sample_csv_content):
+    # Arrange
+    ElectricVehicleDataLoader(duckdb_connection, str(shards_dir), load_mode="columnar").run()
+    (shards_dir / "part-0.csv").write_text(sample_csv_content + sample_csv_content.splitlines()[1] + "\n")
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(shards_dir), load_mode="columnar")
+
+    # Act & Assert
+    with pytest.raises(ValueError, match="changed since it was ingested"):
+        loader.run()
+
+def test_load_data_files_failed_shard(duckdb_connection, shards_dir):
+    # Arrange - one shard fails, so none is merged
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(shards_dir), load_mode="columnar", workers=2)
+    loader.create_table()
+    load_shard = loader._load_shard
+
+    def failing_load_shard(path, staging_table):
+        if path.endswith("part-1.csv"):
+            raise RuntimeError("disk full")
+        return load_shard(path, staging_table)
+
+    # Act
+    with patch.object(loader, "_load_shard", side_effect=failing_load_shard):
+        with pytest.raises(RuntimeError):
+            loader.load_data_files()
+
+    # Assert - and no staging table is left behind
+    assert duckdb_connection.execute("SELECT COUNT(*) FROM electric_vehicles").fetchone()[0] == 0
+    assert duckdb_connection.execute(f"SELECT COUNT(*) FROM {loader.INGESTED_FILES_TABLE}").fetchone()[0] == 0
+    assert not duckdb_connection.execute(
+        "SELECT table_name FROM duckdb_tables() WHERE table_name LIKE 'electric_vehicles_shard_%'"
+    ).fetchall()
+
+def test_load_data_files_drops_orphan_staging_tables(duckdb_connection, shards_dir):
+    # Arrange - a staging table of a load whose process died
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(shards_dir), load_mode="columnar")
+    loader.create_table()
+    duckdb_connection.execute("CREATE TABLE electric_vehicles_shard_0badf00d AS SELECT * FROM electric_vehicles")
+
+    # Act
+    loader.load_data_files()
+
+    # Assert
+    assert duckdb_connection.execute("SELECT COUNT(*) FROM electric_vehicles").fetchone()[0] == 3 + 43
+    assert not duckdb_connection.execute(
+        "SELECT table_name FROM duckdb_tables() WHERE table_name LIKE 'electric_vehicles_shard_%'"
+    ).fetchall()
+
+@pytest.mark.parametrize("pattern", ["missing-*.csv", "missing"])
+def test_load_data_files_no_match(mock_db_connection, shards_dir, pattern):
+    # Act & Assert
+    with pytest.raises(FileNotFoundError):
+        ElectricVehicleDataLoader(mock_db_connection, str(shards_dir / pattern), load_mode="columnar")
+
+def test_load_data_files_invalid_load_mode(mock_db_connection, shards_dir):
+    # Act & Assert
+    with pytest.raises(ValueError):
+        ElectricVehicleDataLoader(mock_db_connection, str(shards_dir), load_mode="serial")
+
+def test_run_compact_schema(duckdb_connection, multiline_csv_path, tmp_path, sample_csv_content, caplog):
+    # Arrange
+    extra_csv_path = tmp_path / "extra.csv"
+    extra_csv_path.write_text(sample_csv_content.replace(",Yakima,WA,", ",Selah,WA,"))
+    ElectricVehicleDataLoader(duckdb_connection, str(multiline_csv_path), load_mode="columnar", schema="compact").run()
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(extra_csv_path), load_mode="columnar", schema="compact")
+
+    # Act - Selah is missing from the City ENUM, so the table is compacted again
+    with caplog.at_level(logging.INFO):
+        loader.run()
+
+    # Assert
+    types = dict(duckdb_connection.execute(
+        "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = 'electric_vehicles'"
+    ).fetchall())
+    assert "Compact table rewritten" in caplog.text
+    assert types["City"] == "ENUM('Eugene', 'San Diego', 'Selah', 'Yakima', 'Yakima\nValley')"
+    assert types["Postal_Code"] == "UINTEGER"
+    assert types["Vehicle_Location"] == "VARCHAR"
+    assert duckdb_connection.execute(
+        "SELECT COUNT(*) FROM duckdb_tables() WHERE table_name = 'electric_vehicles_compact'"
+    ).fetchone()[0] == 0
+    assert duckdb_connection.execute("SELECT COUNT(*) FROM electric_vehicles").fetchone()[0] == 43 + 3
+    assert duckdb_connection.execute(
+        "SELECT COUNT(*) FROM electric_vehicles WHERE City = 'Selah' AND Longitude = -120.56916"
+    ).fetchone()[0] == 1
+    ElectricVehicleDataLoader.COMPACT_SCHEMA.expand(duckdb_connection)
+    assert _rollup_matches_table(duckdb_connection)
+
+def test_run_compact_schema_appends_in_place(duckdb_connection, multiline_csv_path, caplog):
+    # Arrange
+    ElectricVehicleDataLoader(duckdb_connection, str(multiline_csv_path), load_mode="columnar", schema="compact").run()
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(multiline_csv_path), load_mode="columnar", schema="compact")
+
+    # Act - the values of the second load fit the stored types
+    with caplog.at_level(logging.INFO):
+        loader.run()
+
+    # Assert - its rows are appended to the compact table, which is not rewritten
+    assert "Loaded rows appended to the compact table" in caplog.text
+    assert "Compacting electric vehicles table" not in caplog.text
+    assert ElectricVehicleDataLoader.COMPACT_SCHEMA.is_compact(duckdb_connection)
+    assert duckdb_connection.execute("SELECT COUNT(*) FROM electric_vehicles").fetchone()[0] == 2 * 43
+    ElectricVehicleDataLoader.COMPACT_SCHEMA.expand(duckdb_connection)
+    assert _rollup_matches_table(duckdb_connection)
+
+@pytest.mark.parametrize("load_mode", ["serial", "columnar"])
+def test_run_standard_schema_keeps_compact_table(duckdb_connection, multiline_csv_path, tmp_path, sample_csv_content, load_mode):
+    # Arrange - a compacted table, then a file with a city its ENUM does not know
+    ElectricVehicleDataLoader(duckdb_connection, str(multiline_csv_path), load_mode="columnar", schema="compact").run()
+    extra_csv_path = tmp_path / "extra.csv"
+    extra_csv_path.write_text(sample_csv_content.replace(",Yakima,WA,", ",Olympia,WA,"))
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(extra_csv_path), load_mode=load_mode)
+
+    # Act - loaded with the default schema
+    loader.run()
+
+    # Assert - the table stays compact, every new row has its coordinates and is indexed
+    assert ElectricVehicleDataLoader.COMPACT_SCHEMA.is_compact(duckdb_connection)
+    assert duckdb_connection.execute(
+        "SELECT COUNT(*), COUNT(Vehicle_Location), COUNT(Longitude) FROM electric_vehicles"
+    ).fetchone() == (43 + 3, 43 + 3, 43 + 3)
+    assert duckdb_connection.execute(
+        f"SELECT COUNT(*) FROM {loader.SPATIAL_INDEX.INDEX_TABLE}"
+    ).fetchone()[0] == 43 + 3
+    assert duckdb_connection.execute("SELECT COUNT(*) FROM electric_vehicles WHERE City = 'Olympia'").fetchone()[0] == 1
+
+def test_run_compact_schema_incremental_twice(duckdb_connection, tmp_path, sample_csv_content, caplog):
+    # Arrange - a location with trailing zeros, which must come back as written
+    csv_path = tmp_path / "test_ev_data.csv"
+    csv_path.write_text(sample_csv_content.replace("POINT (-120.56916 46.58514)", "POINT (-120.50000 46.58510)", 1))
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(csv_path), load_mode="incremental", schema="compact")
+    loader.run()
+
+    # Act - the file did not change
+    with caplog.at_level(logging.INFO):
+        loader.run()
+
+    # Assert - validation passed, nothing was applied and the table was not rewritten
+    assert loader.last_load_changes == {}
+    assert "Compact table rewritten" not in caplog.text
+    assert "Compacting electric vehicles table" not in caplog.text
+    assert ElectricVehicleDataLoader.COMPACT_SCHEMA.is_compact(duckdb_connection)
+    assert duckdb_connection.execute(
+        "SELECT COUNT(*) FROM electric_vehicles WHERE Vehicle_Location = 'POINT (-120.50000 46.58510)' AND Longitude = -120.5"
+    ).fetchone()[0] == 1
+
+def test_invalid_schema(mock_db_connection, multiline_csv_path):
+    # Act & Assert
+    with pytest.raises(ValueError):
+        ElectricVehicleDataLoader(db_connection=mock_db_connection, csv_path=str(multiline_csv_path), schema="unknown")
+
+def test_run_builds_spatial_index(duckdb_connection, multiline_csv_path):
+    # Arrange
+    sink = InMemoryMetricsSink()
+    loader = ElectricVehicleDataLoader(
+        duckdb_connection, str(multiline_csv_path), load_mode="columnar", schema="compact", metrics=Metrics([sink])
+    )
+
+    # Act
+    loader.run()
+
+    # Assert - every vehicle of the file has a location
+    assert duckdb_connection.execute(
+        f"SELECT COUNT(*), MIN(Longitude), MAX(Latitude) FROM {loader.SPATIAL_INDEX.INDEX_TABLE}"
+    ).fetchone() == (43, -123.12802, 46.58514)
+    assert len(sink.select("load.spatial_index")) == 1
+
+def _sketches_match_table(connection):
+    rows_sketched, sketches = connection.execute(
+        f"SELECT Rows_Sketched, Sketches FROM {ElectricVehicleDataLoader.SKETCHES_TABLE}"
+    ).fetchone()
+    sketches = VehicleSketches.from_json(sketches)
+    vehicles = connection.execute(
+        "SELECT Make, Model, COUNT(*) FROM electric_vehicles GROUP BY ALL ORDER BY 3 DESC, 1, 2"
+    ).fetchall()
+    top_counts = dict(connection.execute(
+        "SELECT Postal_Code, MAX(num_cars) FROM (SELECT Postal_Code, COUNT(*) AS num_cars FROM electric_vehicles GROUP BY Postal_Code, Make, Model) GROUP BY ALL"
+    ).fetchall())
+    # Few vehicles, so every count is exact
+    return (
+        rows_sketched == sketches.rows == connection.execute("SELECT COUNT(*) FROM electric_vehicles").fetchone()[0]
+        and [(make, model, estimate.value) for make, model, estimate in sketches.top_vehicles(len(vehicles) + 1)] == vehicles
+        and {postal_code: estimate.value for postal_code, _, _, estimate in sketches.top_vehicle_by_postal_code()} == top_counts
+    )
+
+@pytest.mark.parametrize("load_mode, rebuilt", [("serial", True), ("columnar", False), ("checkpointed", False)])
+def test_run_maintains_sketches(duckdb_connection, multiline_csv_path, caplog, load_mode, rebuilt):
+    # Arrange - the second run appends the file again
+    loader = ElectricVehicleDataLoader(
+        duckdb_connection, str(multiline_csv_path), batch_size=7, load_mode=load_mode, checkpoint_every=2,
+        maintain_sketches=True
+    )
+    loader.run()
+    assert _sketches_match_table(duckdb_connection)
+
+    # Act
+    with caplog.at_level(logging.INFO):
+        loader.run()
+
+    # Assert - the columnar modes update the saved sketches with the new batches
+    assert _sketches_match_table(duckdb_connection)
+    assert ("Sketches are out of date" in caplog.text) == rebuilt
+    assert loader.sketches is None
+
+def test_run_parallel_merges_worker_summaries(duckdb_connection, multiline_csv_path, caplog, monkeypatch):
+    # Arrange - several chunks, and a second run appending the file again
+    monkeypatch.setattr(ElectricVehicleDataLoader, "PARALLEL_CHUNK_BYTES", 256)
+    loader = ElectricVehicleDataLoader(
+        duckdb_connection, str(multiline_csv_path), load_mode="parallel", workers=2, maintain_sketches=True
+    )
+    loader.run()
+
+    # Act
+    with caplog.at_level(logging.INFO):
+        loader.run()
+
+    # Assert - the statistics, rollup counts and sketches the workers computed validate and need no rebuild
+    assert "Validation successful" in caplog.text
+    assert _rollup_matches_table(duckdb_connection)
+    assert _sketches_match_table(duckdb_connection)
+    assert "Rollup is out of date" not in caplog.text
+    assert "Sketches are out of date" not in caplog.text
+
+def test_run_incremental_rebuilds_sketches(duckdb_connection, tmp_path, sample_csv_content):
+    # Arrange
+    header, tesla_yakima, tesla_san_diego, volvo_eugene = sample_csv_content.splitlines()
+    csv_path = tmp_path / "test_ev_data.csv"
+    csv_path.write_text(sample_csv_content)
+    loader = ElectricVehicleDataLoader(duckdb_connection, str(csv_path), load_mode="incremental", maintain_sketches=True)
+    loader.run()
+    csv_path.write_text("\n".join([header, tesla_yakima, tesla_san_diego.replace(",TESLA,MODEL 3,", ",VOLVO,S60,")]) + "\n")
+
+    # Act
+    loader.run()
+
+    # Assert - the updated and deleted vehicles are gone from the sketches
+    assert _sketches_match_table(duckdb_connection)
+
+def test_load_data_files_merges_shard_sketches(duckdb_connection, shards_dir, caplog):
+    # Arrange
+    loader = ElectricVehicleDataLoader(
+        duckdb_connection, str(shards_dir), batch_size=7, load_mode="columnar", workers=2, maintain_sketches=True
+    )
+
+    # Act
+    with caplog.at_level(logging.INFO):
+        loader.run()
+
+    # Assert
+    assert _sketches_match_table(duckdb_connection)
+    assert "Sketches are out of date" not in caplog.text
@@ -0,0 +1,141 @@
+import bz2
+import duckdb
+import gzip
+import json
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import pytest
+from electric_vehicle_benchmark import generate_csv
+from electric_vehicle_data_loader import ElectricVehicleDataLoader
+from electric_vehicle_data_loader_strategies import (
+    CSVDataLoader, DataLoaderStrategy, JSONDataLoader, ParquetDataLoader, detect_compression, is_plain_csv
+)
+
+@pytest.fixture
+def csv_path(tmp_path):
+    # Quoted newline, a malformed model year, and empty (quoted or not) and "NA" values on top of the synthetic fleet
+    path = generate_csv(tmp_path / "fleet.csv", rows=250, seed=3)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('5YJ3E1EB4L,Yakima,"Yakima\nValley",WA,98908,bad,TESLA,"MODEL ""3""",Battery Electric Vehicle (BEV),'
+                'Clean Alternative Fuel Vehicle Eligible,322,0,14,1,"POINT (-120.56916 46.58514)",PACIFICORP,53077000904\n')
+        f.write('5YJ3E1EB4M,,"",WA,NA,2021,TESLA,MODEL Y,,,,0,,2,,PACIFICORP,\n')
+    return path
+
+@pytest.fixture
+def expected_rows(csv_path):
+    connection = duckdb.connect()
+    loader = ElectricVehicleDataLoader(connection, str(csv_path), load_mode="columnar")
+    loader.run()
+    yield connection.execute("SELECT * FROM electric_vehicles ORDER BY DOL_Vehicle_ID").fetchall()
+    connection.close()
+
+def _load(path, **kwargs):
+    connection = duckdb.connect()
+    loader = ElectricVehicleDataLoader(connection, str(path), load_mode="columnar", **kwargs)
+    loader.run()
+    return loader, connection.execute("SELECT * FROM electric_vehicles ORDER BY DOL_Vehicle_ID").fetchall()
+
+def _json_records(csv_path):
+    table = pa_csv.read_csv(csv_path, parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+                            convert_options=pa_csv.ConvertOptions(strings_can_be_null=True, null_values=[""]))
+    for record in table.to_pylist():
+        yield {key: int(value) if isinstance(value, str) and value.isdigit() else value for key, value in record.items()}
+
+@pytest.mark.parametrize("suffix, compress", [(".csv.gz", gzip.compress), (".csv.bz2", bz2.compress)])
+def test_compressed_csv(csv_path, expected_rows, tmp_path, suffix, compress):
+    # Arrange
+    compressed_path = tmp_path / f"fleet{suffix}"
+    compressed_path.write_bytes(compress(csv_path.read_bytes()))
+
+    # Act
+    loader, rows = _load(compressed_path)
+
+    # Assert
+    assert isinstance(loader.strategy, CSVDataLoader)
+    assert rows == expected_rows
+    assert loader.coerced_nulls["Model_Year"] == 1
+
+def test_ndjson(csv_path, expected_rows, tmp_path):
+    # Arrange - numbers as JSON numbers, the malformed model year as a string, NULLs as null
+    ndjson_path = tmp_path / "fleet.ndjson.gz"
+    with gzip.open(ndjson_path, "wt", encoding="utf-8") as f:
+        for record in _json_records(csv_path):
+            f.write(json.dumps(record) + "\n")
+
+    # Act
+    loader, rows = _load(ndjson_path)
+
+    # Assert
+    assert isinstance(loader.strategy, JSONDataLoader)
+    assert rows == expected_rows
+    assert loader.coerced_nulls["Model_Year"] == 1
+
+def test_ndjson_database_column_names(tmp_path):
+    # Arrange - fields may also be named like the table columns, blank lines are skipped
+    ndjson_path = tmp_path / "fleet.jsonl"
+    ndjson_path.write_text('{"Make": "TESLA", "Model_Year": 2020, "DOL_Vehicle_ID": 1}\n\n{"Make": "KIA", "DOL_Vehicle_ID": 2}')
+
+    # Act
+    _, rows = _load(ndjson_path)
+
+    # Assert
+    assert [(row[6], row[5], row[13]) for row in rows] == [("TESLA", 2020, 1), ("KIA", None, 2)]
+
+def test_parquet(csv_path, expected_rows, tmp_path):
+    # Arrange - typed columns named like the table
+    connection = duckdb.connect()
+    ElectricVehicleDataLoader(connection, str(csv_path), load_mode="columnar").run()
+    parquet_path = tmp_path / "fleet.parquet"
+    pq.write_table(connection.execute("SELECT * FROM electric_vehicles").arrow().read_all(), parquet_path)
+
+    # Act
+    loader, rows = _load(parquet_path, batch_size=100)
+
+    # Assert
+    assert isinstance(loader.strategy, ParquetDataLoader)
+    assert rows == expected_rows
+
+def test_mmap_reader_uses_csv_strategy(csv_path, expected_rows):
+    # Act
+    loader, rows = _load(csv_path, reader="mmap")
+
+    # Assert
+    assert isinstance(loader.strategy, CSVDataLoader)
+    assert rows == expected_rows
+
+def test_csv_strategy_keeps_varchar_buffers(csv_path):
+    # Arrange
+    strategy = CSVDataLoader(csv_path, ElectricVehicleDataLoader.CONVERSION_PLAN, ElectricVehicleDataLoader.CSV_TO_DB_COLUMNS)
+    record_batch = next(strategy.record_batches())
+
+    # Act
+    batch, _ = strategy.convert(record_batch)
+
+    # Assert - VARCHAR columns are the tokenizer's arrays, with empty values already NULL
+    raw = dict(zip(record_batch.schema.names, record_batch.columns))
+    assert batch.column("City").chunk(0).buffers()[2].address == raw["City"].buffers()[2].address
+    assert batch.column("Model_Year").type == ElectricVehicleDataLoader.ARROW_SCHEMA.field("Model_Year").type
+    last = batch.slice(batch.num_rows - 1).to_pylist()[0]
+    assert (last["County"], last["City"], last["Postal_Code"], last["Electric_Range"]) == (None, None, "NA", None)
+
+def test_format_detection(csv_path, tmp_path):
+    # Arrange
+    compressed_path = tmp_path / "fleet.data"
+    compressed_path.write_bytes(gzip.compress(b"a,b\n"))
+
+    # Act & Assert
+    assert is_plain_csv(csv_path)
+    assert detect_compression(compressed_path) == "gzip"
+    assert not is_plain_csv(compressed_path)
+    with pytest.raises(ValueError):
+        DataLoaderStrategy.for_path(compressed_path, conversion_plan=ElectricVehicleDataLoader.CONVERSION_PLAN, column_names={})
+
+@pytest.mark.parametrize("load_mode", ["serial", "parallel", "checkpointed", "built_in"])
+def test_strategy_unsupported_load_mode(tmp_path, load_mode):
+    # Arrange
+    ndjson_path = tmp_path / "fleet.ndjson"
+    ndjson_path.write_text('{"Make": "TESLA"}\n')
+
+    # Act & Assert
+    with pytest.raises(ValueError):
+        ElectricVehicleDataLoader(duckdb.connect(), str(ndjson_path), load_mode=load_mode)
@@ -0,0 +1,95 @@
+import duckdb
+import pyarrow as pa
+import pytest
+from electric_vehicle_load_statistics import LoadStatistics, subtract_rows
+
+@pytest.fixture
+def schema():
+    return pa.schema([("Make", pa.string()), ("Model_Year", pa.int32())])
+
+@pytest.fixture
+def batch(schema):
+    return pa.Table.from_pydict({"Make": ["TESLA", None, "KIA", "CITROËN"], "Model_Year": [2020, 2021, None, 2019]}, schema=schema)
+
+def test_update(schema, batch):
+    # Arrange
+    statistics = LoadStatistics(schema)
+
+    # Act
+    statistics.update(batch)
+    statistics.update_rows([["NISSAN", 2013]])
+
+    # Assert - the checksums add up across batches
+    expected = LoadStatistics(schema)
+    expected.update(pa.concat_tables([batch, pa.Table.from_pylist([{"Make": "NISSAN", "Model_Year": 2013}], schema=schema)]))
+    assert statistics.rows == 5
+    assert statistics.null_counts == {"Make": 1, "Model_Year": 1}
+    assert statistics.checksums == expected.checksums
+
+def test_merge(schema, batch):
+    # Arrange
+    statistics = LoadStatistics(schema)
+    statistics.update(batch)
+    shard = LoadStatistics(schema)
+    shard.update_rows([["NISSAN", 2013], [None, None]])
+
+    # Act
+    statistics.merge(shard)
+
+    # Assert
+    expected = LoadStatistics(schema)
+    expected.update_rows([row.values() for row in batch.to_pylist()] + [["NISSAN", 2013], [None, None]])
+    assert statistics.rows == 6
+    assert statistics.null_counts == {"Make": 2, "Model_Year": 2}
+    assert statistics.checksums == expected.checksums
+
+def test_aggregate_query_matches_statistics(schema, batch):
+    # Arrange
+    statistics = LoadStatistics(schema)
+    statistics.update(batch)
+    connection = duckdb.connect()
+    connection.execute("CREATE TABLE electric_vehicles AS SELECT * FROM batch")
+
+    # Act
+    row = connection.execute(statistics.aggregate_query("electric_vehicles")).fetchone()
+
+    # Assert
+    assert row == statistics.as_row()
+    assert len(statistics.metric_names()) == len(row)
+
+def test_checksums_detect_corruption(schema, batch):
+    # Arrange - keyed rows, then a value changed to one of the same length, and values swapped between rows
+    keyed_schema = schema.append(pa.field("DOL_Vehicle_ID", pa.int64()))
+    rows = batch.append_column("DOL_Vehicle_ID", pa.array([1, 2, 3, 4], type=pa.int64())).to_pylist()
+    statistics = LoadStatistics(keyed_schema, key="DOL_Vehicle_ID")
+    statistics.update(pa.Table.from_pylist(rows, schema=keyed_schema))
+    connection = duckdb.connect()
+    loaded = pa.Table.from_pylist(rows, schema=keyed_schema)
+    connection.execute("CREATE TABLE electric_vehicles AS SELECT * FROM loaded")
+    connection.execute("UPDATE electric_vehicles SET Make = 'TEZLA' WHERE Make = 'TESLA'")
+    connection.execute("""
+        UPDATE electric_vehicles SET Model_Year = CASE DOL_Vehicle_ID WHEN 1 THEN 2021 ELSE 2020 END
+        WHERE DOL_Vehicle_ID IN (1, 2)
+    """)
+
+    # Act
+    row = connection.execute(statistics.aggregate_query("electric_vehicles")).fetchone()
+
+    # Assert - the counts match, the checksums of both columns do not
+    mismatches = [name for name, loaded, stored in zip(statistics.metric_names(), statistics.as_row(), row) if loaded != stored]
+    assert mismatches == ["checksum(Make)", "checksum(Model_Year)"]
+
+def test_json_round_trip(schema, batch):
+    # Arrange
+    statistics = LoadStatistics(schema)
+    statistics.update(batch)
+
+    # Act
+    restored = LoadStatistics.from_json(schema, statistics.to_json())
+
+    # Assert
+    assert restored.as_row() == statistics.as_row()
+
+def test_subtract_rows():
+    # Act & Assert
+    assert subtract_rows((10, 4, None), (3, None, None)) == (7, 4, 0)
@@ -0,0 +1,98 @@
+import json
+import pytest
+from electric_vehicle_metrics import (
+    InMemoryMetricsSink, JsonLinesMetricsSink, Metrics, MetricsSink, PrometheusMetricsSink, peak_rss_bytes
+)
+
+def test_in_memory_sink():
+    # Arrange
+    sink = InMemoryMetricsSink()
+    metrics = Metrics([sink])
+
+    # Act
+    with metrics.timer("load.insert", table="electric_vehicles"):
+        pass
+    metrics.increment("load.rows", 10, table="electric_vehicles")
+    metrics.increment("load.rows", 5, table="staging")
+    metrics.record_peak_memory(phase="load")
+
+    # Assert
+    assert [event.kind for event in sink.events] == ["timer", "counter", "counter", "gauge"]
+    assert sink.total("load.rows") == 15
+    assert sink.total("load.rows", table="staging") == 5
+    assert sink.select("load.insert")[0].value >= 0
+    assert sink.summary()["load.rows"] == {"count": 2, "sum": 15, "max": 10}
+    assert sink.select("process.peak_rss_bytes", phase="load")[0].value == pytest.approx(peak_rss_bytes(), rel=0.5)
+
+def test_timer_records_failures():
+    # Arrange
+    sink = InMemoryMetricsSink()
+    metrics = Metrics([sink])
+
+    # Act
+    with pytest.raises(RuntimeError):
+        with metrics.timer("load.commit"):
+            raise RuntimeError("disk full")
+
+    # Assert
+    assert len(sink.select("load.commit")) == 1
+
+def test_json_lines_sink(tmp_path):
+    # Arrange
+    path = tmp_path / "metrics" / "events.jsonl"
+    metrics = Metrics([JsonLinesMetricsSink(path)])
+
+    # Act
+    metrics.increment("load.coerced_nulls", 3, column="Model_Year")
+    metrics.gauge("process.peak_rss_bytes", 1024)
+    metrics.close()
+
+    # Assert
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(event["kind"], event["name"], event["value"], event["labels"]) for event in events] == [
+        ("counter", "load.coerced_nulls", 3, {"column": "Model_Year"}),
+        ("gauge", "process.peak_rss_bytes", 1024, {}),
+    ]
+
+def test_prometheus_sink(tmp_path):
+    # Arrange
+    path = tmp_path / "electric_vehicles.prom"
+    sink = PrometheusMetricsSink(path=path)
+    metrics = Metrics([sink])
+
+    # Act
+    metrics.observe("analytics.query", 0.5, report="count_cars_per_city")
+    metrics.observe("analytics.query", 0.25, report="count_cars_per_city")
+    metrics.increment("analytics.rows_written", 7, output='odd "name"')
+    metrics.gauge("process.peak_rss_bytes", 2048)
+    metrics.gauge("process.peak_rss_bytes", 4096)
+    metrics.close()
+
+    # Assert
+    assert path.read_text().splitlines() == [
+        "# TYPE electric_vehicles_analytics_rows_written_total counter",
+        'electric_vehicles_analytics_rows_written_total{output="odd \\"name\\""} 7',
+        "# TYPE electric_vehicles_process_peak_rss_bytes gauge",
+        "electric_vehicles_process_peak_rss_bytes 4096",
+        "# TYPE electric_vehicles_analytics_query_seconds summary",
+        'electric_vehicles_analytics_query_seconds_count{report="count_cars_per_city"} 2',
+        'electric_vehicles_analytics_query_seconds_sum{report="count_cars_per_city"} 0.75',
+    ]
+
+def test_metrics_without_sinks():
+    # Arrange
+    metrics = Metrics()
+
+    # Act & Assert - nothing to record to, nothing fails
+    with metrics.timer("load.read"):
+        metrics.increment("load.rows")
+    metrics.close()
+
+def test_sink_without_record():
+    # Arrange
+    class IncompleteSink(MetricsSink):
+        pass
+
+    # Act & Assert - fails when created, not on the first metric
+    with pytest.raises(TypeError):
+        IncompleteSink()
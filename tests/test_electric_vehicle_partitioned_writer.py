@@ -0,0 +1,76 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pytest
+from electric_vehicle_partitioned_writer import PartitionedParquetWriter
+
+@pytest.fixture
+def counts_by_year():
+    return pa.table({
+        "Model_Year": pa.array([2021, 2020, None, 2021], type=pa.int32()),
+        "num_cars": [100, 150, 7, 50]
+    })
+
+@pytest.fixture
+def writer(tmp_path):
+    return PartitionedParquetWriter(tmp_path, "Model_Year", file_prefix="electric_cars", workers=2)
+
+def test_write(writer, tmp_path, counts_by_year):
+    # Act
+    written = writer.write(counts_by_year)
+
+    # Assert
+    assert sorted(p.relative_to(tmp_path).as_posix() for p in written) == [
+        "model_year=2020/electric_cars_2020.parquet",
+        "model_year=2021/electric_cars_2021.parquet",
+        "model_year=__HIVE_DEFAULT_PARTITION__/electric_cars___HIVE_DEFAULT_PARTITION__.parquet",
+    ]
+    assert pd.read_parquet(tmp_path / "model_year=2021").sort_values("num_cars")["num_cars"].tolist() == [50, 100]
+    assert not list(tmp_path.glob(".*"))
+
+def test_write_record_batches(writer, tmp_path, counts_by_year):
+    # Arrange - rows of one partition spread over several batches end up in one file
+    reader = pa.RecordBatchReader.from_batches(counts_by_year.schema, counts_by_year.to_batches(max_chunksize=1))
+
+    # Act
+    writer.write(reader)
+
+    # Assert
+    assert len(list((tmp_path / "model_year=2021").iterdir())) == 1
+    assert pd.read_parquet(tmp_path / "model_year=2021" / "electric_cars_2021.parquet")["num_cars"].sum() == 150
+
+def test_write_replaces_previous_output(writer, tmp_path, counts_by_year):
+    # Arrange - partitions from an earlier run, one of them no longer present in the data
+    writer.write(counts_by_year)
+    (tmp_path / "model_year=2021" / "leftover.parquet").write_bytes(b"")
+
+    # Act
+    writer.write(counts_by_year.filter(pc.equal(counts_by_year["Model_Year"], 2021)))
+
+    # Assert
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["model_year=2021"]
+    assert [p.name for p in (tmp_path / "model_year=2021").iterdir()] == ["electric_cars_2021.parquet"]
+
+def test_write_replaces_partition_file_in_place(writer, tmp_path, counts_by_year, monkeypatch):
+    # Arrange - record the renames of a rewrite of existing partitions
+    writer.write(counts_by_year)
+    partition_dir = (tmp_path / "model_year=2021").stat().st_ino
+    renames = []
+    monkeypatch.setattr("os.rename", lambda *args: renames.append(args))
+
+    # Act
+    writer.write(counts_by_year)
+
+    # Assert - the partition directories stay, only their files are swapped
+    assert renames == []
+    assert (tmp_path / "model_year=2021").stat().st_ino == partition_dir
+    assert pd.read_parquet(tmp_path / "model_year=2021")["num_cars"].sum() == 150
+    assert not list(tmp_path.glob(".*"))
+
+def test_partition_name_escapes_values(tmp_path):
+    # Arrange
+    writer = PartitionedParquetWriter(tmp_path, "County")
+
+    # Act & Assert
+    assert writer.partition_name("Walla Walla/East") == "county=Walla%20Walla%2FEast"
+    assert writer.partition_name(None) == "county=__HIVE_DEFAULT_PARTITION__"
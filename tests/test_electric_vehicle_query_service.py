@@ -0,0 +1,173 @@
+import asyncio
+import duckdb
+import json
+import pandas as pd
+import pyarrow as pa
+import pytest
+from electric_vehicle_analytics import ElectricVehicleAnalytics
+from electric_vehicle_metrics import InMemoryMetricsSink, Metrics
+from electric_vehicle_query_service import (
+    ARROW_STREAM_TYPE, CursorPool, ElectricVehicleQueryService, fetch, load_test
+)
+
+@pytest.fixture
+def duckdb_connection():
+    # Vehicles around Seattle and Tacoma, indexed like ElectricVehicleDataLoader.run() does
+    connection = duckdb.connect()
+    connection.execute("""
+        CREATE TABLE electric_vehicles AS
+        SELECT * FROM (VALUES
+            (1, 'Seattle', '98101', 'TESLA', 'MODEL 3', 2021, 'Battery Electric Vehicle (BEV)', 'POINT (-122.331 47.611)'),
+            (2, 'Seattle', '98101', 'TESLA', 'MODEL 3', 2021, 'Battery Electric Vehicle (BEV)', 'POINT (-122.335 47.615)'),
+            (3, 'Seattle', '98101', 'NISSAN', 'LEAF', 2019, 'Battery Electric Vehicle (BEV)', 'POINT (-122.3 47.65)'),
+            (4, 'Tacoma', '98402', 'TESLA', 'MODEL Y', 2023, 'Battery Electric Vehicle (BEV)', 'POINT (-122.44 47.25)'),
+            (5, 'Tacoma', '98402', 'TESLA', 'MODEL Y', 2023, 'Battery Electric Vehicle (BEV)', NULL),
+            (6, 'Tacoma', '98402', 'VOLVO', 'S60', 2020, 'Plug-in Hybrid Electric Vehicle (PHEV)', NULL)
+        ) AS t(DOL_Vehicle_ID, City, Postal_Code, Make, Model, Model_Year, Electric_Vehicle_Type, Vehicle_Location)
+    """)
+    ElectricVehicleAnalytics.SPATIAL_INDEX.build(connection)
+    yield connection
+    connection.close()
+
+@pytest.fixture
+def sink():
+    return InMemoryMetricsSink()
+
+@pytest.fixture
+def service(duckdb_connection, sink, tmp_path):
+    analytics = ElectricVehicleAnalytics(db_connection=duckdb_connection, output_dir=str(tmp_path))
+    service = ElectricVehicleQueryService(duckdb_connection, workers=2, analytics=analytics, metrics=Metrics([sink]))
+    yield service
+    service.close()
+
+def _get(service, *targets, accept="application/json", unix_socket=None):
+    """Start the service, send the targets on one keep-alive connection and stop it."""
+    async def run():
+        server = await service.start(port=0, unix_socket=unix_socket)
+        async with server:
+            if unix_socket is not None:
+                reader, writer = await asyncio.open_unix_connection(unix_socket)
+            else:
+                reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+            try:
+                return [await fetch(reader, writer, target, accept) for target in targets]
+            finally:
+                writer.close()
+                await writer.wait_closed()
+    return asyncio.run(run())
+
+def test_cursor_pool_reuses_cursors(duckdb_connection):
+    # Arrange
+    pool = CursorPool(duckdb_connection, size=2)
+
+    # Act
+    with pool.cursor() as first:
+        with pool.cursor() as second:
+            pass
+    with pool.cursor() as again:
+        pass
+
+    # Assert - cursors are returned to the pool and reused
+    assert first is not second
+    assert again in (first, second)
+    assert again.execute("SELECT COUNT(*) FROM electric_vehicles").fetchone()[0] == 6
+    pool.close()
+
+@pytest.mark.parametrize("name", [name for name, *_ in ElectricVehicleAnalytics.REPORTS])
+def test_reports_as_json(service, name):
+    # Act
+    [(status, body)] = _get(service, f"/reports/{name}")
+
+    # Assert
+    expected = getattr(service.analytics, name)()
+    assert status == 200
+    assert json.loads(body) == json.loads(expected.to_json(orient="records"))
+
+def test_report_as_arrow(service):
+    # Act - asked for through the Accept header and the format parameter
+    (status, body), (_, same) = _get(
+        service, "/report?group_by=Make,Model&n=2", "/report?group_by=Make,Model&n=2&format=arrow",
+        accept=ARROW_STREAM_TYPE
+    )
+
+    # Assert
+    table = pa.ipc.open_stream(body).read_all()
+    assert status == 200
+    assert body == same
+    assert table.column_names == ["Make", "Model", "num_cars"]
+    assert table.to_pylist() == [
+        {"Make": "TESLA", "Model": "MODEL 3", "num_cars": 2},
+        {"Make": "TESLA", "Model": "MODEL Y", "num_cars": 2},
+    ]
+
+def test_spatial_queries(service):
+    # Act
+    responses = _get(
+        service,
+        "/vehicles/bounding_box?min_longitude=-122.34&min_latitude=47.6&max_longitude=-122.331&max_latitude=47.615",
+        "/vehicles/radius?longitude=-122.331&latitude=47.611&radius_km=10",
+        "/vehicles/nearest?longitude=-122.43&latitude=47.26&k=2",
+        "/cells",
+    )
+
+    # Assert
+    (_, box), (_, radius), (_, nearest), (_, cells) = responses
+    assert all(status == 200 for status, _ in responses)
+    assert [row["DOL_Vehicle_ID"] for row in json.loads(box)] == [1, 2]
+    assert [row["DOL_Vehicle_ID"] for row in json.loads(radius)] == [1, 2, 3]
+    assert [row["DOL_Vehicle_ID"] for row in json.loads(nearest)] == [4, 1]
+    assert sum(row["num_cars"] for row in json.loads(cells)) == 4
+
+def test_errors(service, sink):
+    # Act
+    responses = _get(
+        service, "/unknown", "/vehicles/radius?longitude=-122.331&latitude=47.611", "/report?group_by=Color",
+        "/report?group_by=Make&n=three", "/report?group_by=Make&n=0", "/report?group_by=Make&n=-1", "/health"
+    )
+
+    # Assert - bad requests leave the connection usable
+    assert [status for status, _ in responses] == [404, 400, 400, 400, 400, 400, 200]
+    assert json.loads(responses[1][1]) == {"error": "radius_km is required"}
+    assert json.loads(responses[4][1]) == {"error": "n must be at least 1, got 0"}
+    assert sink.total("service.errors", route="/report", status="400") == 4
+
+def test_unix_socket(service, tmp_path):
+    # Act
+    [(status, body)] = _get(service, "/reports/count_cars_per_city", unix_socket=str(tmp_path / "service.sock"))
+
+    # Assert
+    assert status == 200
+    assert pd.DataFrame(json.loads(body))["City"].tolist() == ["Seattle", "Tacoma"]
+
+def test_load_test(service, sink):
+    # Arrange
+    async def run():
+        server = await service.start(port=0)
+        async with server:
+            return await load_test(
+                ["/reports/count_cars_per_city", "/vehicles/nearest?longitude=-122.43&latitude=47.26&k=2"],
+                port=server.sockets[0].getsockname()[1], clients=4, requests_per_client=5
+            )
+
+    # Act
+    results = asyncio.run(run())
+
+    # Assert
+    assert results["requests"] == 20
+    assert results["errors"] == 0
+    assert 0 < results["seconds"]["p50"] <= results["seconds"]["p99"]
+    assert results["requests_per_second"] > 0
+    assert len(sink.select("service.request", route="/reports/count_cars_per_city")) == 10
+
+def test_service_writes_no_reports(duckdb_connection, tmp_path, monkeypatch):
+    # Arrange
+    monkeypatch.chdir(tmp_path)
+
+    # Act - the analytics are created by the service, with their default output directory
+    service = ElectricVehicleQueryService(duckdb_connection, workers=1)
+    [(status, _)] = _get(service, "/reports/count_cars_per_city")
+    service.close()
+
+    # Assert - reports are answered from the database, nothing is written to the working directory
+    assert status == 200
+    assert list(tmp_path.iterdir()) == []
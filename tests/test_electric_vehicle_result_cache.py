@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+from electric_vehicle_result_cache import ReportResultCache
+
+@pytest.fixture
+def result():
+    return pd.DataFrame({"City": ["Seattle", "Tacoma"], "num_electric_cars": [150, 120]})
+
+def test_get_put(result):
+    # Arrange
+    cache = ReportResultCache()
+
+    # Act
+    miss = cache.get(("count_cars_per_city", (100, "load-1")))
+    cache.put(("count_cars_per_city", (100, "load-1")), result)
+    hit = cache.get(("count_cars_per_city", (100, "load-1")))
+    other_version = cache.get(("count_cars_per_city", (100, "load-2")))
+
+    # Assert
+    assert miss is None
+    assert other_version is None
+    pd.testing.assert_frame_equal(hit, result)
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 2
+
+def test_returns_copies(result):
+    # Arrange
+    cache = ReportResultCache()
+    cache.put(("report", 1), result)
+
+    # Act
+    returned = cache.get(("report", 1))
+    returned.loc[0, "num_electric_cars"] = 0
+
+    # Assert
+    assert cache.get(("report", 1)).loc[0, "num_electric_cars"] == 150
+
+def test_lru_eviction(result):
+    # Arrange - room for two results
+    size = int(result.memory_usage(index=True, deep=True).sum())
+    cache = ReportResultCache(max_bytes=2 * size)
+    cache.put(("a", 1), result)
+    cache.put(("b", 1), result)
+    cache.get(("a", 1))
+
+    # Act
+    cache.put(("c", 1), result)
+
+    # Assert - the least recently used entry is evicted
+    assert cache.get(("b", 1)) is None
+    assert cache.get(("a", 1)) is not None
+    assert cache.stats["evictions"] == 1
+    assert cache.stats["bytes"] == 2 * size
+
+def test_disk_persistence(result, tmp_path):
+    # Arrange
+    ReportResultCache(cache_dir=tmp_path).put(("report", 1), result)
+    cache = ReportResultCache(cache_dir=tmp_path)
+
+    # Act
+    restored = cache.get(("report", 1))
+    cache.put(("report", 2), result)
+
+    # Assert - the new version replaces the file of the old one
+    pd.testing.assert_frame_equal(restored, result)
+    assert cache.stats["disk_hits"] == 1
+    assert len(list(tmp_path.glob("*.parquet"))) == 1
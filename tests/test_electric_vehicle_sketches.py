@@ -0,0 +1,180 @@
+import numpy as np
+import pyarrow as pa
+import pytest
+import random
+from collections import Counter
+from electric_vehicle_sketches import CountMinSketch, HyperLogLog, SpaceSaving, VehicleSketches, hash_columns
+
+@pytest.fixture
+def skewed_keys():
+    # Zipf-like stream: key i appears about 1000 / i times
+    rng = random.Random(0)
+    keys = [(f"MAKE {i}", f"MODEL {i}") for i in range(1, 400) for _ in range(1000 // i)]
+    rng.shuffle(keys)
+    return keys
+
+def test_hash_columns_ignores_layout():
+    # Arrange - the same values, sliced, chunked and as a large string array
+    values = ["TESLA", None, "", "MODEL 3"]
+    sliced = pa.array(["x"] + values)[1:]
+    chunked = pa.chunked_array([values[:2], values[2:]])
+    large = pa.array(values, type=pa.large_string())
+
+    # Act
+    hashes = [hash_columns([column]) for column in (pa.array(values), sliced, chunked, large)]
+
+    # Assert - NULL and the empty string hash apart
+    for other in hashes[1:]:
+        np.testing.assert_array_equal(hashes[0], other)
+    assert len(set(hashes[0].tolist())) == 4
+    assert hash_columns([pa.array(["a"]), pa.array(["bc"])])[0] != hash_columns([pa.array(["ab"]), pa.array(["c"])])[0]
+
+def test_count_min_sketch_bounds(skewed_keys):
+    # Arrange - a narrow sketch, so keys collide
+    sketch = CountMinSketch(width=64, depth=4)
+    counts = Counter(skewed_keys)
+    keys = list(counts)
+
+    # Act
+    sketch.add(hash_columns([pa.array([k[0] for k in keys]), pa.array([k[1] for k in keys])]), list(counts.values()))
+
+    # Assert - never under, over by at most the error bound for nearly every key
+    estimates = {
+        key: sketch.estimate(int(hash_columns([pa.array([key[0]]), pa.array([key[1]])])[0])) for key in keys
+    }
+    assert all(estimates[key].value >= count for key, count in counts.items())
+    within = sum(estimates[key].value - count <= estimates[key].error for key, count in counts.items())
+    assert within / len(counts) >= estimates[keys[0]].confidence
+    assert sketch.total == len(skewed_keys)
+
+def test_space_saving_heavy_hitters(skewed_keys):
+    # Arrange
+    summary = SpaceSaving(capacity=20)
+    counts = Counter(skewed_keys)
+
+    # Act
+    for key in skewed_keys:
+        summary.add(key)
+
+    # Assert - true counts within the bounds, every key above total / capacity is tracked
+    top = summary.top()
+    assert len(top) == 20
+    for key, estimate in top:
+        assert estimate.value - estimate.error <= counts[key] <= estimate.value
+        assert estimate.error <= summary.total / summary.capacity
+    tracked = {key for key, _ in top}
+    assert {key for key, count in counts.items() if count > summary.total / summary.capacity} <= tracked
+    assert [key for key, _ in summary.top(3)] == [("MAKE 1", "MODEL 1"), ("MAKE 2", "MODEL 2"), ("MAKE 3", "MODEL 3")]
+
+def test_space_saving_merge(skewed_keys):
+    # Arrange - the stream split in two summaries
+    first, second = SpaceSaving(capacity=20), SpaceSaving(capacity=20)
+    for key in skewed_keys[::2]:
+        first.add(key)
+    for key in skewed_keys[1::2]:
+        second.add(key)
+    counts = Counter(skewed_keys)
+
+    # Act
+    first.merge(second)
+
+    # Assert
+    assert first.total == len(skewed_keys)
+    assert len(first.counters) == 20
+    for key, estimate in first.top():
+        assert estimate.value - estimate.error <= counts[key] <= estimate.value
+    assert [key for key, _ in first.top(2)] == [("MAKE 1", "MODEL 1"), ("MAKE 2", "MODEL 2")]
+
+@pytest.mark.parametrize("distinct", [10, 1_000, 100_000])
+def test_hyperloglog_estimate(distinct):
+    # Arrange - every value added twice, in two sketches
+    first, second = HyperLogLog(), HyperLogLog()
+    values = pa.array([f"5YJ3E{i:05d}" for i in range(distinct)])
+
+    # Act
+    first.add(values)
+    second.add(values[distinct // 2:])
+    second.add(values)
+    first.merge(second)
+
+    # Assert
+    estimate = first.estimate()
+    assert abs(estimate.value - distinct) <= estimate.error
+
+def test_hyperloglog_invalid_precision():
+    # Act & Assert
+    with pytest.raises(ValueError):
+        HyperLogLog(precision=20)
+
+@pytest.fixture
+def vehicle_batch():
+    rng = random.Random(0)
+    vehicles = [("TESLA", "MODEL Y")] * 5 + [("TESLA", "MODEL 3")] * 3 + [("NISSAN", "LEAF"), ("KIA", "NIRO")]
+    rows = [(rng.choice(["98101", "98102", None]), *rng.choice(vehicles)) for _ in range(1_000)]
+    return pa.table({
+        "Postal_Code": [row[0] for row in rows],
+        "Make": [row[1] for row in rows],
+        "Model": [row[2] for row in rows],
+        "DOL_Vehicle_ID": pa.array(range(1_000), type=pa.int64()),
+        "VIN": [f"VIN{i % 700}" for i in range(1_000)],
+        "Census_Tract": [None] * 1_000,
+    })
+
+def test_vehicle_sketches(vehicle_batch):
+    # Arrange - the batch split in two loads, one of them in separate sketches
+    sketches = VehicleSketches()
+    shard = sketches.empty_copy()
+    rows = vehicle_batch.to_pylist()
+    vehicles = Counter((row["Make"], row["Model"]) for row in rows)
+    postal_code_vehicles = Counter((row["Postal_Code"], row["Make"], row["Model"]) for row in rows)
+
+    # Act
+    sketches.update(vehicle_batch.slice(0, 600))
+    shard.update(vehicle_batch.slice(600))
+    sketches.merge(shard)
+    sketches = VehicleSketches.from_json(sketches.to_json())
+
+    # Assert - few vehicles, so the counts are exact
+    assert sketches.rows == 1_000
+    assert [(make, model, estimate.value) for make, model, estimate in sketches.top_vehicles(2)] == [
+        (make, model, count) for (make, model), count in vehicles.most_common(2)
+    ]
+    for postal_code, make, model, estimate in sketches.top_vehicle_by_postal_code():
+        assert estimate.value == max(count for (code, *_), count in postal_code_vehicles.items() if code == postal_code)
+        assert postal_code_vehicles[(postal_code, make, model)] == estimate.value
+    assert sketches.vehicle_count("TESLA", "MODEL Y").value == vehicles[("TESLA", "MODEL Y")]
+    assert sketches.vehicle_count("NISSAN", "LEAF", postal_code="98101").value == postal_code_vehicles[("98101", "NISSAN", "LEAF")]
+    assert sketches.vehicle_count("BMW", "X5").value == 0
+    assert sketches.distinct_count("DOL_Vehicle_ID").value == pytest.approx(1_000, abs=sketches.distinct_count("DOL_Vehicle_ID").error)
+    assert sketches.distinct_count("VIN").value == pytest.approx(700, abs=sketches.distinct_count("VIN").error)
+    assert sketches.distinct_count("Census_Tract").value == 0
+    with pytest.raises(ValueError):
+        sketches.distinct_count("City")
+
+def test_vehicle_sketches_null_and_empty_keys():
+    # Arrange - NULL and empty postal codes and makes, as many of each
+    batch = pa.table({
+        "Postal_Code": [None, None, "", ""],
+        "Make": [None, None, "", ""],
+        "Model": ["LEAF"] * 4,
+        "DOL_Vehicle_ID": pa.array(range(4), type=pa.int64()),
+        "VIN": ["VIN0", "VIN1", "VIN2", "VIN3"],
+        "Census_Tract": [None] * 4,
+    })
+    sketches = VehicleSketches()
+
+    # Act
+    sketches.update(batch)
+    sketches = VehicleSketches.from_json(sketches.to_json())
+
+    # Assert - they are counted apart, and NULL orders before the empty string on ties
+    assert [(make, model, estimate.value) for make, model, estimate in sketches.top_vehicles(2)] == [
+        (None, "LEAF", 2), ("", "LEAF", 2)
+    ]
+    assert sorted(
+        ((postal_code, make, estimate.value) for postal_code, make, _, estimate in sketches.top_vehicle_by_postal_code()),
+        key=lambda row: row[0] is None
+    ) == [("", "", 2), (None, None, 2)]
+    for make in (None, ""):
+        key_hash = hash_columns([pa.array([make], type=pa.string()), pa.array(["LEAF"])], VehicleSketches.VEHICLE_SEED)
+        assert sketches.counts.estimate(int(key_hash[0])).value == 2
@@ -0,0 +1,86 @@
+import duckdb
+import math
+import pytest
+from electric_vehicle_compact_schema import CompactSchema
+from electric_vehicle_spatial_index import EARTH_RADIUS_KM, SpatialGridIndex, haversine_sql, radius_bounding_box
+
+@pytest.fixture
+def duckdb_connection():
+    connection = duckdb.connect()
+    connection.execute("""
+        CREATE TABLE electric_vehicles AS
+        SELECT * FROM (VALUES
+            (1, 'TESLA', 'MODEL 3', 2021, 'Battery Electric Vehicle (BEV)', 'Seattle', 'POINT (-122.33 47.61)'),
+            (2, 'NISSAN', 'LEAF', 2019, 'Battery Electric Vehicle (BEV)', 'Seattle', 'POINT (-122.335 47.615)'),
+            (3, 'VOLVO', 'S60', 2020, 'Plug-in Hybrid Electric Vehicle (PHEV)', 'Tacoma', 'POINT (-122.44 47.25)'),
+            (4, 'KIA', 'NIRO', 2022, 'Battery Electric Vehicle (BEV)', NULL, 'unknown'),
+            (5, 'KIA', 'NIRO', 2022, 'Battery Electric Vehicle (BEV)', NULL, NULL)
+        ) AS t(DOL_Vehicle_ID, Make, Model, Model_Year, Electric_Vehicle_Type, City, Vehicle_Location)
+    """)
+    yield connection
+    connection.close()
+
+def test_build(duckdb_connection):
+    # Arrange
+    index = SpatialGridIndex("electric_vehicles")
+
+    # Act
+    indexed = index.build(duckdb_connection)
+
+    # Assert - vehicles without a valid location are left out, cells match cell()
+    assert indexed == 3
+    rows = duckdb_connection.execute(
+        f"SELECT DOL_Vehicle_ID, Cell_X, Cell_Y, Longitude, Latitude FROM {index.INDEX_TABLE} ORDER BY 1"
+    ).fetchall()
+    assert rows == [
+        (vehicle_id, index.cell(longitude), index.cell(latitude), longitude, latitude)
+        for vehicle_id, longitude, latitude in [(1, -122.33, 47.61), (2, -122.335, 47.615), (3, -122.44, 47.25)]
+    ]
+
+def test_build_compact_table(duckdb_connection):
+    # Arrange - the coordinates are read from the Longitude and Latitude columns
+    index = SpatialGridIndex("electric_vehicles")
+    index.build(duckdb_connection)
+    expected = duckdb_connection.execute(f"SELECT * FROM {index.INDEX_TABLE} ORDER BY DOL_Vehicle_ID").fetchall()
+    CompactSchema("electric_vehicles", dict(duckdb_connection.execute(
+        "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = 'electric_vehicles' ORDER BY column_index"
+    ).fetchall())).compact(duckdb_connection)
+
+    # Act
+    index.build(duckdb_connection)
+
+    # Assert
+    assert duckdb_connection.execute(
+        f"SELECT * REPLACE (CAST(Make AS VARCHAR) AS Make, CAST(Model AS VARCHAR) AS Model, "
+        f"CAST(Electric_Vehicle_Type AS VARCHAR) AS Electric_Vehicle_Type, CAST(City AS VARCHAR) AS City) "
+        f"FROM {index.INDEX_TABLE} ORDER BY DOL_Vehicle_ID"
+    ).fetchall() == expected
+
+@pytest.mark.parametrize("longitude, latitude, radius_km", [(-122.33, 47.6, 5.0), (10.0, -60.0, 300.0), (0.0, 0.0, 1.0)])
+def test_radius_bounding_box_contains_circle(longitude, latitude, radius_km):
+    # Arrange - points on the circle, every 10 degrees of bearing
+    connection = duckdb.connect()
+    points = []
+    for bearing in range(0, 360, 10):
+        angle, theta, phi = radius_km / EARTH_RADIUS_KM, math.radians(bearing), math.radians(latitude)
+        point_phi = math.asin(math.sin(phi) * math.cos(angle) + math.cos(phi) * math.sin(angle) * math.cos(theta))
+        point_lambda = math.radians(longitude) + math.atan2(
+            math.sin(theta) * math.sin(angle) * math.cos(phi), math.cos(angle) - math.sin(phi) * math.sin(point_phi)
+        )
+        points.append((math.degrees(point_lambda), math.degrees(point_phi)))
+
+    # Act
+    min_longitude, min_latitude, max_longitude, max_latitude = radius_bounding_box(longitude, latitude, radius_km)
+
+    # Assert - the points are at radius_km and inside the box
+    for point_longitude, point_latitude in points:
+        distance = connection.execute(
+            f"SELECT {haversine_sql(str(point_longitude), str(point_latitude), str(longitude), str(latitude))}"
+        ).fetchone()[0]
+        assert distance == pytest.approx(radius_km)
+        assert min_longitude <= point_longitude <= max_longitude
+        assert min_latitude <= point_latitude <= max_latitude
+
+def test_radius_bounding_box_pole():
+    # Act & Assert - a circle around a pole spans every longitude
+    assert radius_bounding_box(0.0, 89.9, 50.0) == (-180.0, pytest.approx(89.45, abs=0.01), 180.0, 90.0)
@@ -0,0 +1,59 @@
+import pyarrow as pa
+import pytest
+from electric_vehicle_type_converter import TypeConversionPlan
+
+@pytest.fixture
+def conversion_plan():
+    return TypeConversionPlan({"Make": "VARCHAR", "Model_Year": "INTEGER", "DOL_Vehicle_ID": "BIGINT"})
+
+def test_schema(conversion_plan):
+    # Arrange - fixture handles setup
+
+    # Act & Assert
+    assert conversion_plan.schema == pa.schema([
+        ("Make", pa.string()), ("Model_Year", pa.int32()), ("DOL_Vehicle_ID", pa.int64())
+    ])
+
+def test_unsupported_column_type():
+    # Act & Assert
+    with pytest.raises(ValueError):
+        TypeConversionPlan({"Vehicle_Location": "GEOMETRY"})
+
+def test_convert(conversion_plan):
+    # Arrange
+    columns = {
+        "Make": ["TESLA", "", None, "NISSAN"],
+        "Model_Year": ["2021", "invalid", "", " 2019 "],
+        "DOL_Vehicle_ID": ["123456789", "9999999999", "1.5", None]
+    }
+
+    # Act
+    table, coerced = conversion_plan.convert(columns, num_rows=4)
+
+    # Assert
+    assert table.to_pydict() == {
+        "Make": ["TESLA", None, None, "NISSAN"],
+        "Model_Year": [2021, None, None, 2019],
+        "DOL_Vehicle_ID": [123456789, 9999999999, None, None]
+    }
+    assert coerced == {"Make": 0, "Model_Year": 1, "DOL_Vehicle_ID": 1}
+
+def test_convert_out_of_range_integer(conversion_plan):
+    # Arrange - fits in BIGINT but not in INTEGER
+    columns = {"Model_Year": ["2147483648", "-2147483648"]}
+
+    # Act
+    table, coerced = conversion_plan.convert(columns, num_rows=2)
+
+    # Assert
+    assert table.column("Model_Year").to_pylist() == [None, -2147483648]
+    assert coerced["Model_Year"] == 1
+
+def test_convert_missing_column(conversion_plan):
+    # Act
+    table, coerced = conversion_plan.convert({"Make": ["TESLA"]}, num_rows=1)
+
+    # Assert
+    assert table.column("Model_Year").to_pylist() == [None]
+    assert table.column("DOL_Vehicle_ID").type == pa.int64()
+    assert coerced["DOL_Vehicle_ID"] == 0
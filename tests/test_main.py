@@ -0,0 +1,136 @@
+import csv
+import duckdb
+import gzip
+import io
+import os
+import pandas as pd
+import pytest
+import subprocess
+import sys
+from unittest.mock import patch
+from electric_vehicle_analytics import ElectricVehicleAnalytics
+from electric_vehicle_benchmark import generate_csv
+from main import main
+
+@pytest.fixture
+def csv_path(tmp_path):
+    return str(generate_csv(tmp_path / "fleet.csv", rows=300))
+
+@pytest.fixture
+def db_path(csv_path, tmp_path):
+    path = str(tmp_path / "db" / "electric_vehicles.duckdb")
+    main(["load", "--csv", csv_path, "--db", path, "--load-mode", "columnar", "--batch-size", "100", "--threads", "2"])
+    return path
+
+def _expected_report(db_path, name, tmp_path):
+    connection = duckdb.connect(db_path, read_only=True)
+    try:
+        return getattr(ElectricVehicleAnalytics(connection, output_dir=str(tmp_path)), name)()
+    finally:
+        connection.close()
+
+def test_load_and_validate(db_path, csv_path):
+    # Act - passes, or exits
+    main(["validate", "--csv", csv_path, "--db", db_path])
+
+    # Assert
+    connection = duckdb.connect(db_path, read_only=True)
+    assert connection.execute("SELECT COUNT(*) FROM electric_vehicles").fetchone()[0] == 300
+    connection.close()
+
+@pytest.mark.parametrize("compression", ["none", "gzip"])
+def test_load_and_validate_directory(tmp_path, compression):
+    # Arrange - two shards, compressed or not
+    shards_dir = tmp_path / "shards"
+    shards_dir.mkdir()
+    for name, rows in (("a.csv", 120), ("b.csv", 80)):
+        path = generate_csv(shards_dir / name, rows=rows, seed=rows)
+        if compression == "gzip":
+            with open(path, "rb") as source, gzip.open(f"{path}.gz", "wb") as target:
+                target.write(source.read())
+            path.unlink()
+    db_path = str(tmp_path / "electric_vehicles.duckdb")
+    main(["load", "--csv", str(shards_dir), "--db", db_path, "--load-mode", "columnar"])
+
+    # Act - the directory, then one of its files, pass or exit
+    main(["validate", "--csv", str(shards_dir), "--db", db_path])
+    with pytest.raises(SystemExit) as exit_info:
+        main(["validate", "--csv", str(sorted(shards_dir.iterdir())[0]), "--db", db_path])
+
+    # Assert - a single shard holds fewer rows than the table
+    assert exit_info.value.code == 1
+
+def test_invalid_load_mode(db_path, csv_path, capsys):
+    # Act & Assert
+    with pytest.raises(SystemExit) as exit_info:
+        main(["load", "--csv", csv_path, "--db", db_path, "--load-mode", "fastest"])
+    assert exit_info.value.code == 2
+    assert "invalid choice: 'fastest'" in capsys.readouterr().err
+
+def test_validate_mismatch(db_path, tmp_path):
+    # Arrange
+    other_csv = str(generate_csv(tmp_path / "other.csv", rows=200))
+
+    # Act & Assert
+    with pytest.raises(SystemExit) as exit_info:
+        main(["validate", "--csv", other_csv, "--db", db_path])
+    assert exit_info.value.code == 1
+
+@pytest.mark.parametrize("name", [name for name, *_ in ElectricVehicleAnalytics.REPORTS])
+def test_report_to_stdout(db_path, name, tmp_path, capsys):
+    # Act
+    main(["report", name, "--db", db_path])
+
+    # Assert - the same rows as the report method
+    expected = _expected_report(db_path, name, tmp_path)
+    records = list(csv.reader(io.StringIO(capsys.readouterr().out)))
+    assert records[0] == list(expected.columns)
+    assert records[1:] == [["" if pd.isna(value) else str(value) for value in row] for row in expected.itertuples(index=False)]
+
+def test_report_to_parquet(db_path, tmp_path):
+    # Arrange
+    output = tmp_path / "reports" / "top.parquet"
+    output.parent.mkdir()
+
+    # Act
+    main(["report", "top_3_most_popular_vehicles", "--db", db_path, "--output", str(output)])
+
+    # Assert
+    pd.testing.assert_frame_equal(
+        pd.read_parquet(output), _expected_report(db_path, "top_3_most_popular_vehicles", tmp_path), check_dtype=False
+    )
+
+def test_unknown_report(db_path):
+    # Act & Assert
+    with pytest.raises(SystemExit) as exit_info:
+        main(["report", "cars_per_color", "--db", db_path])
+    assert exit_info.value.code == 1
+
+def test_bench_passes_arguments():
+    # Act
+    with patch("electric_vehicle_benchmark.main") as benchmark_main:
+        main(["bench", "--rows", "1000", "--repeats", "1"])
+
+    # Assert
+    benchmark_main.assert_called_once_with(["--rows", "1000", "--repeats", "1"])
+
+def test_imports_are_lazy():
+    # Arrange - a fresh interpreter, as the modules of this one are already imported. Only
+    # load and validate, which run the data loader, import pyarrow and numpy
+    code = """
+import contextlib, io, sys, main, electric_vehicle_analytics, electric_vehicle_query_service
+main.build_parser().parse_args(['report', 'count_cars_per_city'])
+main.build_parser().parse_args(['validate'])
+with contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(SystemExit):
+    main.build_parser().parse_args(['--help'])
+print(sorted(name for name in ('pandas', 'pyarrow', 'numpy') if name in sys.modules))
+"""
+
+    # Act
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=os.path.dirname(sys.modules[main.__module__].__file__),
+        capture_output=True, text=True, check=True
+    )
+
+    # Assert
+    assert result.stdout.strip() == "[]"